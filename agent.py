@@ -1,89 +1,56 @@
 import os
 import time
-import mss
-import mss.tools
 from PIL import Image, ImageDraw
-from google import genai
-from google.genai import types
-from openai import OpenAI
+import backends
+from backends import lazy
 import base64
 import io
-from tools import (
-    click, double_click, triple_click, right_click, middle_click,
-    type_text, type_unicode, press_key, hold_key, scroll, scroll_at, horizontal_scroll,
-    drag, move_mouse, get_screen_size, hotkey, clear_field,
-    copy_to_clipboard, paste_from_clipboard, set_clipboard, get_clipboard,
-    click_and_hold, shift_click, ctrl_click, alt_click,
-    maximize_active_window, open_app, run_shell_command
-)
+import re
+import uuid
+from contextlib import nullcontext
+from tools import (get_screen_size, get_action, action_declarations, action_prompt_text, cancel_waits, reset_waits,
+                   set_expect_baseline, set_text_index, EXPECT_FAILED)
 from ui_inspector import get_ui_tree_summary
+from turn_metrics import TurnTimer, format_breakdown
+from usage_ledger import UsageLedger, call_cost, summarize
+from tracing import tracer
+from async_runtime import runtime, TaskCancelled
+from session_recorder import SessionRecorder, RECORDINGS_DIR, MAX_RECORDINGS_MB, MAX_RECORDING_DAYS, prune_recordings
+from frame_cache import FrameCache
+from skills import SkillLibrary, observation, run_skill, FAILED_RESULTS
+from image_policy import ImagePolicy
+from screen_history import ScreenHistory, fingerprint
+from ocr_index import OcrIndex, enabled as ocr_enabled
+from budget import TaskBudget, format_budget, DEGRADED_IMAGE_SIZE, DEGRADED_CONTEXT_MESSAGES
+from prompt_builder import (ContextCache, situational_categories, prefix_categories, action_names,
+                            task_message, turn_prompt)
 from dotenv import load_dotenv
 
 load_dotenv()
 
-SYSTEM_PROMPT = """
+# Model SDKs and the capture backend are imported on first use (see backends.py)
+genai = lazy("model", "gemini", namespace=globals(), symbol="genai")
+types = lazy("model", "gemini.types", namespace=globals(), symbol="types")
+OpenAI = lazy("model", "xai", namespace=globals(), symbol="OpenAI")
+
+PROMPT_INTRO = """
 You are a Computer Use Agent with Agentic Vision. You have control over the user's computer screen and input devices.
 Your goal is to help the user with their tasks by seeing the screen and performing actions.
 
 AGENTIC VISION CAPABILITIES:
-1. **Zoom and Inspect**: You can write Python code to crop parts of the screen if you need to see details (like small text or icons) more clearly. You can also rotate images if needed.
-2. **Visual Math**: Use Python code execution to perform calculations on visual data (e.g., summing numbers in a table, counting items).
-3. **Image Annotation**: You can annotate the screen to ground your reasoning or show what you are looking at.
-
-To use these, just write the Python code. The results will be returned to you in the next turn.
-
-Available actions:
-
-MOUSE ACTIONS:
-- CLICK(x, y): Left click at normalized coordinates (x, y).
-- DOUBLE_CLICK(x, y): Double click at normalized coordinates (x, y). Good for opening files/apps.
-- TRIPLE_CLICK(x, y): Triple click to select an entire line or paragraph.
-- RIGHT_CLICK(x, y): Right click to open context menus.
-- MIDDLE_CLICK(x, y): Middle click (opens links in new tab, paste in some terminals).
-- MOVE_MOUSE(x, y): Move mouse without clicking (for hover effects, tooltips, dropdown menus).
-- CLICK_AND_HOLD(x, y, duration): Click and hold for specified seconds (for drag menus, long press).
-- SHIFT_CLICK(x, y): Shift+Click for range selection (select from last click to this point).
-- CTRL_CLICK(x, y): Ctrl+Click for multi-selection or opening links in new tabs.
-- ALT_CLICK(x, y): Alt+Click for special interactions.
-- DRAG(x1, y1, x2, y2): Drag from (x1, y1) to (x2, y2). Good for moving windows, selecting text.
-
-SCROLL ACTIONS:
-- SCROLL(amount): Scroll the mouse wheel at current position. Positive for up, negative for down. Use values like 3, 5, -3, -5.
-- SCROLL_AT(x, y, amount): Scroll at a specific location.
-- HORIZONTAL_SCROLL(amount): Scroll horizontally. Positive for right, negative for left.
-
-KEYBOARD ACTIONS:
-- TYPE(text): Type the specified text (ASCII characters only).
-- TYPE_UNICODE(text): Type text including special/unicode characters (use for non-English text, emojis).
-- PRESS(key): Press a specific key (e.g., 'enter', 'esc', 'backspace', 'tab', 'space', 'up', 'down', 'left', 'right', 'home', 'end', 'pageup', 'pagedown', 'f1'-'f12', 'win', 'delete').
-- HOTKEY(key1, key2, ...): Press a combination of keys (e.g., HOTKEY('ctrl', 'a'), HOTKEY('alt', 'f4'), HOTKEY('ctrl', 'shift', 'esc')).
-- HOLD_KEY(key, duration): Hold a key for a duration in seconds.
-
-TEXT FIELD ACTIONS:
-- CLEAR_FIELD(x, y): Focus a field at (x, y) and delete all its current text.
-
-CLIPBOARD ACTIONS:
-- COPY(): Send Ctrl+C to copy selected content.
-- PASTE(): Send Ctrl+V to paste clipboard content.
-- SET_CLIPBOARD(text): Set clipboard to specific text (useful before pasting).
-
-WINDOW ACTIONS:
-- OPEN_APP(app_name): Open an application by name (e.g., 'notepad', 'chrome', 'calculator'). This is more reliable than searching the Start menu manually.
-- MAXIMIZE_WINDOW(): Maximize the currently active window. Use immediately after opening/focusing an app to avoid small-window scrolling problems.
-
-SYSTEM ACTIONS:
-- SHELL(command): Execute a shell command (PowerShell). Use this for RELIABLE file operations (e.g., `mkdir`, `copy`, `move`, `del`), opening specific folders, or checking system state. This is much faster and more reliable than GUI clicks for these tasks.
-- WAIT(seconds): Wait briefly for UI to load. Use SHORT waits: 0.3-0.5 seconds MAX. The system already handles delays.
-- DONE: Signal that the task is finished.
-
-IMPORTANT GUIDELINES:
+1. **Zoom and Inspect**: Call the `zoom` tool (or write ACTION: ZOOM(x1, y1, x2, y2)) to see a region of the screen at full native resolution when you need details (small text, icons, serial numbers). The crop comes back immediately, in the same turn. Do not crop the attached screenshot yourself; it is downscaled.
+2. **Visual Math**: Zoom into tables or lists, then count or calculate from the crop.
+
+"""
+
+PROMPT_GUIDELINES = """IMPORTANT GUIDELINES:
 1. **BE RELIABLE**: For file operations (creating folders, moving files), PREFER using SHELL('mkdir foldername') or similar. GUI context menus can be brittle.
-2. **VERIFY SUCCESS**: Do NOT call ACTION: DONE in the same turn as a critical action (like creating a file or opening an app). Perform the action, wait for the next turn to see the result/screen, and ONLY then call DONE if you see it succeeded.
+2. **VERIFY SUCCESS**: Do NOT call ACTION: DONE in the same turn as a critical action (like creating a file or opening an app) unless an EXPECT check right before DONE verifies that it succeeded. Otherwise perform the action, wait for the next turn to see the result/screen, and ONLY then call DONE if you see it succeeded.
 3. **AVOID LOOPS**: If you try the same click/selection twice and the UI does not change, STOP repeating it. Change strategy.
 4. After typing a search query, PRESS('enter') to trigger the search.
 5. Use SCROLL(-5) to scroll DOWN and SCROLL(5) to scroll UP.
 6. **MAXIMIZE IMMEDIATELY**: After opening or focusing an app, call MAXIMIZE_WINDOW() FIRST before interacting with its content.
-7. **AGENTIC VISION**: If you are unsure about a detail on the screen (e.g., reading a small price or a serial number), use your Python tool to zoom into that area.
+7. **AGENTIC VISION**: If you are unsure about a detail on the screen (e.g., reading a small price or a serial number), ZOOM into that area.
 
 Coordinates: Use normalized coordinates from 0 to 1000. 
 (0, 0) is top-left, (1000, 1000) is bottom-right.
@@ -91,20 +58,64 @@ The screen has a red 10x10 grid overlay to help you align clicks.
 
 UI METADATA:
 You will receive a list of "Detected UI Elements". Use these coordinates for high precision clicking.
+When that list is detailed, some turns carry only the list and no screenshot. Call SCREENSHOT if you need to see the screen.
 
-Format your response CONCISELY:
+"""
+
+TEXT_RESPONSE_FORMAT = """Format your response CONCISELY:
 REASONING: [One sentence max]
 ACTION: [Action1]
 ACTION: [Action2]
 ...
 
 Output multiple ACTIONs when they can be performed in sequence without seeing the screen.
+Plan further ahead with EXPECT checks: after a step whose outcome you would otherwise need to see, add the state it
+should lead to (e.g. EXPECT_WINDOW('Notepad') after OPEN_APP('notepad')) and keep going. Steps run in order; if a check
+fails, the rest are skipped and you get the failure and a fresh screenshot.
 Do NOT use WAIT unless the UI truly needs time to load (e.g., after opening an app).
 """
 
-# Maximum context messages to keep (system prompt + recent exchanges)
+FUNCTION_RESPONSE_FORMAT = """Respond by calling the action functions, in the order they should run. The ACTION names above
+are the functions of the same name in lowercase (CLICK -> click, DONE -> done).
+Make several calls in one reply when they can be performed in sequence without seeing the screen.
+Plan further ahead with expect_* calls: after a step whose outcome you would otherwise need to see, add the state it
+should lead to (e.g. expect_window('Notepad') after open_app('notepad')) and keep going. Calls run in order; if a check
+fails, the rest are skipped and you get the failure and a fresh screenshot.
+Write no other text, or at most one short sentence of reasoning.
+Do NOT use wait unless the UI truly needs time to load (e.g., after opening an app).
+"""
+
+# The text action list is generated from the tools.py registry; in function mode the same
+# registry is sent as typed function declarations instead
+def text_system_prompt(categories=None):
+    return PROMPT_INTRO + "Available actions:\n\n" + action_prompt_text(categories=categories) + "\n\n" + PROMPT_GUIDELINES + TEXT_RESPONSE_FORMAT
+
+SYSTEM_PROMPT = text_system_prompt()
+FUNCTION_SYSTEM_PROMPT = PROMPT_INTRO + PROMPT_GUIDELINES + FUNCTION_RESPONSE_FORMAT
+
+CODE_EXECUTION_PROMPT = """
+CODE EXECUTION:
+You can also write Python code for calculations on visual data (e.g., summing numbers in a table). The code runs remotely on the downscaled screenshot; use ZOOM, not code, to read details.
+"""
+
+OCR_PROMPT = """
+SCREEN TEXT:
+Each turn lists the text read from the screen by local OCR ("Screen Text"), with the center of each line. Read prices, numbers, labels and table cells from it instead of zooming, and click text at its listed center. Use FIND_TEXT to locate text that is not listed or that changed after an action. ZOOM only when the OCR text is missing or looks garbled.
+"""
+
+# Maximum context messages to keep (pinned task message + recent exchanges)
 MAX_CONTEXT_MESSAGES = 5
 
+# Frames of a turn error's traceback written to the log
+TRACEBACK_FRAMES = 6
+
+# Screenshots wider than this are downscaled before sending (budget.py may lower it per task)
+MAX_IMAGE_SIZE = 2048
+
+# Follow-up requests allowed per turn to answer ZOOM calls
+MAX_ZOOM_ROUNDS = 2
+ZOOM_PATTERN = re.compile(r"ZOOM\(\s*(-?[\d.]+)\s*,\s*(-?[\d.]+)\s*,\s*(-?[\d.]+)\s*,\s*(-?[\d.]+)\s*\)", re.IGNORECASE)
+
 def _ahash(image: Image.Image, hash_size: int = 8) -> int:
     """
     Average-hash for quick "did the screen change?" detection.
@@ -122,77 +133,215 @@ def _ahash(image: Image.Image, hash_size: int = 8) -> int:
 def _hamming_distance(a: int, b: int) -> int:
     return (a ^ b).bit_count()
 
+def _mid_exchange(content):
+    """True for a model turn or a function response, which cannot follow the pinned task message."""
+    if getattr(content, "role", None) == "model":
+        return True
+    parts = getattr(content, "parts", None)
+    if parts:
+        for part in parts:
+            if part.function_response:
+                return True
+    return False
+
+def prune_history(history, max_messages=MAX_CONTEXT_MESSAGES):
+    """Keep the pinned task message plus the most recent exchanges."""
+    recent = history[-(max_messages - 1):]
+    # Function calls must follow a user turn and responses their call, so start on a plain user turn
+    while recent and _mid_exchange(recent[0]):
+        recent = recent[1:]
+    return history[:1] + recent
+
+ACTION_LINE_PATTERN = re.compile(r"ACTION:\s*(\w+)\((.*)\)", re.IGNORECASE)
+DONE_LINE_PATTERN = re.compile(r"\s*ACTION:\s*DONE\b", re.IGNORECASE)
+ACTION_ARG_PATTERN = re.compile(r"""'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)"|([^,'"]+)""")
+# Only escaped quotes are unescaped: backslashes in Windows paths stay as written
+QUOTE_ESCAPE_PATTERN = re.compile(r"""\\(['"])""")
+
+def _single_string(text):
+    """The whole argument text as one string; the last quote closes it (TYPE('don't'))."""
+    text = text.strip()
+    if len(text) >= 2 and text[0] in "'\"" and text[-1] == text[0]:
+        text = text[1:-1]
+    return QUOTE_ESCAPE_PATTERN.sub(r"\1", text)
+
+def parse_action_line(line):
+    """
+    'ACTION: NAME(args)' -> (NAME, [args]) or None. An action that takes a
+    single string gets the whole text between the outer quotes, apostrophes
+    and commas included. Otherwise quoted arguments may contain commas and
+    escaped quotes; unquoted ones are split on commas.
+    """
+    if DONE_LINE_PATTERN.match(line):
+        return "DONE", []
+    match = ACTION_LINE_PATTERN.search(line)
+    if not match:
+        return None
+    name, text = match.group(1).upper(), match.group(2)
+    action = get_action(name)
+    if action and len(action.params) == 1 and action.params[0].type == "string":
+        return name, [_single_string(text)] if text.strip() else []
+    params = []
+    for single, double, bare in ACTION_ARG_PATTERN.findall(text):
+        if bare:
+            bare = bare.strip()
+            if bare:
+                params.append(bare)
+        else:
+            params.append(QUOTE_ESCAPE_PATTERN.sub(r"\1", single or double))
+    return name, params
+
+def format_call(name, args):
+    args = args or {}
+    return f"{name.upper()}({', '.join(f'{k}={v!r}' for k, v in args.items())})"
+
+def plan_actions(calls, response_text):
+    """
+    Actions to run this turn, in order: structured function calls, then
+    ACTION lines found in the text. Each is a dict with name, args, label and
+    the originating function call (None for text).
+    """
+    planned = []
+    for call in calls:
+        action = get_action(call.name)
+        args = dict(call.args or {})
+        planned.append({"name": action.name if action else call.name.upper(), "args": args,
+                        "label": format_call(call.name, args), "call": call})
+    for line in response_text.splitlines():
+        if not line.strip().upper().startswith("ACTION:"):
+            continue
+        parsed = parse_action_line(line)
+        name, args = parsed if parsed else (None, [])
+        planned.append({"name": name, "args": args, "label": line.strip(), "call": None})
+    return planned
+
+def function_response(call, reply):
+    return types.Part(function_response=types.FunctionResponse(id=call.id, name=call.name, response=reply))
+
 class ComputerUseAgent:
-    def __init__(self, api_keys=None, model_name='gemini-3-flash-preview'):
+    def __init__(self, api_keys=None, model_name='gemini-3-flash-preview', base_url=None):
         self.api_keys = api_keys or {}
         self.model_name = model_name
-        self.usage_file = "api_usage.json"
+        # Model used for the running task; the budget may switch it to a fallback
+        self.task_model = model_name
+        self.budget = None
+        # Optional Gemini endpoint override (e.g. a local mock server for benchmarks)
+        self.base_url = base_url or os.environ.get("GEMINI_BASE_URL") or None
+        self.ledger = UsageLedger()
+        self.task_id = None
+        self.task_usage = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.total_cost = 0.0
         self.load_usage()
         
-        self.client = None
+        # Model clients are built on first use; the Gemini SDK import starts in the
+        # background now so it overlaps with the first capture
+        self._client = None
+        self._xai_client = None
         if 'gemini' in self.api_keys:
-            self.client = genai.Client(api_key=self.api_keys['gemini'])
-        
-        self.xai_client = None
-        if 'xai' in self.api_keys and self.api_keys['xai']:
-            self.xai_client = OpenAI(
-                api_key=self.api_keys['xai'],
-                base_url="https://api.x.ai/v1",
-            )
+            backends.prefetch(("model", "gemini"), ("model", "gemini.types"))
             
         self.width, self.height = get_screen_size()
         self.should_stop = False
+        self.tracer = tracer
+        # Screen and UI metadata sources; replaced by recorded stand-ins in benchmarks
+        self.screen_factory = lazy("capture")
+        self.ui_summary_provider = get_ui_tree_summary
+        # Full-resolution frames for ZOOM; capture_screen stores each grab here
+        self.frame_cache = FrameCache()
+        self.last_frame_id = None
+        # Remote code execution is opt-in; zooming is served locally from frame_cache
+        self.code_execution = os.environ.get("AGENT_CODE_EXECUTION", "0").strip() == "1"
+        # 'functions': actions are declared as typed functions and returned as calls;
+        # 'text': the ACTION-line language described in SYSTEM_PROMPT
+        self.action_mode = os.environ.get("AGENT_ACTIONS", "functions").strip().lower()
+        if self.action_mode not in ("functions", "text"):
+            self.action_mode = "functions"
+        self._declarations = {}
+        # The system instruction and declarations go to the provider's context cache once
+        # per TTL and are referenced by name; AGENT_PROMPT_CACHE=0 sends them inline
+        self.prompt_cache = ContextCache() if os.environ.get("AGENT_PROMPT_CACHE", "1").strip() != "0" else None
+        # Session recording keeps every screen the model saw; opt-in with AGENT_RECORD=1,
+        # capped by AGENT_RECORD_MAX_MB and AGENT_RECORD_MAX_DAYS
+        self.record_sessions = os.environ.get("AGENT_RECORD", "0").strip() == "1"
+        # Successful runs are compiled into skills that later run without model turns;
+        # opt-in with AGENT_SKILLS=1 (both lookup and learning)
+        self.skills = SkillLibrary() if os.environ.get("AGENT_SKILLS", "0").strip() == "1" else None
+        # Local OCR of the screen text, re-reading only the tiles that changed; opt-in with
+        # AGENT_OCR=1, and off when no OCR engine (tesseract) is installed
+        self.ocr = None
+        if ocr_enabled():
+            engine = backends.optional("ocr")
+            if engine is None:
+                print("AGENT_OCR=1 but no OCR engine is installed; install Tesseract or set TESSERACT_CMD.")
+            else:
+                self.ocr = OcrIndex(engine)
+        set_text_index(self.ocr)
 
     def load_usage(self):
-        import json
-        if os.path.exists(self.usage_file):
-            try:
-                with open(self.usage_file, 'r') as f:
-                    data = json.load(f)
-                    self.total_input_tokens = data.get("total_input_tokens", 0)
-                    self.total_output_tokens = data.get("total_output_tokens", 0)
-                    self.total_cost = data.get("total_cost", 0.0)
-            except Exception as e:
-                print(f"Error loading usage file: {e}")
-
-    def save_usage(self):
-        import json
+        # Totals are aggregated from the ledger once at startup, then kept in memory
+        self.ledger.flush()
         try:
-            with open(self.usage_file, 'w') as f:
-                json.dump({
-                    "total_input_tokens": self.total_input_tokens,
-                    "total_output_tokens": self.total_output_tokens,
-                    "total_cost": self.total_cost
-                }, f, indent=4)
+            totals = summarize(self.ledger.path)
+            self.total_input_tokens = totals["input_tokens"]
+            self.total_output_tokens = totals["output_tokens"]
+            self.total_cost = totals["cost"]
         except Exception as e:
-            print(f"Error saving usage file: {e}")
+            print(f"Error loading usage ledger: {e}")
+
+    def save_usage(self):
+        self.ledger.flush()
 
     def stop(self):
         self.should_stop = True
+        cancel_waits()
+        # Abandons an in-flight model request, kills a running SHELL and releases a waiting run_action
+        runtime.cancel()
 
-    def update_api_keys(self, api_keys):
-        self.api_keys = api_keys
-        if 'gemini' in self.api_keys:
-            self.client = genai.Client(api_key=self.api_keys['gemini'])
-        
-        if 'xai' in self.api_keys and self.api_keys['xai']:
-            self.xai_client = OpenAI(
+    @property
+    def client(self):
+        if self._client is None and 'gemini' in self.api_keys:
+            self._client = self._make_gemini_client()
+        return self._client
+
+    @property
+    def xai_client(self):
+        if self._xai_client is None and self.api_keys.get('xai'):
+            self._xai_client = OpenAI(
                 api_key=self.api_keys['xai'],
                 base_url="https://api.x.ai/v1",
             )
+        return self._xai_client
+
+    def _make_gemini_client(self):
+        if self.base_url:
+            return genai.Client(
+                api_key=self.api_keys['gemini'],
+                http_options=types.HttpOptions(base_url=self.base_url),
+            )
+        return genai.Client(api_key=self.api_keys['gemini'])
+
+    def update_api_keys(self, api_keys):
+        self.api_keys = api_keys
+        self._client = None
+        self._xai_client = None
+        # Cached prefixes belong to the old key's project
+        if self.prompt_cache is not None:
+            self.prompt_cache = ContextCache()
 
     def update_model(self, model_name):
         self.model_name = model_name
 
-    def capture_screen(self, sct):
+    def capture_screen(self, sct, max_size=MAX_IMAGE_SIZE):
         # Capture the entire screen using the provided mss instance
         monitor = sct.monitors[1]
         screenshot = sct.grab(monitor)
+        bgra = screenshot.bgra
+        # Keep the native frame for ZOOM before it is gridded and downscaled
+        self.last_frame_id = self.frame_cache.put(tuple(screenshot.size), bgra)
         
-        img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+        img = Image.frombytes("RGB", screenshot.size, bgra, "raw", "BGRX")
         
         # Draw a semi-transparent grid overlay
         draw = ImageDraw.Draw(img, "RGBA")
@@ -211,33 +360,258 @@ class ComputerUseAgent:
             y = i * step_y
             draw.line([(0, y), (width, y)], fill=(255, 0, 0, 80), width=1)
 
-        # Increase max size for Agentic Vision (zooming)
-        # Gemini 3 Flash can handle large images well
-        max_size = 2048 # Increased from 1024 to allow better zooming
+        # ZOOM crops come from the full-resolution frame, so this only sizes the overview
         if img.width > max_size:
             ratio = max_size / img.width
-            img = img.resize((max_size, int(img.height * ratio)), Image.Resampling.BILINEar)
+            img = img.resize((max_size, int(img.height * ratio)), Image.Resampling.BILINEAR)
         
         return img
 
-    def _track_usage(self, response, log_func):
+    def _track_usage(self, response, log_func, turn=None, image_bytes=0, latency=0.0):
         if hasattr(response, 'usage_metadata') and response.usage_metadata:
             usage = response.usage_metadata
             input_tokens = usage.prompt_token_count or 0
             output_tokens = usage.candidates_token_count or 0
+            # Part of input_tokens, billed at the cached rate
+            cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
             
-            # Gemini 3 Pricing: $0.50/1M input, $3.00/1M output
-            current_cost = (input_tokens / 1_000_000) * 0.50 + (output_tokens / 1_000_000) * 3.00
+            current_cost = call_cost(self.task_model, input_tokens, output_tokens, cached_tokens)
             
             self.total_input_tokens += input_tokens
             self.total_output_tokens += output_tokens
             self.total_cost += current_cost
-            self.save_usage()
+            self.task_usage["input_tokens"] += input_tokens
+            self.task_usage["output_tokens"] += output_tokens
+            self.task_usage["cost"] += current_cost
+            # Buffered append; flushed by the ledger's background thread
+            self.ledger.record(
+                task_id=self.task_id,
+                turn=turn,
+                model=self.task_model,
+                action_mode=self.action_mode,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_tokens=cached_tokens,
+                image_bytes=image_bytes,
+                latency=round(latency, 4),
+            )
             
-            log_func(f"  [Usage] Input: {input_tokens}, Output: {output_tokens}, Cost: ${current_cost:.5f}")
+            log_func(f"  [Usage] Input: {input_tokens} ({cached_tokens} cached), Output: {output_tokens}, Cost: ${current_cost:.5f}")
             log_func(f"  [Total Usage] Input: {self.total_input_tokens}, Output: {self.total_output_tokens}, Total Cost: ${self.total_cost:.5f}")
 
-    def run_task(self, user_instruction, logger=None, status_callback=None):
+    def system_prompt(self, categories=None):
+        """The system instruction documenting the given action categories (all by default)."""
+        prompt = FUNCTION_SYSTEM_PROMPT if self.action_mode == "functions" else text_system_prompt(categories)
+        return prompt + (CODE_EXECUTION_PROMPT if self.code_execution else "") + (OCR_PROMPT if self.ocr else "")
+
+    def _request_tools(self, categories=None):
+        if self.action_mode == "functions":
+            names = None if categories is None else action_names(categories)
+        else:
+            # Text mode still declares ZOOM so crops can come back as function responses
+            names = ("ZOOM",)
+        if names not in self._declarations:
+            self._declarations[names] = action_declarations(names)
+        tools = [types.Tool(function_declarations=self._declarations[names])]
+        if self.code_execution:
+            tools.append(types.Tool(code_execution=types.ToolCodeExecution))
+        return tools
+
+    def _request_config(self, categories, log, inline=False):
+        """
+        Request config for the static prefix (system instruction and tools).
+        Returns (config, cache key); the key is None when the prefix is inline.
+        """
+        prompt = self.system_prompt(categories)
+        tools = self._request_tools(categories)
+        if self.prompt_cache is not None and not inline:
+            key = ContextCache.key(self.task_model, self.action_mode, categories, prompt)
+
+            def create(ttl):
+                cache = runtime.run(self.client.aio.caches.create(
+                    model=self.task_model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=prompt,
+                        tools=tools,
+                        ttl=f"{ttl}s",
+                        display_name="computer-use-prefix",
+                    )
+                ))
+                log(f"  [Cache] Stored the prompt prefix as {cache.name} for {ttl}s")
+                return cache.name
+
+            refused = self.prompt_cache.stats["refused"]
+            name = self.prompt_cache.get(key, create)
+            if name:
+                return types.GenerateContentConfig(cached_content=name, temperature=0.0), key
+            if self.prompt_cache.stats["refused"] > refused:
+                log(f"  [Cache] Prefix not cached, sending it inline: {self.prompt_cache.last_error}")
+        return types.GenerateContentConfig(system_instruction=prompt, tools=tools, temperature=0.0), None
+
+    def _generate(self, history, timer, turn, log, image_bytes=0, categories=None):
+        """
+        One model request, documenting the given action categories (all by
+        default). Returns (response_text, model_parts, zooms, calls):
+        zooms is a list of (function_call or None, (x1, y1, x2, y2)) to answer
+        locally (text replies that ask to ZOOM are treated the same way), calls
+        the other function calls in order.
+        """
+        with timer.stage("api", span="request"):
+            config, cache_key = self._request_config(categories, log)
+            api_start = time.perf_counter()
+            try:
+                response = runtime.run(self.client.aio.models.generate_content(
+                    model=self.task_model, contents=history, config=config))
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                if cache_key is None:
+                    raise
+                # The provider may have dropped the cache before its TTL; resend the prefix inline once
+                log(f"  [Cache] Cached request failed ({e}), retrying with the prefix inline")
+                self.prompt_cache.invalidate(cache_key)
+                config, _ = self._request_config(categories, log, inline=True)
+                api_start = time.perf_counter()
+                response = runtime.run(self.client.aio.models.generate_content(
+                    model=self.task_model, contents=history, config=config))
+        api_end = time.perf_counter()
+        self._track_usage(response, log, turn=turn, image_bytes=image_bytes,
+                          latency=api_end - api_start)
+        log(f"  [Time] API: {api_end - api_start:.3f}s")
+
+        response_text = ""
+        model_parts = []
+        zooms = []
+        calls = []
+        with self.tracer.span("parse", turn=turn):
+            candidate = response.candidates[0] if response.candidates else None
+            parts = (candidate.content.parts if candidate and candidate.content else None) or []
+            for part in parts:
+                if part.text:
+                    response_text += part.text + "\n"
+                    model_parts.append(types.Part.from_text(text=part.text))
+                if part.function_call:
+                    # Keep the original part so its id and thought signature go back unchanged
+                    model_parts.append(part)
+                    call = part.function_call
+                    if call.name == "zoom":
+                        args = call.args or {}
+                        try:
+                            region = tuple(int(args[k]) for k in ("x1", "y1", "x2", "y2"))
+                        except (KeyError, TypeError, ValueError):
+                            region = None
+                        zooms.append((call, region))
+                        log(f"  [Zoom] zoom({args})")
+                    else:
+                        calls.append(call)
+                if part.executable_code:
+                    log(f"  [Agentic Vision] Model is running code:\n{part.executable_code.code}")
+                    model_parts.append(part)
+                if part.code_execution_result:
+                    log(f"  [Agentic Vision] Code result: {part.code_execution_result.output}")
+                    model_parts.append(part)
+                if hasattr(part, 'inline_data') and part.inline_data and part.inline_data.mime_type.startswith('image/'):
+                    model_parts.append(part)
+
+        for line in response_text.splitlines():
+            if line.strip().upper().startswith("ACTION:"):
+                match = ZOOM_PATTERN.search(line)
+                if match:
+                    zooms.append((None, tuple(int(float(v)) for v in match.groups())))
+
+        if response_text:
+            log(f"Agent Response:\n{response_text}")
+        elif calls:
+            log("Agent Response: " + ", ".join(format_call(c.name, c.args) for c in calls))
+        return response_text, model_parts, zooms, calls
+
+    def _answer_zooms(self, zooms, frame_id, log, limit_reached=False, ignored_calls=()):
+        """
+        Crop each requested region from the cached full-resolution frame into
+        reply parts. Other function calls in a zooming reply are answered as
+        ignored, since every call needs a response before the next request.
+        """
+        parts = [function_response(call, {"status": "ignored", "reason": "Actions in a reply that zooms are not run. Call them again after seeing the crop."})
+                 for call in ignored_calls]
+        for call, region in zooms:
+            image_data = None
+            if limit_reached:
+                reply = {"error": f"Zoom limit of {MAX_ZOOM_ROUNDS} rounds per turn reached. Choose actions from what you have seen."}
+            elif region is None:
+                reply = {"error": "zoom needs integer x1, y1, x2, y2 in 0-1000."}
+            else:
+                crop = self.frame_cache.crop(*region, frame_id=frame_id)
+                if crop is None:
+                    reply = {"error": "The full-resolution frame is no longer cached."}
+                else:
+                    img, box = crop
+                    buf = io.BytesIO()
+                    img.save(buf, format="PNG")
+                    image_data = buf.getvalue()
+                    reply = {"region": list(region), "pixels": list(box), "size": list(img.size)}
+                    log(f"  [Zoom] {region} -> {box[2] - box[0]}x{box[3] - box[1]}px at {img.size[0]}x{img.size[1]}")
+
+            if call is not None:
+                response_parts = None
+                if image_data is not None:
+                    response_parts = [types.FunctionResponsePart.from_bytes(data=image_data, mime_type="image/png")]
+                parts.append(types.Part(function_response=types.FunctionResponse(
+                    id=call.id, name=call.name, response=reply, parts=response_parts)))
+            else:
+                label = f"ZOOM{tuple(region) if region else ''}: " + (reply.get("error") or "full-resolution crop attached.")
+                parts.append(types.Part.from_text(text=label))
+                if image_data is not None:
+                    parts.append(types.Part.from_bytes(data=image_data, mime_type="image/png"))
+        return parts
+
+    def _replay_skill(self, task, sct, log, update_status):
+        """
+        Run the library skill matching the task, if any. Returns None when no
+        skill matches, otherwise a dict with the skill id, steps run, the
+        labels of the actions run and the mismatch reason (None if completed).
+        """
+        match = self.skills.find(task)
+        if match is None:
+            return None
+        skill, values = match
+        log(f"  [Skill] {skill['id']} matches {skill['template']!r} with {values}")
+
+        def observe():
+            img = self.capture_screen(sct)
+            try:
+                screen_hash = _ahash(img)
+            except Exception:
+                screen_hash = None
+            return observation(self.ui_summary_provider(), screen_hash)
+
+        def act(name, args, label):
+            action = get_action(name)
+            update_status(action.status if action else "acting")
+            with self.tracer.span("execute_action", action=label[:80], skill=skill["id"]):
+                result = self.run_action(name, args, label)
+            time.sleep(0.05)
+            return result
+
+        with self.tracer.span("skill", skill=skill["id"], steps=len(skill["steps"])):
+            steps_run, labels, reason = run_skill(
+                skill, values, observe, act, should_stop=lambda: self.should_stop, log=log)
+        self.skills.record(skill, steps_run, reason)
+        stats = self.skills.stats
+        if reason is None:
+            log(f"  [Skill] Completed {skill['id']}: {steps_run} model turns saved")
+        else:
+            log(f"  [Skill] Handing back to the model after {steps_run}/{len(skill['steps'])} steps: {reason}")
+        log(f"  [Skill] Library: {stats['hits']} hits in {stats['lookups']} lookups, {stats['turns_saved']} turns saved")
+        return {"id": skill["id"], "steps": steps_run, "actions": labels, "reason": reason}
+
+    def run_task(self, user_instruction, logger=None, status_callback=None, timing_callback=None, sct=None,
+                 budget=None):
+        """
+        Run the agent loop until DONE, stop(), an error or an exhausted budget.
+        Pass a long-lived mss instance as sct to reuse the capture handle, and
+        budget limits as a dict (see budget.py; default from the environment).
+        Returns a result dict with status, turns, tokens, cost and per-stage seconds.
+        """
         def log(msg):
             if logger:
                 logger(msg)
@@ -248,14 +622,64 @@ class ComputerUseAgent:
             if status_callback:
                 status_callback(status)
 
+        def check_budget(turns):
+            """Update budget consumption, stepping down a level when needed; returns exhausted budgets."""
+            changed = budget.update(self.task_usage["input_tokens"] + self.task_usage["output_tokens"],
+                                    self.task_usage["cost"], turns)
+            if changed:
+                log(f"  [Budget] {budget.fraction() * 100:.0f}% used, stepping down to '{changed}'")
+                if budget.at_least("model") and self.task_model != budget.fallback_model:
+                    log(f"  [Budget] Switching model {self.task_model} -> {budget.fallback_model}")
+                    self.task_model = budget.fallback_model
+            return budget.exceeded()
+
+        def finish_turn(timer, img, turn_record):
+            event = timer.event()
+            if budget.enabled:
+                check_budget(event["turn"])
+                event["budget"] = budget.snapshot()
+                log(f"  [Budget] {format_budget(event['budget'])}")
+            task_result["turns"] = event["turn"]
+            for name, seconds in event["stages"].items():
+                task_result["stages"][name] = task_result["stages"].get(name, 0.0) + seconds
+            log(f"  [Time] Turn {event['turn']}: {format_breakdown(event)}")
+            if timing_callback:
+                timing_callback(event)
+            if recorder:
+                turn_record["timings"] = event
+                recorder.record_turn(event["turn"], img, turn_record, seconds=event["total"])
+
         log(f"Starting task with Agentic Vision: {user_instruction}")
         self.should_stop = False
+        reset_waits()
+        runtime.reset()
+        self.task_id = uuid.uuid4().hex[:12]
+        self.task_usage = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+        task_start = time.perf_counter()
+        task_result = {"task_id": self.task_id, "status": "stopped", "turns": 0, "turns_saved": 0,
+                       "text_turns": 0, "expectations": 0, "expectations_failed": 0, "skill": None, "stages": {},
+                       "error": None}
+        budget = self.budget = budget if isinstance(budget, TaskBudget) else TaskBudget(budget)
+        self.task_model = self.model_name
+
+        recorder = None
+        if self.record_sessions:
+            try:
+                pruned = prune_recordings(RECORDINGS_DIR,
+                                          float(os.environ.get("AGENT_RECORD_MAX_MB", MAX_RECORDINGS_MB)) * 1e6,
+                                          float(os.environ.get("AGENT_RECORD_MAX_DAYS", MAX_RECORDING_DAYS)) * 86400)
+                if pruned:
+                    log(f"  [Recorder] Deleted {pruned} old session(s) from {RECORDINGS_DIR}")
+                session_dir = os.path.join(RECORDINGS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.task_id}")
+                recorder = SessionRecorder(session_dir, task=user_instruction)
+            except Exception as e:
+                log(f"  [Recorder] Disabled: {e}")
         
-        # New SDK uses Content objects
-        history = [
-            types.Content(role="user", parts=[types.Part.from_text(text=SYSTEM_PROMPT)]),
-            types.Content(role="model", parts=[types.Part.from_text(text="Understood. I will use my Agentic Vision capabilities to help with your task.")])
-        ]
+        # The system prompt travels as the request's system instruction (see _request_config);
+        # the task is sent once, pinned as the first message
+        history = [types.Content(role="user", parts=[types.Part.from_text(text=task_message(user_instruction))])]
+        # Situational action categories this task has needed so far (see prompt_builder.py)
+        situational = set()
         
         recent_scroll_count = 0
         SCROLL_LOOP_THRESHOLD = 3
@@ -270,22 +694,80 @@ class ComputerUseAgent:
         UNCHANGED_HASH_DISTANCE_THRESHOLD = 3
         stuck_hint_cooldown = 0
         STUCK_HINT_COOLDOWN_TURNS = 3
+        turn = 0
+        # Turns whose UI element list is rich and stable go out without the screenshot
+        vision = ImagePolicy()
+        # Fingerprints of recent screens, for revisits and A->B->A cycles
+        screens = ScreenHistory()
+        # Per model turn: the observation the model acted on and the actions that ran
+        trajectory = [] if self.skills is not None else None
         
-        with mss.mss() as sct:
-            while not self.should_stop:
-                start_time = time.perf_counter()
+        screen = nullcontext(sct) if sct is not None else self.screen_factory()
+        with screen as sct:
+            if self.skills is not None:
+                try:
+                    replay = self._replay_skill(user_instruction, sct, log, update_status)
+                except Exception as e:
+                    log(f"  [Skill] Replay failed: {e}")
+                    replay = None
+                if replay is not None:
+                    task_result["skill"] = replay
+                    task_result["turns_saved"] = replay["steps"]
+                    if replay["actions"]:
+                        # Replays are not learned from; the model checks a completed replay
+                        # (one turn, DONE if the task is finished) or picks up mid-task
+                        trajectory = None
+                        if replay["reason"] is None:
+                            ending = ("They replayed a recorded skill to the end. Check the current screen: "
+                                      "call DONE if the task is complete, otherwise continue.")
+                        else:
+                            ending = f"They stopped because {replay['reason']}. Continue from the current screen."
+                        note = ("SYSTEM NOTE: These actions were already performed for this task: "
+                                + "; ".join(replay["actions"]) + ". " + ending)
+                        history.append(types.Content(role="user", parts=[types.Part.from_text(text=note)]))
+
+            while not self.should_stop and task_result["status"] != "done":
+                exceeded = check_budget(turn) if budget.enabled else None
+                if exceeded:
+                    report = format_budget(budget.snapshot())
+                    log(f"  [Budget] Aborting: {', '.join(exceeded)} budget used up. {report}")
+                    update_status("budget exceeded")
+                    task_result["status"] = "budget_exceeded"
+                    task_result["error"] = f"Budget exceeded ({', '.join(exceeded)}): {report}"
+                    break
+                turn += 1
+                timer = TurnTimer(turn, self.tracer)
                 update_status("looking")
                 log("Capturing screen...")
-                img = self.capture_screen(sct)
+                with timer.stage("capture"):
+                    img = self.capture_screen(sct, DEGRADED_IMAGE_SIZE if budget.at_least("image") else MAX_IMAGE_SIZE)
+                    frame_id = self.last_frame_id
+                    # EXPECT_CHANGE compares against the screen the model is about to see
+                    frame = self.frame_cache.get(frame_id)
+                    if frame is not None:
+                        set_expect_baseline(*frame)
                 
                 log("Extracting UI metadata...")
-                ui_metadata = get_ui_tree_summary()
+                with timer.stage("ui", span="ui_metadata"):
+                    ui_metadata = self.ui_summary_provider()
+                situational.update(situational_categories(user_instruction, ui_metadata))
+                categories = prefix_categories(situational, exclude=() if self.ocr else ("SCREEN TEXT",))
+                screen_text = ""
+                if self.ocr is not None and frame is not None:
+                    with timer.stage("ui", span="ocr"):
+                        ocr_stats = self.ocr.update(*frame)
+                    screen_text = self.ocr.summary()
+                    log(f"  [OCR] {ocr_stats['lines']} text lines; read {ocr_stats['tiles_ocr']}/{ocr_stats['tiles']} tiles "
+                        f"in {ocr_stats['seconds']:.2f}s")
 
                 # Loop detection
-                try:
-                    current_hash = _ahash(img)
-                except Exception:
-                    current_hash = None
+                with timer.stage("capture", span="hash"):
+                    try:
+                        # The fingerprint's global hash is the same 64-bit average hash as _ahash
+                        current_fp = fingerprint(img)
+                        current_hash = current_fp[0]
+                    except Exception:
+                        current_hash = current_fp = None
                 if current_hash is not None and prev_screen_hash is not None and prev_actions_executed > 0:
                     dist = _hamming_distance(prev_screen_hash, current_hash)
                     if dist <= UNCHANGED_HASH_DISTANCE_THRESHOLD:
@@ -297,82 +779,98 @@ class ComputerUseAgent:
                 prev_screen_hash = current_hash
                 if stuck_hint_cooldown > 0:
                     stuck_hint_cooldown -= 1
+                cycle_hint = None
+                if current_fp is not None:
+                    revisit = screens.add(turn, current_fp)
+                    cycle = screens.detect_cycle()
+                    if cycle:
+                        log(f"  [Loop] Screen cycle of {cycle['period']} turns (turns {cycle['turns'][0]}-{cycle['turns'][-1]})")
+                        if stuck_hint_cooldown == 0:
+                            # Told before this turn's request, so the loop is not walked once more
+                            cycle_hint = (f"SYSTEM HINT: You are going in circles. The screen is back where it was {cycle['period']} turns ago "
+                                          f"(turns {cycle['turns'][0]}-{cycle['turns'][-1]}), after: {'; '.join(cycle['actions']) or 'no actions'}. "
+                                          "Repeating these actions will not make progress; try a different approach.")
+                            stuck_hint_cooldown = STUCK_HINT_COOLDOWN_TURNS
+                            vision.request_image("screen cycle")
+                    elif revisit is not None:
+                        log(f"  [Loop] Screen matches turn {revisit}")
+                turn_steps = None
+                if trajectory is not None:
+                    turn_steps = {"observation": observation(ui_metadata, current_hash), "actions": []}
+                    trajectory.append(turn_steps)
                 
-                # Convert PIL to bytes for the new SDK
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='JPEG')
-                img_bytes = img_byte_arr.getvalue()
+                attach_image, image_reason = vision.decide(ui_metadata, current_hash)
+                img_bytes = b""
+                if attach_image:
+                    # Convert PIL to bytes for the new SDK
+                    with timer.stage("encode"):
+                        img_byte_arr = io.BytesIO()
+                        img.save(img_byte_arr, format='JPEG')
+                        img_bytes = img_byte_arr.getvalue()
+                else:
+                    log(f"  [Vision] Text-only turn ({image_reason})")
+                prompt_text = turn_prompt(ui_metadata, attach_image, screen_text)
                 
-                user_parts = [
-                    types.Part.from_text(text=f"Task: {user_instruction}\n\n{ui_metadata}\n\nCurrent screen state is attached. What are the next actions?"),
-                    types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg")
-                ]
+                if cycle_hint:
+                    prompt_text += "\n\n" + cycle_hint
+                    log("  [Hint] Injected screen-cycle hint")
+                turn_record = {"prompt": prompt_text, "image": attach_image, "actions": [], "results": []}
+                user_parts = [types.Part.from_text(text=prompt_text)]
+                if attach_image:
+                    user_parts.append(types.Part.from_bytes(data=img_bytes, mime_type="image/jpeg"))
                 history.append(types.Content(role="user", parts=user_parts))
                 
-                if len(history) > MAX_CONTEXT_MESSAGES + 1: # +1 for system prompt pair
-                    history = [history[0], history[1]] + history[-(MAX_CONTEXT_MESSAGES - 1):]
+                max_messages = DEGRADED_CONTEXT_MESSAGES if budget.at_least("context") else MAX_CONTEXT_MESSAGES
+                if len(history) > max_messages:
+                    history = prune_history(history, max_messages)
                     log(f"  [Context] Pruned history to {len(history)} items")
                 
                 try:
                     update_status("thinking")
-                    log(f"Sending to {self.model_name} (Agentic Vision enabled)...")
-                    api_start = time.perf_counter()
+                    log(f"Sending to {self.task_model} (Agentic Vision enabled)...")
                     
                     if self.model_name.startswith('grok'):
                         # Keep Grok support if needed, but here we focus on Gemini
                         # (Grok code remains similar but needs to adapt to history structure if used)
                         pass 
                     
-                    # Gemini call with Code Execution
-                    response = self.client.models.generate_content(
-                        model=self.model_name,
-                        contents=history,
-                        config=types.GenerateContentConfig(
-                            tools=[types.Tool(code_execution=types.ToolCodeExecution)],
-                            temperature=0.0
-                        )
-                    )
-                    self._track_usage(response, log)
-                    
-                    api_end = time.perf_counter()
-                    log(f"  [Time] API: {api_end - api_start:.3f}s")
-                    
-                    # The response can have multiple parts
-                    response_text = ""
-                    executable_code = ""
-                    code_result = ""
-                    images_from_model = []
-                    
-                    model_parts = []
-                    for part in response.candidates[0].content.parts:
-                        if part.text:
-                            response_text += part.text + "\n"
-                            model_parts.append(types.Part.from_text(text=part.text))
-                        if part.executable_code:
-                            executable_code = part.executable_code.code
-                            log(f"  [Agentic Vision] Model is running code:\n{executable_code}")
-                            model_parts.append(part)
-                        if part.code_execution_result:
-                            code_result = part.code_execution_result.output
-                            log(f"  [Agentic Vision] Code result: {code_result}")
-                            model_parts.append(part)
-                        if hasattr(part, 'inline_data') and part.inline_data and part.inline_data.mime_type.startswith('image/'):
-                             images_from_model.append(part)
-                             model_parts.append(part)
-                    
-                    if response_text:
-                        log(f"Agent Response:\n{response_text}")
-                    
+                    response_text, model_parts, zooms, calls = self._generate(history, timer, turn, log, len(img_bytes),
+                                                                              categories)
                     history.append(types.Content(role="model", parts=model_parts))
+
+                    # ZOOM is answered locally from the full-resolution frame, within this turn
+                    zoom_round = 0
+                    while zooms and not self.should_stop:
+                        zoom_round += 1
+                        if zoom_round > MAX_ZOOM_ROUNDS:
+                            history.append(types.Content(role="user", parts=self._answer_zooms(
+                                zooms, frame_id, log, limit_reached=True, ignored_calls=calls)))
+                            response_text, calls = "", []
+                            break
+                        update_status("zooming")
+                        with timer.stage("execute", span="zoom", count=len(zooms)):
+                            answer = self._answer_zooms(zooms, frame_id, log, ignored_calls=calls)
+                        turn_record.setdefault("zooms", []).extend(region for _, region in zooms)
+                        history.append(types.Content(role="user", parts=answer))
+                        update_status("thinking")
+                        response_text, model_parts, zooms, calls = self._generate(history, timer, turn, log, 0, categories)
+                        history.append(types.Content(role="model", parts=model_parts))
                     
-                    # Execute all actions found in the response_text
+                    turn_record["response"] = response_text
+                    
+                    # Function calls first, then any ACTION lines in the text (text mode, or a fallback)
+                    planned = plan_actions(calls, response_text)
                     actions_executed = 0
-                    execution_start = time.perf_counter()
                     action_results = []
+                    call_replies = []
                     is_done = False
+                    # A failed EXPECT ends the plan; later steps are answered as not run
+                    plan_failure = None
+                    not_run = []
 
-                    action_lines = [l.strip() for l in response_text.splitlines() if l.strip().upper().startswith("ACTION:") and "DONE" not in l.upper()]
-                    action_signature = "\n".join(action_lines)
+                    action_signature = "\n".join(a["label"] for a in planned if a["name"] not in ("DONE", "ZOOM", "SCREENSHOT"))
+                    if not action_signature:
+                        vision.request_image("no actions last turn")
 
                     if not action_signature:
                         consecutive_no_action_count += 1
@@ -389,150 +887,160 @@ class ComputerUseAgent:
                     stuck_repeat = repeated_action_signature_count >= STUCK_REPEAT_THRESHOLD
                     stuck_unchanged = unchanged_after_actions_count >= STUCK_UNCHANGED_THRESHOLD
                     stuck_no_actions = not action_signature and consecutive_no_action_count >= 2
-                    
-                    if (stuck_repeat or stuck_unchanged or stuck_no_actions) and stuck_hint_cooldown == 0:
-                        hint = "SYSTEM HINT: You appear stuck. Try a different approach or use your Agentic Vision (Python code) to zoom and inspect the UI if it's unclear."
-                        history.append(types.Content(role="user", parts=[types.Part.from_text(text=hint)]))
-                        log("  [Hint] Injected stuck-loop correction hint")
-                        stuck_hint_cooldown = STUCK_HINT_COOLDOWN_TURNS
-
                     skip_actions_this_turn = stuck_repeat and stuck_unchanged
                     
-                    for line in response_text.splitlines():
-                        if self.should_stop: break
-                        line_upper = line.strip().upper()
-                        if line_upper.startswith("ACTION:"):
-                            if "DONE" in line_upper:
-                                log("Task completed signal received.")
-                                update_status("done")
-                                is_done = True
-                                continue
-                            if skip_actions_this_turn: continue
-                                
-                            log(f"  > {line.strip()}")
-                            # Update status
-                            act = line_upper
-                            if "CLICK" in act or "DRAG" in act: update_status("clicking")
-                            elif "TYPE" in act: update_status("typing")
-                            elif "SCROLL" in act: update_status("scrolling")
-                            elif "WAIT" in act: update_status("waiting")
-                            else: update_status("acting")
+                    for planned_action in planned:
+                        name, call = planned_action["name"], planned_action["call"]
+                        reply = {"status": "ok"}
+                        if self.should_stop:
+                            reply = {"status": "not run", "reason": "Task stopped."}
+                        elif plan_failure is not None:
+                            reply = {"status": "not run", "reason": "An earlier expectation failed."}
+                            if name not in ("ZOOM", "SCREENSHOT"):
+                                not_run.append(planned_action["label"])
+                        elif name == "DONE":
+                            log("Task completed signal received.")
+                            update_status("done")
+                            is_done = True
+                        elif name == "ZOOM":
+                            pass  # already answered before actions
+                        elif name == "SCREENSHOT":
+                            vision.request_image("requested by the model")
+                            reply = {"status": "ok", "result": "The next turn will include a screenshot."}
+                        elif skip_actions_this_turn:
+                            reply = {"status": "skipped", "reason": "Repeated action with no screen change."}
+                        else:
+                            log(f"  > {planned_action['label']}")
+                            action = get_action(name) if name else None
+                            update_status(action.status if action else "acting")
                             
-                            result = self.execute_action(line)
-                            if result: action_results.append(result)
+                            with timer.stage("execute", span="execute_action", action=planned_action["label"][:80]):
+                                result = self.run_action(name, planned_action["args"], planned_action["label"])
+                            if result:
+                                action_results.append(result)
+                                reply = {"status": "done", "result": result}
+                                if str(result).startswith(FAILED_RESULTS):
+                                    vision.request_image("an action failed")
+                                if str(result).startswith(EXPECT_FAILED):
+                                    plan_failure = result
+                                    task_result["expectations_failed"] += 1
+                            if name and name.startswith("EXPECT_"):
+                                task_result["expectations"] += 1
+                            turn_record["actions"].append(planned_action["label"])
+                            if turn_steps is not None:
+                                turn_steps["actions"].append((name, planned_action["args"], result))
                             actions_executed += 1
-                            time.sleep(0.05)
+                            if not self.should_stop:
+                                with timer.stage("settle", span="sleep"):
+                                    time.sleep(0.05)
+                        if call is not None:
+                            call_replies.append(function_response(call, reply))
                     
-                    if action_results:
+                    if not_run:
+                        log(f"  [Plan] Expectation failed; skipped {len(not_run)} remaining step(s): {'; '.join(not_run)}")
+                        action_results.append("Not run because an expectation failed: " + "; ".join(not_run))
+                    turn_record["results"] = action_results
+                    screens.set_actions(turn, turn_record["actions"])
+                    if call_replies:
+                        # Every function call is answered, in order, before anything else is added
+                        history.append(types.Content(role="user", parts=call_replies))
+                    elif action_results:
                         res_text = "Action results:\n" + "\n".join(action_results)
                         history.append(types.Content(role="user", parts=[types.Part.from_text(text=res_text)]))
+
+                    if (stuck_repeat or stuck_unchanged or stuck_no_actions) and stuck_hint_cooldown == 0:
+                        hint = "SYSTEM HINT: You appear stuck. Try a different approach or ZOOM to inspect the UI if it's unclear."
+                        history.append(types.Content(role="user", parts=[types.Part.from_text(text=hint)]))
+                        log("  [Hint] Injected stuck-loop correction hint")
+                        vision.request_image("stuck-loop hint")
+                        stuck_hint_cooldown = STUCK_HINT_COOLDOWN_TURNS
                     
-                    if is_done: break
+                    if is_done:
+                        task_result["status"] = "done"
+                        finish_turn(timer, img, turn_record)
+                        break
                     
                     prev_actions_executed = actions_executed
-                    time.sleep(0.1)
+                    if not self.should_stop:
+                        with timer.stage("settle", span="sleep"):
+                            time.sleep(0.1)
+                    finish_turn(timer, img, turn_record)
                     
+                except TaskCancelled:
+                    log("Task stopped while waiting on the model, a command or an action.")
+                    turn_record["error"] = "stopped"
+                    finish_turn(timer, img, turn_record)
+                    break
                 except Exception as e:
                     log(f"Error during agent execution: {e}")
                     import traceback
-                    traceback.print_exc()
+                    # Innermost frames only, through the bounded log rather than raw stderr
+                    log(traceback.format_exc(limit=-TRACEBACK_FRAMES).rstrip())
+                    turn_record["error"] = str(e)
+                    task_result["status"] = "error"
+                    task_result["error"] = str(e)
+                    finish_turn(timer, img, turn_record)
                     break
 
+        if trajectory and task_result["status"] == "done":
+            try:
+                skill = self.skills.add(user_instruction, trajectory)
+                if skill:
+                    log(f"  [Skill] Saved {skill['id']} ({len(skill['steps'])} steps): {skill['template']!r}")
+            except Exception as e:
+                log(f"  [Skill] Could not compile skill: {e}")
+
+        if recorder:
+            try:
+                stats = recorder.close()
+                log(f"  [Recorder] {stats['turns']} turns, {stats['bytes'] / 1e6:.2f} MB "
+                    f"({stats['bytes_per_hour'] / 1e6:.1f} MB per agent hour) in {recorder.directory}")
+            except Exception as e:
+                log(f"  [Recorder] Close failed: {e}")
+
+        if self.tracer.enabled:
+            try:
+                trace_path = self.tracer.export_session()
+                log(f"  [Trace] {len(self.tracer)} spans written to {trace_path}")
+            except Exception as e:
+                log(f"  [Trace] Export failed: {e}")
+
+        task_result["text_turns"] = vision.text_turns
+        if vision.turns:
+            log(f"  [Vision] {vision.text_turns}/{vision.turns} turns text-only ({vision.text_fraction:.0%})")
+        task_result.update(self.task_usage)
+        if budget.enabled:
+            task_result["budget"] = budget.snapshot()
+        task_result["seconds"] = time.perf_counter() - task_start
+        return task_result
+
     def execute_action(self, action_line):
-        """Executes an action and returns a result string if any (e.g., shell output)"""
-        # Improved parser for the action string
-        import re
-        
-        match = re.search(r"ACTION:\s*(\w+)\((.*)\)", action_line, re.IGNORECASE)
-        if not match:
+        """Executes an ACTION line and returns a result string if any (e.g., shell output)"""
+        parsed = parse_action_line(action_line)
+        if not parsed:
             print("Could not parse action from response.")
             return None
+        return self.run_action(parsed[0], parsed[1])
 
-        action_name = match.group(1).upper()
-        params_str = match.group(2)
-        # Parse parameters, handling potential quotes
-        params = []
-        for p in re.split(r',\s*(?=(?:[^"]*"[^"]*")*[^"]*$)', params_str):
-            p = p.strip().strip("'").strip('"')
-            params.append(p)
-
-        action_result = None
-        try:
-            start_time = time.perf_counter()
-            if action_name == "CLICK":
-                click(int(params[0]), int(params[1]))
-            elif action_name == "DOUBLE_CLICK":
-                double_click(int(params[0]), int(params[1]))
-            elif action_name == "TRIPLE_CLICK":
-                triple_click(int(params[0]), int(params[1]))
-            elif action_name == "RIGHT_CLICK":
-                right_click(int(params[0]), int(params[1]))
-            elif action_name == "MIDDLE_CLICK":
-                middle_click(int(params[0]), int(params[1]))
-            elif action_name == "MOVE_MOUSE":
-                move_mouse(int(params[0]), int(params[1]))
-            elif action_name == "CLICK_AND_HOLD":
-                duration = float(params[2]) if len(params) > 2 else 1.0
-                click_and_hold(int(params[0]), int(params[1]), duration)
-            elif action_name == "SHIFT_CLICK":
-                shift_click(int(params[0]), int(params[1]))
-            elif action_name == "CTRL_CLICK":
-                ctrl_click(int(params[0]), int(params[1]))
-            elif action_name == "ALT_CLICK":
-                alt_click(int(params[0]), int(params[1]))
-            elif action_name == "TYPE":
-                type_text(params[0])
-            elif action_name == "TYPE_UNICODE":
-                type_unicode(params[0])
-            elif action_name == "CLEAR_FIELD":
-                clear_field(int(params[0]), int(params[1]))
-            elif action_name == "PRESS":
-                press_key(params[0])
-            elif action_name == "HOLD_KEY":
-                duration = float(params[1]) if len(params) > 1 else 0.5
-                hold_key(params[0], duration)
-            elif action_name == "HOTKEY":
-                hotkey(*params)
-            elif action_name == "SCROLL":
-                scroll(int(params[0]))
-            elif action_name == "SCROLL_AT":
-                scroll_at(int(params[0]), int(params[1]), int(params[2]))
-            elif action_name == "HORIZONTAL_SCROLL":
-                horizontal_scroll(int(params[0]))
-            elif action_name == "DRAG":
-                drag(int(params[0]), int(params[1]), int(params[2]), int(params[3]))
-            elif action_name == "COPY":
-                copy_to_clipboard()
-            elif action_name == "PASTE":
-                paste_from_clipboard()
-            elif action_name == "SET_CLIPBOARD":
-                set_clipboard(params[0])
-            elif action_name == "SHELL":
-                action_result = run_shell_command(params[0])
-                if action_result:
-                    print(f"Shell output: {action_result}")
-            elif action_name == "OPEN_APP":
-                success, method = open_app(params[0])
-                if not success:
-                    action_result = f"Failed to open app {params[0]}"
-                    print(action_result)
-                else:
-                    action_result = f"App {params[0]} {method} successfully."
-            elif action_name == "WAIT":
-                # Cap wait time to 1 second max to prevent slowdowns
-                wait_time = min(float(params[0]), 1.0)
-                time.sleep(wait_time)
-            elif action_name in ("MAXIMIZE_WINDOW", "MAXIMIZE_ACTIVE_WINDOW", "MAXIMIZE"):
-                success, reason = maximize_active_window()
-                if not success and reason not in ('already_maximized', 'skip_process'):
-                    action_result = f"Maximize window: {reason}"
-                    print(action_result)
-            else:
-                action_result = f"Unknown action: {action_name}"
-                print(action_result)
-            
+    def run_action(self, action_name, args, label=None):
+        """
+        Run a registered action with positional text arguments or a
+        function-call args dict. Returns a result string if any.
+        """
+        if not action_name:
+            message = f"Could not parse action: {label}"
+            print(message)
+            return message
+        action = get_action(action_name)
+        if action is None or action.func is None:
+            action_result = f"Unknown action: {action_name}"
+            print(action_result)
             return action_result
-            
+        try:
+            # Input runs on the runtime's input thread so a stop releases this thread at once
+            return runtime.call_input(action.call, args)
+        except TaskCancelled:
+            return f"Action {action_name} cancelled: the task was stopped."
         except Exception as e:
             error_msg = f"Error executing action {action_name}: {e}"
             print(error_msg)
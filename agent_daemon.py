@@ -0,0 +1,626 @@
+"""
+Agent Daemon - headless task runner with a local submission API.
+
+Keeps one warm ComputerUseAgent (model client, screen capture handle, UI
+inspector and window manager backends) and runs submitted tasks one at a
+time from a queue. Progress is streamed as newline-delimited JSON events.
+
+Endpoints (HTTP on 127.0.0.1, or over a Unix socket with --socket):
+    POST /tasks                    {"instruction": "...", "model": optional, "budget": optional} -> 202 {"id": ...}
+    GET  /tasks                    recent tasks, newest first
+    GET  /tasks/<id>               status, result and metrics of one task
+    GET  /tasks/<id>/events        NDJSON events; ?since=N to resume, ?follow=0 to not wait
+    POST /tasks/<id>/stop          cancel a queued task or stop the running one
+    GET  /health                   uptime, queue depth, warm-up time, usage totals
+    GET  /profile                  whether the sampling profiler runs, last profile written
+    POST /profile                  {"enabled": true|false}; stopping writes the profile (see profiler.py)
+
+Every request needs "Authorization: Bearer <token>", with the token from
+~/.agent_daemon_token (created with mode 0600 on first start; --token-file
+to move it). POST bodies must be sent as application/json, and requests
+with a Host or Origin other than the daemon's own local address are
+refused, so a web page in a local browser cannot reach the API.
+
+Usage:
+    python agent_daemon.py --port 8770
+    python agent_daemon.py --socket /tmp/agent.sock
+    python agent_daemon.py --submit "Open notepad and type hello" --follow
+    python agent_daemon.py --profile               # sample the whole session, written on exit
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import socket
+import signal
+import secrets
+import argparse
+import threading
+import http.client
+import socketserver
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from profiler import profiler, requested as profiler_requested
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+MAX_TASKS_KEPT = 100
+MAX_EVENTS_PER_TASK = 5000
+FINISHED_STATES = ("done", "stopped", "error", "cancelled", "budget_exceeded")
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".agent_daemon_token")
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "[::1]")
+
+
+def load_token(path=DEFAULT_TOKEN_FILE, create=False):
+    """
+    Read the API token from path; with create, write a new random one first
+    if the file does not exist (readable by its owner only).
+    Raises OSError when the file is missing and create is false.
+    """
+    if create and not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_urlsafe(32) + "\n")
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+class DaemonTask:
+    """One submitted task and its event stream."""
+
+    def __init__(self, task_id, instruction, model=None, budget=None):
+        self.id = task_id
+        self.instruction = instruction
+        self.model = model
+        self.budget = budget
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.stop_requested = False
+        self.events = []
+        self.dropped_events = 0
+
+    @property
+    def finished_state(self):
+        return self.status in FINISHED_STATES
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "instruction": self.instruction,
+            "model": self.model,
+            "budget": self.budget,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "queue_seconds": (self.started - self.submitted) if self.started else None,
+            "result": self.result,
+            "events": len(self.events) + self.dropped_events,
+        }
+
+
+class AgentDaemon:
+    """
+    Owns the warm agent and a single worker thread.
+    The mss handle and UI inspector are created on the worker thread, since
+    both backends are tied to the thread that initialised them.
+    """
+
+    def __init__(self, api_keys, model_name="gemini-3-flash-preview", max_tasks=MAX_TASKS_KEPT):
+        from agent import ComputerUseAgent
+        self.agent = ComputerUseAgent(api_keys=api_keys, model_name=model_name)
+        self.default_model = model_name
+        self.max_tasks = max_tasks
+        self.tasks = {}
+        self.started = time.time()
+        self.warmup_seconds = None
+        self.current = None
+        self._order = []
+        self._next_id = 1
+        self._queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._ready = threading.Event()
+        self._closing = False
+        self.last_profile = None
+        self._thread = threading.Thread(target=self._worker, name="agent-daemon", daemon=True)
+
+    def start(self, wait=True):
+        self._thread.start()
+        if wait:
+            self._ready.wait()
+        return self
+
+    # ------------------------------------------------------------------
+    # Task API
+    # ------------------------------------------------------------------
+
+    def submit(self, instruction, model=None, budget=None):
+        with self._cond:
+            task_id = f"{self._next_id:06d}"
+            self._next_id += 1
+            task = DaemonTask(task_id, instruction, model, budget)
+            self.tasks[task_id] = task
+            self._order.append(task_id)
+            self._trim()
+            self._emit(task, "queued", {"position": self._queue.qsize()})
+        self._queue.put(task)
+        return task
+
+    def stop_task(self, task_id):
+        """Returns (success, reason)."""
+        with self._cond:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return False, "unknown task"
+            if task.finished_state:
+                return False, task.status
+            task.stop_requested = True
+            if task.status == "queued":
+                task.status = "cancelled"
+                task.finished = time.time()
+                self._emit(task, "result", {"status": "cancelled"})
+                return True, "cancelled"
+        self.agent.stop()
+        return True, "stopping"
+
+    def get(self, task_id):
+        with self._cond:
+            task = self.tasks.get(task_id)
+            return task.to_dict() if task else None
+
+    def list(self):
+        with self._cond:
+            return [self.tasks[t].to_dict() for t in reversed(self._order)]
+
+    def events(self, task_id, since=0, timeout=None):
+        """
+        Events with seq >= since. With a timeout, waits until there are new
+        events or the task finishes. Returns (events, finished) or None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                task = self.tasks.get(task_id)
+                if task is None:
+                    return None
+                first = task.dropped_events
+                new = task.events[max(0, since - first):]
+                if new or task.finished_state or timeout is None:
+                    return list(new), task.finished_state
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], False
+                self._cond.wait(remaining)
+
+    def health(self):
+        with self._cond:
+            states = {}
+            for task in self.tasks.values():
+                states[task.status] = states.get(task.status, 0) + 1
+            return {
+                "ready": self._ready.is_set(),
+                "uptime": time.time() - self.started,
+                "warmup_seconds": self.warmup_seconds,
+                "queue_depth": self._queue.qsize(),
+                "current": self.current,
+                "tasks": states,
+                "model": self.default_model,
+                "input_tokens": self.agent.total_input_tokens,
+                "output_tokens": self.agent.total_output_tokens,
+                "cost": self.agent.total_cost,
+                "profiling": profiler.enabled,
+                "skills": dict(self.agent.skills.stats, count=len(self.agent.skills.skills)) if self.agent.skills else None,
+            }
+
+    def profile(self, enabled):
+        """Start or stop the sampling profiler; stopping writes the profile."""
+        if enabled:
+            profiler.start()
+        else:
+            path = profiler.stop()
+            if path:
+                self.last_profile = path
+        return self.profile_status()
+
+    def profile_status(self):
+        return {"enabled": profiler.enabled, "session": profiler.session, "samples": profiler.samples,
+                "last_profile": self.last_profile}
+
+    def close(self):
+        self._closing = True
+        with self._cond:
+            running = self.current
+        if running:
+            self.stop_task(running)
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+        self.agent.ledger.close()
+        if profiler.enabled:
+            self.profile(False)
+            print(f"Profile written to {self.last_profile}")
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._cond where noted)
+    # ------------------------------------------------------------------
+
+    def _emit(self, task, kind, data):
+        """Append an event and wake streaming readers. Caller holds self._cond."""
+        seq = len(task.events) + task.dropped_events
+        task.events.append({"seq": seq, "time": time.time(), "kind": kind, **data})
+        if len(task.events) > MAX_EVENTS_PER_TASK:
+            del task.events[0]
+            task.dropped_events += 1
+        self._cond.notify_all()
+
+    def _post(self, task, kind, data):
+        with self._cond:
+            self._emit(task, kind, data)
+
+    def _trim(self):
+        """Forget the oldest finished tasks beyond max_tasks. Caller holds self._cond."""
+        excess = len(self._order) - self.max_tasks
+        for task_id in list(self._order):
+            if excess <= 0:
+                break
+            if self.tasks[task_id].finished_state:
+                self._order.remove(task_id)
+                del self.tasks[task_id]
+                excess -= 1
+
+    def _warm_up(self):
+        """Build the model client and open capture, inspector and window manager handles once."""
+        start = time.perf_counter()
+        self.agent.client  # builds the model client (and imports its SDK) now rather than on the first task
+        sct = self.agent.screen_factory()
+        try:
+            self.agent.capture_screen(sct)
+        except Exception as e:
+            print(f"Daemon warm-up capture failed: {e}")
+        try:
+            self.agent.ui_summary_provider()
+        except Exception as e:
+            print(f"Daemon warm-up UI inspector failed: {e}")
+        try:
+            from window_manager import get_window_manager
+            get_window_manager()
+        except Exception as e:
+            print(f"Daemon warm-up window manager failed: {e}")
+        self.warmup_seconds = time.perf_counter() - start
+        return sct
+
+    def _worker(self):
+        sct = self._warm_up()
+        self._ready.set()
+        try:
+            while True:
+                task = self._queue.get()
+                if task is None:
+                    return
+                with self._cond:
+                    if task.status != "queued":
+                        continue
+                    task.status = "running"
+                    task.started = time.time()
+                    self.current = task.id
+                    self._emit(task, "started", {"queue_seconds": task.started - task.submitted})
+                self._run(task, sct)
+                with self._cond:
+                    self.current = None
+        finally:
+            sct.close()
+
+    def _run(self, task, sct):
+        agent = self.agent
+
+        def log(msg):
+            # run_task clears should_stop on entry; re-apply a stop that raced it
+            if task.stop_requested:
+                agent.stop()
+            self._post(task, "log", {"message": msg})
+
+        agent.update_model(task.model or self.default_model)
+        result = None
+        try:
+            result = agent.run_task(
+                task.instruction,
+                logger=log,
+                status_callback=lambda status: self._post(task, "status", {"status": status}),
+                timing_callback=lambda event: self._post(task, "timing", event),
+                sct=sct,
+                budget=task.budget,
+            )
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        with self._cond:
+            task.result = result
+            task.status = result.get("status", "error")
+            if task.stop_requested and task.status != "error":
+                task.status = "stopped"
+            task.finished = time.time()
+            self._emit(task, "result", {"status": task.status, "result": result})
+
+
+# ----------------------------------------------------------------------
+# HTTP API
+# ----------------------------------------------------------------------
+
+def make_handler(daemon, token):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "AgentDaemon/1.0"
+
+        def _local_name(self, value):
+            """True for localhost names, with the daemon's port or none."""
+            address = self.server.server_address
+            hosts, port = LOCAL_HOSTS, None
+            if isinstance(address, tuple):
+                hosts, port = LOCAL_HOSTS + (address[0],), address[1]
+            return any(value == host or (port and value == f"{host}:{port}") for host in hosts)
+
+        def _authorized(self):
+            """Refuse foreign Host/Origin headers and missing or wrong tokens; sends the error itself."""
+            host = (self.headers.get("Host") or "").lower()
+            origin = (self.headers.get("Origin") or "").lower()
+            if not self._local_name(host):
+                self._send(403, {"error": "foreign Host header"})
+                return False
+            if origin and not self._local_name(urlparse(origin).netloc):
+                self._send(403, {"error": "cross-origin requests are not allowed"})
+                return False
+            scheme, _, value = (self.headers.get("Authorization") or "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(value.strip().encode(), token.encode()):
+                self._send(401, {"error": "missing or invalid token"}, {"WWW-Authenticate": "Bearer"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            query = parse_qs(url.query)
+            if parts == ["health"]:
+                self._send(200, daemon.health())
+            elif parts == ["profile"]:
+                self._send(200, daemon.profile_status())
+            elif parts == ["tasks"]:
+                self._send(200, {"tasks": daemon.list()})
+            elif len(parts) == 2 and parts[0] == "tasks":
+                task = daemon.get(parts[1])
+                if task is None:
+                    self._send(404, {"error": "unknown task"})
+                else:
+                    self._send(200, task)
+            elif len(parts) == 3 and parts[0] == "tasks" and parts[2] == "events":
+                since = query.get("since", ["0"])[0]
+                if not since.isdecimal():
+                    self._send(400, {"error": "since must be a non-negative integer"})
+                    return
+                since = int(since)
+                follow = query.get("follow", ["1"])[0] != "0"
+                self._stream_events(parts[1], since, follow)
+            else:
+                self._send(404, {"error": f"unknown route {url.path}"})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            # A browser sends text/plain and form bodies cross-origin without a preflight; JSON it won't
+            if (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() != "application/json":
+                self._send(415, {"error": "Content-Type must be application/json"})
+                return
+            parts = [p for p in urlparse(self.path).path.split("/") if p]
+            try:
+                body = self._read_json()
+            except ValueError:
+                self._send(400, {"error": "invalid JSON"})
+                return
+            if parts == ["tasks"]:
+                instruction = (body.get("instruction") or "").strip()
+                if not instruction:
+                    self._send(400, {"error": "instruction is required"})
+                    return
+                budget = body.get("budget")
+                if budget is not None and not isinstance(budget, dict):
+                    self._send(400, {"error": "budget must be an object of limits"})
+                    return
+                task = daemon.submit(instruction, body.get("model"), budget)
+                self._send(202, {"id": task.id, "status": task.status})
+            elif parts == ["profile"]:
+                if not isinstance(body.get("enabled"), bool):
+                    self._send(400, {"error": "enabled must be true or false"})
+                    return
+                self._send(200, daemon.profile(body["enabled"]))
+            elif len(parts) == 3 and parts[0] == "tasks" and parts[2] == "stop":
+                ok, reason = daemon.stop_task(parts[1])
+                self._send(200 if ok else 409, {"ok": ok, "reason": reason})
+            else:
+                self._send(404, {"error": "unknown route"})
+
+        def _stream_events(self, task_id, since, follow):
+            first = daemon.events(task_id, since)
+            if first is None:
+                self._send(404, {"error": "unknown task"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            events, finished = first
+            try:
+                while True:
+                    for event in events:
+                        self.wfile.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+                        since = event["seq"] + 1
+                    self.wfile.flush()
+                    if finished or not follow:
+                        return
+                    events, finished = daemon.events(task_id, since, timeout=15.0)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw) if raw else {}
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self):
+            # Unix-socket peers have no (host, port) address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        # Created owner-only: a chmod after bind would leave the socket open to others briefly
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def make_server(daemon, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, token=None):
+    """HTTP server for the daemon; token defaults to the one in DEFAULT_TOKEN_FILE (created if missing)."""
+    handler = make_handler(daemon, token or load_token(create=True))
+    if socket_path:
+        return UnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# ----------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def _connect(host, port, socket_path):
+    if socket_path:
+        return _UnixHTTPConnection(socket_path)
+    return http.client.HTTPConnection(host, port)
+
+
+def submit_task(instruction, model=None, follow=False, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None,
+                token_file=DEFAULT_TOKEN_FILE):
+    """Submit a task to a running daemon; with follow, print its events until it finishes."""
+    auth = {"Authorization": f"Bearer {load_token(token_file)}"}
+    conn = _connect(host, port, socket_path)
+    body = {"instruction": instruction}
+    if model:
+        body["model"] = model
+    conn.request("POST", "/tasks", json.dumps(body), dict(auth, **{"Content-Type": "application/json"}))
+    reply = json.loads(conn.getresponse().read())
+    conn.close()
+    if "id" not in reply:
+        print(f"Submit failed: {reply.get('error')}")
+        return None
+    print(f"submitted task {reply['id']}")
+    if not follow:
+        return reply
+
+    conn = _connect(host, port, socket_path)
+    conn.request("GET", f"/tasks/{reply['id']}/events", headers=auth)
+    resp = conn.getresponse()
+    last = None
+    for line in resp:
+        event = json.loads(line)
+        last = event
+        if event["kind"] == "log":
+            print(event["message"])
+        elif event["kind"] == "result":
+            result = event.get("result") or {}
+            print(f"[{event['status']}] turns={result.get('turns')} "
+                  f"tokens={result.get('input_tokens')}/{result.get('output_tokens')} "
+                  f"cost=${result.get('cost', 0.0):.4f} seconds={result.get('seconds', 0.0):.1f}")
+    conn.close()
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Serve (or connect) on a Unix socket instead of TCP")
+    parser.add_argument("--model", default=None, help="Model name (daemon default, or per submitted task)")
+    parser.add_argument("--submit", metavar="INSTRUCTION", help="Submit a task to a running daemon and exit")
+    parser.add_argument("--follow", action="store_true", help="With --submit, stream events until the task ends")
+    parser.add_argument("--profile", action="store_true", help="Run the sampling profiler for the whole session")
+    parser.add_argument("--token-file", default=DEFAULT_TOKEN_FILE, help="API token file (created on first start)")
+    args = parser.parse_args()
+
+    if args.submit:
+        try:
+            last = submit_task(args.submit, args.model, args.follow, args.host, args.port, args.socket, args.token_file)
+        except OSError as e:
+            print(f"Cannot reach the daemon: {e}")
+            return 1
+        return 0 if last and last.get("status") in (None, "queued", "done") else 1
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    gemini_key = os.environ.get("GOOGLE_API_KEY", "").strip()
+    if not gemini_key:
+        print("Gemini API Key (GOOGLE_API_KEY) not found in environment.")
+        return 1
+
+    daemon = AgentDaemon({"gemini": gemini_key}, model_name=args.model or "gemini-3-flash-preview")
+    if profiler_requested(args.profile):
+        daemon.profile(True)
+    daemon.start()
+    print(f"Agent warm in {daemon.warmup_seconds:.2f}s")
+    server = make_server(daemon, args.host, args.port, args.socket, load_token(args.token_file, create=True))
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Agent daemon listening on {where}")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
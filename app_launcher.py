@@ -0,0 +1,318 @@
+"""
+App Launcher - index of installed applications with fuzzy name lookup.
+
+Linux entries come from XDG .desktop files, Windows entries from Start menu
+shortcuts. The index is persisted to disk and refreshed incrementally: only
+files whose mtime changed are re-parsed.
+"""
+import os
+import sys
+import json
+import shlex
+import shutil
+import difflib
+import subprocess
+import threading
+
+from window_manager import app_lookup_keys
+
+DEFAULT_INDEX_FILE = "app_index.json"
+INDEX_VERSION = 1
+
+# Minimum fuzzy score for a match to be accepted. Prefix and whole-word matches
+# score 0.9; below that only near-misspellings pass ('notepad' vs 'notes' is 0.67)
+MIN_MATCH_SCORE = 0.8
+
+# Terminal emulators for Terminal=true entries, with the flag that runs a command
+TERMINALS = [
+    ('x-terminal-emulator', ['-e']),
+    ('gnome-terminal', ['--']),
+    ('konsole', ['-e']),
+    ('xfce4-terminal', ['-x']),
+    ('alacritty', ['-e']),
+    ('kitty', []),
+    ('foot', []),
+    ('xterm', ['-e']),
+]
+
+
+def default_search_dirs():
+    """Directories holding installed application entries for this platform."""
+    if sys.platform == 'win32':
+        dirs = [
+            os.path.join(os.environ.get('ProgramData', r'C:\ProgramData'), r'Microsoft\Windows\Start Menu\Programs'),
+            os.path.join(os.environ.get('APPDATA', ''), r'Microsoft\Windows\Start Menu\Programs'),
+        ]
+    else:
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        data_dirs = os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share'
+        dirs = [os.path.join(data_home, 'applications')]
+        dirs += [os.path.join(d, 'applications') for d in data_dirs.split(':') if d]
+        dirs += [
+            '/var/lib/flatpak/exports/share/applications',
+            os.path.expanduser('~/.local/share/flatpak/exports/share/applications'),
+            '/var/lib/snapd/desktop/applications',
+        ]
+    return [d for d in dirs if d]
+
+
+def _strip_field_codes(exec_line):
+    """Remove .desktop Exec field codes (%f, %U, ...) and unescape %%."""
+    args = []
+    for arg in shlex.split(exec_line):
+        if len(arg) == 2 and arg[0] == '%':
+            continue
+        args.append(arg.replace('%%', '%'))
+    return args
+
+
+def parse_desktop_file(path):
+    """
+    Parse the [Desktop Entry] group of a .desktop file.
+    Returns an entry dict, or None for hidden / non-application entries.
+    """
+    fields = {}
+    in_entry = False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('['):
+                    if in_entry:
+                        break
+                    in_entry = line == '[Desktop Entry]'
+                    continue
+                if in_entry and '=' in line:
+                    key, value = line.split('=', 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+
+    if fields.get('Type') != 'Application' or not fields.get('Exec'):
+        return None
+    if fields.get('Hidden', '').lower() == 'true' or fields.get('NoDisplay', '').lower() == 'true':
+        return None
+    try:
+        argv = _strip_field_codes(fields['Exec'])
+    except ValueError:
+        return None
+    if not argv:
+        return None
+
+    return {
+        'name': fields.get('Name', ''),
+        'generic_name': fields.get('GenericName', ''),
+        'keywords': [k for k in fields.get('Keywords', '').split(';') if k],
+        'argv': argv,
+        'wm_class': fields.get('StartupWMClass', ''),
+        'terminal': fields.get('Terminal', '').lower() == 'true',
+        'cwd': fields.get('Path', ''),
+    }
+
+
+def parse_shortcut(path):
+    """Windows Start menu shortcut: the name is the file stem, launched via the shell."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if 'uninstall' in name.lower():
+        return None
+    return {
+        'name': name,
+        'generic_name': '',
+        'keywords': [],
+        'argv': [],
+        'wm_class': '',
+        'terminal': False,
+        'cwd': '',
+    }
+
+
+def terminal_command():
+    """
+    argv prefix that runs a command in a terminal: $TERMINAL if set, otherwise
+    the first known terminal on PATH. Raises OSError when there is none.
+    """
+    env = os.environ.get('TERMINAL')
+    if env and shutil.which(env):
+        return [env, '-e']
+    for name, flags in TERMINALS:
+        if shutil.which(name):
+            return [name] + flags
+    raise OSError("No terminal emulator found (set $TERMINAL)")
+
+
+def shell_execute(path):
+    """
+    Open a file or shortcut through the Windows shell. Returns the pid of the
+    process it started, or None when the shell reused a running one.
+    Raises OSError when the shell cannot open it.
+    """
+    try:
+        import win32api
+        import win32process
+        from win32com.shell import shell, shellcon
+    except ImportError:
+        os.startfile(path)
+        return None
+    try:
+        info = shell.ShellExecuteEx(fMask=shellcon.SEE_MASK_NOCLOSEPROCESS, lpFile=path, nShow=1)
+    except Exception as e:
+        raise OSError(f"Could not open {path}: {e}") from e
+    handle = info.get('hProcess')
+    if not handle:
+        return None
+    try:
+        return win32process.GetProcessId(handle)
+    finally:
+        win32api.CloseHandle(handle)
+
+
+def _normalize(text):
+    return ' '.join(text.lower().replace('.exe', '').replace('-', ' ').replace('_', ' ').split())
+
+
+class AppIndex:
+    """
+    Persistent index of launchable applications.
+    Entries are keyed by their source file path.
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE, search_dirs=None):
+        self.index_file = index_file
+        self.search_dirs = search_dirs if search_dirs is not None else default_search_dirs()
+        self.entries = {}  # source path -> entry dict (with 'mtime')
+        self._lock = threading.Lock()
+        self.load()
+        self.refresh()
+
+    def load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data.get('entries', {})
+        except Exception as e:
+            print(f"Error loading app index: {e}")
+
+    def save(self):
+        if not self.index_file:
+            return
+        try:
+            tmp = self.index_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f)
+            os.replace(tmp, self.index_file)
+        except Exception as e:
+            print(f"Error saving app index: {e}")
+
+    def _scan(self):
+        """Yield (path, mtime) for every entry file under the search dirs."""
+        suffix = '.lnk' if sys.platform == 'win32' else '.desktop'
+        for base in self.search_dirs:
+            if not os.path.isdir(base):
+                continue
+            for dirpath, _dirnames, filenames in os.walk(base):
+                for filename in filenames:
+                    if filename.lower().endswith(suffix):
+                        path = os.path.join(dirpath, filename)
+                        try:
+                            yield path, os.stat(path).st_mtime
+                        except OSError:
+                            continue
+
+    def refresh(self):
+        """
+        Re-parse new or modified entry files and drop removed ones.
+        Returns the number of entries that changed.
+        """
+        parse = parse_shortcut if sys.platform == 'win32' else parse_desktop_file
+        with self._lock:
+            seen = set()
+            changed = 0
+            for path, mtime in self._scan():
+                seen.add(path)
+                old = self.entries.get(path)
+                if old is not None and old.get('mtime') == mtime:
+                    continue
+                entry = parse(path)
+                if entry is None:
+                    # Remember skipped files so they aren't re-parsed every refresh
+                    entry = {'skip': True}
+                entry['mtime'] = mtime
+                self.entries[path] = entry
+                changed += 1
+            for path in set(self.entries) - seen:
+                del self.entries[path]
+                changed += 1
+            if changed:
+                self.save()
+            return changed
+
+    def _score(self, query_keys, entry):
+        names = [entry['name'], entry['generic_name'], entry['wm_class']] + entry['keywords']
+        if entry['argv']:
+            names.append(os.path.basename(entry['argv'][0]))
+        names = [_normalize(n) for n in names if n]
+        best = 0.0
+        for key in query_keys:
+            for n in names:
+                if key == n:
+                    return 1.0
+                if n.startswith(key) or key in n.split():
+                    best = max(best, 0.9)
+                else:
+                    best = max(best, difflib.SequenceMatcher(None, key, n).ratio())
+        return best
+
+    def find(self, app_name):
+        """
+        Return the best matching entry for a friendly app name, or None.
+        Tries known aliases (e.g. 'notepad' -> gedit) before fuzzy matching.
+        """
+        query_keys = [_normalize(k) for k in app_lookup_keys(app_name)]
+        best, best_score = None, MIN_MATCH_SCORE
+        with self._lock:
+            for path, entry in self.entries.items():
+                if entry.get('skip'):
+                    continue
+                score = self._score(query_keys, entry)
+                # Exact match on the primary query outranks alias matches
+                if score == 1.0 and _normalize(entry['name']) == query_keys[0]:
+                    score = 1.01
+                if score > best_score:
+                    best, best_score = dict(entry, path=path), score
+        return best
+
+    def launch(self, entry):
+        """
+        Start an indexed entry directly.
+        Returns the Popen object; on Windows, the pid the shell started (or None).
+        """
+        if sys.platform == 'win32':
+            return shell_execute(entry['path'])
+        argv = list(entry['argv'])
+        if entry.get('terminal'):
+            argv = terminal_command() + argv
+        return subprocess.Popen(
+            argv,
+            cwd=entry.get('cwd') or None,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+_app_index = None
+_app_index_lock = threading.Lock()
+
+
+def get_app_index():
+    """Return the shared app index, loading and refreshing it on first use."""
+    global _app_index
+    with _app_index_lock:
+        if _app_index is None:
+            _app_index = AppIndex()
+        return _app_index
@@ -0,0 +1,155 @@
+"""
+Async Runtime - one asyncio loop that owns the agent's blocking work.
+
+run_task stays a plain loop on the caller's thread, but the points where it
+blocks for seconds are coroutines on this loop: model requests (the Gemini
+SDK's async client), SHELL subprocesses, and actions, which run on a single
+dedicated input thread so keystrokes and clicks keep their order and their
+COM/uiautomation thread affinity. The calling thread waits on a future, and
+cancel() (ComputerUseAgent.stop) cancels every future in flight at once: the
+HTTP request is abandoned, the subprocess is killed, and the caller gets
+TaskCancelled within milliseconds instead of after the call returns.
+
+An action already running on the input thread cannot be interrupted from
+outside; the long ones (TYPE, HOLD_KEY, CLICK_AND_HOLD, WAIT, WAIT_FOR_*,
+EXPECT_*) check tools.cancel_waits between steps instead, so input stops
+soon after the caller has returned.
+
+Usage:
+    from async_runtime import runtime, TaskCancelled
+    response = runtime.run(client.aio.models.generate_content(...))
+    result = runtime.call_input(action.call, args)
+"""
+import sys
+import asyncio
+import threading
+import concurrent.futures
+
+from turn_metrics import ACTIVE_STAGES
+
+SHELL_TIMEOUT = 10
+
+
+class TaskCancelled(Exception):
+    """The running task was stopped while waiting on the runtime."""
+
+
+class AsyncRuntime:
+    """
+    Event loop on a daemon thread, started on first use. run() may be called
+    from any thread except the loop's own, including the input thread.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._input = None
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._waiters = set()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._input = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-input")
+                self._thread = threading.Thread(target=self._loop.run_forever, name="agent-runtime", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run coro on the loop and return its result; raises TaskCancelled after cancel()."""
+        if self._cancelled.is_set():
+            coro.close()
+            raise TaskCancelled()
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        with self._lock:
+            self._inflight.add(future)
+        # A cancel() that ran between the check above and the add has no future to cancel yet
+        if self._cancelled.is_set():
+            future.cancel()
+        try:
+            return future.result(timeout)
+        except concurrent.futures.CancelledError:
+            raise TaskCancelled() from None
+        finally:
+            with self._lock:
+                self._inflight.discard(future)
+
+    def call_input(self, func, *args):
+        """Run func(*args) on the input thread; the caller stops waiting on cancel()."""
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+        self._ensure_loop()
+        stage = ACTIVE_STAGES.get(threading.get_ident())
+        # Waits on an event rather than the loop: one thread handoff per action, not two
+        released = threading.Event()
+        future = self._input.submit(_staged, stage, func, *args)
+        future.add_done_callback(lambda _: released.set())
+        with self._lock:
+            self._waiters.add(released)
+        if self._cancelled.is_set():
+            released.set()
+        try:
+            released.wait()
+        finally:
+            with self._lock:
+                self._waiters.discard(released)
+        if not future.done():
+            raise TaskCancelled()
+        return future.result()
+
+    def cancel(self):
+        """Cancel everything in flight, and everything started, until reset()."""
+        self._cancelled.set()
+        with self._lock:
+            futures = list(self._inflight)
+            waiters = list(self._waiters)
+        for future in futures:
+            future.cancel()
+        for released in waiters:
+            released.set()
+
+    def reset(self):
+        self._cancelled.clear()
+
+
+def _staged(stage, func, *args):
+    # The profiler attributes input-thread samples to the stage of the thread that queued them
+    thread = threading.get_ident()
+    if stage:
+        ACTIVE_STAGES[thread] = stage
+    try:
+        return func(*args)
+    finally:
+        ACTIVE_STAGES.pop(thread, None)
+
+
+async def shell(command, timeout=SHELL_TIMEOUT):
+    """
+    Run a shell command (PowerShell on Windows) and return (exit code,
+    output). The process is killed on timeout or cancellation.
+    """
+    if sys.platform == "win32":
+        proc = await asyncio.create_subprocess_exec(
+            "powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    else:
+        proc = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await asyncio.shield(proc.wait())
+        raise
+    return proc.returncode, stdout.decode(errors="replace") + stderr.decode(errors="replace")
+
+
+runtime = AsyncRuntime()
@@ -0,0 +1,207 @@
+"""
+Backend Registry - heavy platform and provider backends, loaded on first use.
+
+Model SDKs (google-genai, openai), input (pyautogui), clipboard (pyperclip),
+screen capture (mss), UI inspection (uiautomation) and OCR (tesseract) are registered here by
+kind and name, optionally restricted to some platforms. Nothing is imported
+until a backend is first used, so importing agent/tools stays cheap and a
+process only pays for the backends a task actually touches.
+
+    genai = lazy("model", "gemini")     # module-like proxy, imports on first attribute access
+    pyautogui = lazy("input", namespace=globals(), symbol="pyautogui")  # rebinds itself once loaded
+    load("input")                       # the pyautogui module, configured
+    optional("ui")                      # uiautomation, or None off Windows
+"""
+import sys
+import threading
+
+DEFAULT = "default"
+
+# (kind, name) -> [(platform prefixes or None, loader)]
+_registry = {}
+_loaded = {}
+_missing = set()
+_lock = threading.Lock()
+# One lock per backend, so a slow import (e.g. prefetching a model SDK) never blocks the others
+_key_locks = {}
+
+
+def register(kind, name, loader, platforms=None):
+    """
+    Register a zero-arg loader for a backend. platforms is a tuple of
+    sys.platform prefixes ('win32', 'linux', 'darwin'); None means any.
+    Later registrations take precedence, so callers can override defaults.
+    """
+    with _lock:
+        _registry.setdefault((kind, name), []).insert(0, (platforms, loader))
+        _loaded.pop((kind, name), None)
+        _missing.discard((kind, name))
+
+
+def _loader_for(kind, name, platform=None):
+    platform = platform or sys.platform
+    for platforms, loader in _registry.get((kind, name), []):
+        if platforms is None or platform.startswith(tuple(platforms)):
+            return loader
+    return None
+
+
+def _key_lock(key):
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def load(kind, name=DEFAULT):
+    """Return the backend, importing it on first call. Raises LookupError if none fits this platform."""
+    key = (kind, name)
+    backend = _loaded.get(key)
+    if backend is not None:
+        return backend
+    with _key_lock(key):
+        if key in _loaded:
+            return _loaded[key]
+        loader = _loader_for(kind, name)
+        if loader is None:
+            raise LookupError(f"No {kind} backend '{name}' for platform {sys.platform}")
+        backend = loader()
+        _loaded[key] = backend
+        return backend
+
+
+def optional(kind, name=DEFAULT):
+    """Like load(), but returns None when the backend is unavailable (no loader or ImportError)."""
+    key = (kind, name)
+    if key in _missing:
+        return None
+    try:
+        return load(kind, name)
+    except (LookupError, ImportError):
+        with _lock:
+            _missing.add(key)
+        return None
+
+
+def prefetch(*keys):
+    """
+    Import (kind, name) backends on a background thread, so that work
+    overlaps with whatever the caller does before first use.
+    """
+    def run():
+        for kind, name in keys:
+            optional(kind, name)
+    thread = threading.Thread(target=run, name="backend-prefetch", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_loaded(kind, name=DEFAULT):
+    return (kind, name) in _loaded
+
+
+def loaded():
+    """Names of the backends imported so far, for startup diagnostics."""
+    return sorted(f"{kind}:{name}" for kind, name in _loaded)
+
+
+class LazyBackend:
+    """
+    Stand-in for a backend module, class or factory. Attribute access and
+    calls are forwarded to the backend, which is loaded on first use.
+    If bound to a module global, the proxy replaces itself there with the
+    real backend once loaded, so later calls pay no forwarding cost.
+    """
+
+    __slots__ = ("_kind", "_name", "_namespace", "_symbol")
+
+    def __init__(self, kind, name=DEFAULT, namespace=None, symbol=None):
+        object.__setattr__(self, "_kind", kind)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_namespace", namespace)
+        object.__setattr__(self, "_symbol", symbol)
+
+    def _resolve(self):
+        backend = load(self._kind, self._name)
+        namespace = self._namespace
+        if namespace is not None and namespace.get(self._symbol) is self:
+            namespace[self._symbol] = backend
+        return backend
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if is_loaded(self._kind, self._name) else "not loaded"
+        return f"<lazy {self._kind} backend '{self._name}' ({state})>"
+
+
+def lazy(kind, name=DEFAULT, namespace=None, symbol=None):
+    """
+    Proxy for a backend. Pass a module's globals() and the global's name to
+    have the proxy swap itself for the backend on first use.
+    """
+    return LazyBackend(kind, name, namespace, symbol)
+
+
+# ----------------------------------------------------------------------
+# Default backends
+# ----------------------------------------------------------------------
+
+def _load_pyautogui():
+    import pyautogui
+    pyautogui.FAILSAFE = True  # Move mouse to corner to abort
+    pyautogui.PAUSE = 0.05  # Reduced pause between actions for speed
+    return pyautogui
+
+
+def _load_pyperclip():
+    import pyperclip
+    return pyperclip
+
+
+def _load_mss():
+    import mss
+    return mss.mss
+
+
+def _load_uiautomation():
+    import uiautomation
+    return uiautomation
+
+
+def _load_tesseract():
+    # An executable rather than a module: LookupError (no tesseract on PATH) reads as unavailable
+    from ocr_index import load_tesseract
+    return load_tesseract()
+
+
+def _load_gemini():
+    from google import genai
+    return genai
+
+
+def _load_gemini_types():
+    from google.genai import types
+    return types
+
+
+def _load_openai():
+    from openai import OpenAI
+    return OpenAI
+
+
+register("input", DEFAULT, _load_pyautogui)
+register("clipboard", DEFAULT, _load_pyperclip)
+register("capture", DEFAULT, _load_mss)
+# uiautomation is Windows-only; other platforms get no UI inspector backend
+register("ui", DEFAULT, _load_uiautomation, platforms=("win32",))
+register("ocr", DEFAULT, _load_tesseract)
+register("model", "gemini", _load_gemini)
+register("model", "gemini.types", _load_gemini_types)
+# xAI speaks the OpenAI protocol
+register("model", "xai", _load_openai)
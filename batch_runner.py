@@ -0,0 +1,308 @@
+"""
+Batch Runner - run tasks from a JSONL file without the GUI.
+
+Each line is a JSON object with the task text in "instruction" (or "task",
+or "body" as in requests.jsonl) and optionally:
+    id          stable task id (default "request_id", then the line number)
+    model       model name for this task
+    budget      per-task limits, as for run_task (see budget.py)
+    setup       shell command or list of commands run before the task
+    teardown    shell command or list of commands run after the task
+
+Tasks run one at a time on one warm ComputerUseAgent. After each task a
+result record (status, turns, tokens, cost, per-stage seconds, setup and
+teardown steps) is appended to the results file and flushed. On the next
+run, tasks that already have a record are skipped, so an interrupted batch
+resumes where it stopped. Ctrl+C stops the running task, which is left
+unrecorded and runs again on resume; a second Ctrl+C exits at once.
+
+A failed setup step skips its task (status "setup_failed"); teardown always
+runs once setup has started.
+
+Usage:
+    python batch_runner.py tasks.jsonl
+    python batch_runner.py tasks.jsonl --out nightly.jsonl --setup "taskkill /im notepad.exe /f" --retry
+    python batch_runner.py --summary nightly.jsonl
+    python batch_runner.py tasks.jsonl --profile       # sampling profile of the batch (profiler.py)
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+
+DEFAULT_RESULTS = "batch_results.jsonl"
+STEP_TIMEOUT = 60
+STEP_OUTPUT_CHARS = 2000
+# Statuses that --retry runs again
+RETRY_STATES = ("stopped", "error", "setup_failed", "budget_exceeded")
+
+
+def _commands(value):
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def load_tasks(path):
+    """Tasks from a JSONL file, in file order. Lines without task text are skipped with a warning."""
+    tasks = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"{path}:{number}: invalid JSON ({e}), skipped")
+                continue
+            instruction = entry.get("instruction") or entry.get("task") or entry.get("body")
+            if not instruction:
+                print(f"{path}:{number}: no instruction, skipped")
+                continue
+            task_id = str(entry.get("id") or entry.get("request_id") or f"line-{number}")
+            if task_id in seen:
+                print(f"{path}:{number}: duplicate id {task_id!r}, skipped")
+                continue
+            seen.add(task_id)
+            tasks.append({
+                "id": task_id,
+                "instruction": instruction,
+                "model": entry.get("model"),
+                "budget": entry.get("budget"),
+                "setup": _commands(entry.get("setup")),
+                "teardown": _commands(entry.get("teardown")),
+            })
+    return tasks
+
+
+def load_results(path):
+    """Last result record per task id; an unreadable tail line (a crash mid-write) is ignored."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record.get("id")] = record
+    return results
+
+
+def run_step(command, timeout=STEP_TIMEOUT):
+    """Run a setup or teardown shell command; returns its record."""
+    start = time.perf_counter()
+    if sys.platform == "win32":
+        args = ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command]
+    else:
+        args = command
+    try:
+        result = subprocess.run(args, shell=sys.platform != "win32", capture_output=True, text=True, timeout=timeout)
+        exit_code, output = result.returncode, result.stdout + result.stderr
+    except subprocess.TimeoutExpired:
+        exit_code, output = None, f"timed out after {timeout}s"
+    except OSError as e:
+        exit_code, output = None, str(e)
+    return {
+        "command": command,
+        "exit_code": exit_code,
+        "seconds": round(time.perf_counter() - start, 3),
+        "output": output[-STEP_OUTPUT_CHARS:],
+    }
+
+
+class BatchRunner:
+    """Runs tasks on one agent and appends a result record per finished task."""
+
+    def __init__(self, agent, results_path=DEFAULT_RESULTS, setup=(), teardown=(), step_timeout=STEP_TIMEOUT,
+                 log=print):
+        self.agent = agent
+        self.results_path = results_path
+        self.setup = list(setup)
+        self.teardown = list(teardown)
+        self.step_timeout = step_timeout
+        self.log = log
+        self.interrupted = False
+        self.default_model = agent.model_name
+
+    def pending(self, tasks, retry=False):
+        """Tasks without a result record; with retry, also those whose last record did not finish."""
+        results = load_results(self.results_path)
+        return [t for t in tasks if t["id"] not in results
+                or (retry and results[t["id"]].get("status") in RETRY_STATES)]
+
+    def interrupt(self):
+        self.interrupted = True
+        self.agent.stop()
+
+    def run(self, tasks):
+        """Run tasks in order until done or interrupted; returns the records written."""
+        records = []
+        screen = self.agent.screen_factory()
+        with screen as sct:
+            for index, task in enumerate(tasks, start=1):
+                if self.interrupted:
+                    break
+                self.log(f"=== [{index}/{len(tasks)}] {task['id']}: {task['instruction'][:80]}")
+                record = self.run_one(task, sct)
+                if self.interrupted:
+                    self.log(f"=== {task['id']} interrupted; it runs again on resume")
+                    break
+                self._append(record)
+                records.append(record)
+                self.log(f"=== {task['id']} {record['status']}: turns={record['turns']} "
+                         f"tokens={record['input_tokens']}/{record['output_tokens']} "
+                         f"cost=${record['cost']:.4f} seconds={record['seconds']:.1f}")
+        return records
+
+    def run_one(self, task, sct):
+        record = {
+            "id": task["id"],
+            "instruction": task["instruction"],
+            "model": task["model"] or self.default_model,
+            "status": "setup_failed",
+            "turns": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost": 0.0,
+            "stages": {},
+            "error": None,
+            "started": time.time(),
+            "setup": [],
+            "teardown": [],
+        }
+        start = time.perf_counter()
+        try:
+            for command in self.setup + task["setup"]:
+                step = run_step(command, self.step_timeout)
+                record["setup"].append(step)
+                if step["exit_code"] != 0:
+                    record["error"] = f"Setup step failed: {command}"
+                    break
+            else:
+                if not self.interrupted:
+                    self.agent.update_model(record["model"])
+                    try:
+                        result = self.agent.run_task(task["instruction"], logger=self._task_log, sct=sct,
+                                                     budget=task["budget"])
+                    except Exception as e:
+                        result = {"status": "error", "error": str(e)}
+                    for key in ("status", "task_id", "turns", "turns_saved", "text_turns", "input_tokens",
+                                "output_tokens", "cost", "stages", "error", "budget"):
+                        if key in result:
+                            record[key] = result[key]
+                    if result.get("skill"):
+                        record["skill"] = result["skill"].get("id")
+        finally:
+            # Teardown runs even when setup failed halfway, to undo the steps that ran
+            for command in self.teardown + task["teardown"]:
+                record["teardown"].append(run_step(command, self.step_timeout))
+        record["seconds"] = time.perf_counter() - start
+        return record
+
+    def _task_log(self, msg):
+        # run_task clears should_stop on entry; re-apply an interrupt that raced it
+        if self.interrupted:
+            self.agent.stop()
+        self.log(msg)
+
+    def _append(self, record):
+        with open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def summarize_results(records):
+    """Totals over result records: counts per status, tokens, cost, turns and throughput."""
+    summary = {"tasks": len(records), "statuses": {}, "turns": 0, "input_tokens": 0, "output_tokens": 0,
+               "cost": 0.0, "seconds": 0.0, "stages": {}}
+    for r in records:
+        status = r.get("status", "error")
+        summary["statuses"][status] = summary["statuses"].get(status, 0) + 1
+        for key in ("turns", "input_tokens", "output_tokens", "cost", "seconds"):
+            summary[key] += r.get(key) or 0
+        for name, seconds in (r.get("stages") or {}).items():
+            summary["stages"][name] = summary["stages"].get(name, 0.0) + seconds
+    hours = summary["seconds"] / 3600
+    summary["tasks_per_hour"] = summary["tasks"] / hours if hours else 0.0
+    summary["cost_per_task"] = summary["cost"] / summary["tasks"] if summary["tasks"] else 0.0
+    return summary
+
+
+def print_summary(summary):
+    statuses = " ".join(f"{k}={v}" for k, v in sorted(summary["statuses"].items()))
+    print(f"tasks={summary['tasks']} {statuses}")
+    print(f"turns={summary['turns']} tokens={summary['input_tokens']}/{summary['output_tokens']} "
+          f"cost=${summary['cost']:.4f} (${summary['cost_per_task']:.4f}/task)")
+    print(f"seconds={summary['seconds']:.1f} tasks/hour={summary['tasks_per_hour']:.1f}")
+    if summary["stages"]:
+        print("stages: " + " ".join(f"{k}={v:.1f}s" for k, v in sorted(summary["stages"].items(), key=lambda kv: -kv[1])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tasks", nargs="?", help="JSONL task file")
+    parser.add_argument("--out", default=DEFAULT_RESULTS, help="Result records (JSONL, appended)")
+    parser.add_argument("--model", default=None, help="Default model for tasks that do not name one")
+    parser.add_argument("--setup", action="append", default=[], help="Shell command run before every task")
+    parser.add_argument("--teardown", action="append", default=[], help="Shell command run after every task")
+    parser.add_argument("--step-timeout", type=float, default=STEP_TIMEOUT, help="Seconds per setup/teardown step")
+    parser.add_argument("--retry", action="store_true", help="Also re-run tasks whose last record did not finish")
+    parser.add_argument("--limit", type=int, help="Run at most this many pending tasks")
+    parser.add_argument("--summary", metavar="RESULTS", help="Print totals for a results file and exit")
+    parser.add_argument("--profile", action="store_true", help="Run the sampling profiler across the batch")
+    args = parser.parse_args()
+
+    if args.summary:
+        print_summary(summarize_results(list(load_results(args.summary).values())))
+        return 0
+    if not args.tasks:
+        parser.error("a task file is required")
+
+    tasks = load_tasks(args.tasks)
+    from dotenv import load_dotenv
+    load_dotenv()
+    gemini_key = os.environ.get("GOOGLE_API_KEY", "").strip()
+    if not gemini_key:
+        print("Gemini API Key (GOOGLE_API_KEY) not found in environment.")
+        return 1
+
+    from agent import ComputerUseAgent
+    agent = ComputerUseAgent(api_keys={"gemini": gemini_key}, model_name=args.model or "gemini-3-flash-preview")
+    runner = BatchRunner(agent, args.out, args.setup, args.teardown, args.step_timeout)
+    pending = runner.pending(tasks, retry=args.retry)
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(pending)} already recorded, {len(pending)} to run")
+
+    def on_signal(*_):
+        if runner.interrupted:
+            raise KeyboardInterrupt
+        print("Stopping after the current step (Ctrl+C again to exit now)")
+        runner.interrupt()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    from profiler import profiler, requested as profiler_requested
+    if profiler_requested(args.profile):
+        profiler.start()
+    try:
+        records = runner.run(pending)
+    finally:
+        agent.ledger.close()
+        if profiler.enabled:
+            print(f"Profile written to {profiler.stop()}")
+    if records:
+        print_summary(summarize_results(records))
+    return 130 if runner.interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
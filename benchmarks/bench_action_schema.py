@@ -0,0 +1,187 @@
+"""
+Compare the text ACTION language with structured function calling.
+
+Offline (default) it reports:
+    static     system prompt and function-declaration sizes per request for each mode
+    scripted   the replay benchmark in both modes against the mock server, with the
+               built-in script as ACTION text vs the same actions as function calls,
+               once with the prompt cache (the default) and once with AGENT_PROMPT_CACHE=0
+Token counts offline are the mock server's estimates (characters / 4; declarations
+billed as their JSON), so treat them as relative numbers. With the cache on, the
+system prompt and declarations are stored once per TTL and requests are charged
+them as cached tokens; uncached_prompt_tokens is what each request sends afresh.
+
+With --live (needs GOOGLE_API_KEY) it sends the same first turn (synthetic frame
+plus UI summary) to the real model in each mode and reports the billed prompt and
+output tokens and how many replies had no runnable action.
+
+Usage:
+    python benchmarks/bench_action_schema.py
+    python benchmarks/bench_action_schema.py --live --samples 5 --model gemini-3-flash-preview
+"""
+import io
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+from mock_model_server import MockModelServer, DEFAULT_SCRIPT
+
+MODES = ("text", "functions")
+
+
+def to_function_script(agent_module, tools_module, script):
+    """Rewrite scripted ACTION-text replies as functionCall parts (reasoning text dropped)."""
+    converted = []
+    for entry in script:
+        text = entry if isinstance(entry, str) else entry.get("text", "")
+        parts = []
+        for line in text.splitlines():
+            if not line.strip().upper().startswith("ACTION:"):
+                continue
+            parsed = agent_module.parse_action_line(line)
+            action = tools_module.get_action(parsed[0]) if parsed else None
+            if action is None:
+                continue
+            args = dict(zip([p.name for p in action.params], action.bind(parsed[1])))
+            parts.append({"functionCall": {"name": action.function_name, "args": args}})
+        converted.append({"parts": parts} if parts else entry)
+    return converted
+
+
+def static_sizes(agent_module, tools_module):
+    sizes = {}
+    for mode in MODES:
+        prompt = agent_module.FUNCTION_SYSTEM_PROMPT if mode == "functions" else agent_module.SYSTEM_PROMPT
+        declarations = tools_module.action_declarations(None if mode == "functions" else ("ZOOM",))
+        decl_chars = len(json.dumps(declarations))
+        sizes[mode] = {
+            "prompt_chars": len(prompt),
+            "declaration_chars": decl_chars,
+            "est_tokens": (len(prompt) + decl_chars) // 4,
+        }
+    return sizes
+
+
+def scripted(agent_module, tools_module, frames, cache=True):
+    import replay_bench
+    scripts = {"text": DEFAULT_SCRIPT, "functions": to_function_script(agent_module, tools_module, DEFAULT_SCRIPT)}
+    os.environ["AGENT_PROMPT_CACHE"] = "1" if cache else "0"
+    results = {}
+    for mode in MODES:
+        os.environ["AGENT_ACTIONS"] = mode
+        server = MockModelServer(scripts[mode])
+        server.start()
+        try:
+            run = replay_bench.run_once(agent_module, frames, [], replay_bench.DEFAULT_TASK, server)
+        finally:
+            server.stop()
+        requests = run["requests"] or 1
+        results[mode] = {
+            "turns": run["turns"],
+            "requests": run["requests"],
+            "prompt_tokens_per_request": run["prompt_tokens"] / requests,
+            "cached_tokens_per_request": run["cached_tokens"] / requests,
+            "uncached_prompt_tokens_per_request": (run["prompt_tokens"] - run["cached_tokens"]) / requests,
+            "output_tokens_per_request": run["output_tokens"] / requests,
+        }
+    return results
+
+
+def live(agent_module, samples, model):
+    """One real first-turn request per sample and mode; returns per-mode token means and no-action counts."""
+    from turn_metrics import TurnTimer
+    key = os.environ.get("GOOGLE_API_KEY", "").strip()
+    if not key:
+        raise SystemExit("--live needs GOOGLE_API_KEY")
+    frames = fakes.synthetic_frames(samples, seed=7)
+    results = {}
+    for mode in MODES:
+        os.environ["AGENT_ACTIONS"] = mode
+        agent = agent_module.ComputerUseAgent(api_keys={"gemini": key}, model_name=model)
+        types = agent_module.types
+        prompt_tokens = output_tokens = no_action = 0
+        for i, frame in enumerate(frames):
+            sct = fakes.FakeMss([frame])
+            img = agent.capture_screen(sct)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG")
+            task = agent_module.task_message("Search for 'hello world' in the synthetic window and confirm.")
+            prompt_text = agent_module.turn_prompt(fakes.SYNTHETIC_UI_SUMMARY, True)
+            history = [
+                types.Content(role="user", parts=[types.Part.from_text(text=task)]),
+                types.Content(role="user", parts=[types.Part.from_text(text=prompt_text),
+                                                  types.Part.from_bytes(data=buf.getvalue(), mime_type="image/jpeg")]),
+            ]
+            before = dict(agent.task_usage)
+            text, _, zooms, calls = agent._generate(history, TurnTimer(i + 1), i + 1, lambda m: None, len(buf.getvalue()))
+            prompt_tokens += agent.task_usage["input_tokens"] - before["input_tokens"]
+            output_tokens += agent.task_usage["output_tokens"] - before["output_tokens"]
+            planned = agent_module.plan_actions(calls, text)
+            runnable = [a for a in planned if a["name"] and (a["name"] in ("DONE", "ZOOM") or agent_module.get_action(a["name"]))]
+            if not runnable and not zooms:
+                no_action += 1
+        agent.ledger.close()
+        results[mode] = {
+            "samples": samples,
+            "prompt_tokens_per_request": prompt_tokens / samples,
+            "output_tokens_per_request": output_tokens / samples,
+            "replies_without_action": no_action,
+        }
+    return results
+
+
+def print_comparison(title, results, keys):
+    print(title)
+    print(f"  {'':36} {'text':>10} {'functions':>10} {'change':>8}")
+    for key in keys:
+        a, b = results["text"][key], results["functions"][key]
+        change = f"{(b - a) / a:+.0%}" if a else "n/a"
+        print(f"  {key:36} {a:10.1f} {b:10.1f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=6)
+    parser.add_argument("--live", action="store_true", help="Also measure with the real model (costs API tokens)")
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--model", default="gemini-3-flash-preview")
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    fakes.install()
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    os.chdir(tempfile.mkdtemp(prefix="bench-action-schema-"))
+    os.environ["AGENT_RECORD"] = "0"
+    os.environ["AGENT_SKILLS"] = "0"
+    import agent as agent_module
+    import tools as tools_module
+
+    report = {"static": static_sizes(agent_module, tools_module)}
+    print_comparison("static (per request)", report["static"], ["prompt_chars", "declaration_chars", "est_tokens"])
+    frames = fakes.synthetic_frames(args.frames)
+    scripted_keys = ["prompt_tokens_per_request", "cached_tokens_per_request",
+                     "uncached_prompt_tokens_per_request", "output_tokens_per_request"]
+    report["scripted"] = scripted(agent_module, tools_module, frames)
+    print_comparison("scripted replay, prompt cache on (mock estimates)", report["scripted"], scripted_keys)
+    report["scripted_uncached"] = scripted(agent_module, tools_module, frames, cache=False)
+    print_comparison("scripted replay, prompt cache off (mock estimates)", report["scripted_uncached"], scripted_keys)
+    if args.live:
+        report["live"] = live(agent_module, args.samples, args.model)
+        print_comparison(f"live ({args.model})", report["live"],
+                         ["prompt_tokens_per_request", "output_tokens_per_request", "replies_without_action"])
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
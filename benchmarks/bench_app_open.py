@@ -0,0 +1,95 @@
+"""
+App-open latency benchmark: indexed launcher vs. the previous launch path.
+
+Opens the app, waits until its window is foreground, closes it again and
+repeats. The legacy path is Start-menu typing on Windows; on Linux there was
+no launch path before the launcher, so PATH lookup + Popen + polling is used
+as the comparison.
+
+Usage:
+    python benchmarks/bench_app_open.py notepad --runs 5
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+from window_manager import get_window_manager, app_lookup_keys
+
+
+def _close_foreground(wm):
+    info = wm.get_foreground_window_info()
+    if info and info.get('pid') and info['pid'] != os.getpid():
+        try:
+            psutil.Process(info['pid']).terminate()
+        except psutil.Error:
+            pass
+    time.sleep(1.0)
+
+
+def _legacy_launch(wm, app_name, timeout):
+    if sys.platform == 'win32':
+        import win_app_control
+        return win_app_control.launch_app_via_start_menu(app_name, wait_timeout=timeout)
+    path = next((p for p in map(shutil.which, app_lookup_keys(app_name)) if p), None)
+    if not path:
+        return False
+    subprocess.Popen([path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    start = time.time()
+    while time.time() - start < timeout:
+        if wm.is_app_foreground(app_name):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def _measure(label, launch, wm, app_name, runs, timeout):
+    timings = []
+    failures = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        ok = launch(wm, app_name, timeout)
+        elapsed = time.perf_counter() - start
+        if ok:
+            timings.append(elapsed)
+        else:
+            failures += 1
+        _close_foreground(wm)
+    if timings:
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+        print(f"{label:>10}: median {statistics.median(timings):.3f}s  p95 {p95:.3f}s  "
+              f"min {timings[0]:.3f}s  failures {failures}/{runs}")
+    else:
+        print(f"{label:>10}: all {runs} runs failed")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("app", help="App name to open, e.g. notepad")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    wm = get_window_manager()
+    if wm is None:
+        print("No supported window manager backend on this machine.")
+        return 1
+    if wm.focus_app(args.app):
+        print(f"{args.app} is already running; close it first for a fair cold-launch measurement.")
+        return 1
+
+    _measure("launcher", lambda w, a, t: w.launch_app(a, timeout=t), wm, args.app, args.runs, args.timeout)
+    _measure("legacy", _legacy_launch, wm, args.app, args.runs, args.timeout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Measure the incremental OCR index (ocr_index.py) on a scripted frame sequence:
+a document screen, then typing into one line, a clock tick, a dialog opening
+and closing, and a scroll by one line.
+
+For each step it reports the tiles and pixels OCR'd, the share of a full-frame
+read that is, and the time, next to reading every frame in full (a fresh
+index each frame). It also checks that the incremental index found the same
+words as the full read of the final frame.
+
+Without Tesseract (or with --engine fake) a stand-in engine finds words from
+ink projections and costs --cost seconds per megapixel it is given (the
+default is about what Tesseract takes on upscaled screen text). Its "words"
+are ink runs named by their length, so the agreement check mostly compares
+word positions.
+
+Usage:
+    python benchmarks/bench_ocr.py
+    python benchmarks/bench_ocr.py --engine tesseract --json ocr.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from PIL import Image, ImageDraw
+
+import fakes
+import ocr_index
+from ocr_index import OcrIndex
+
+SCREEN = fakes.DEFAULT_SCREEN_SIZE
+LINE_HEIGHT = 22
+WORDS = ("invoice", "total", "serial", "price", "quantity", "order", "status", "shipped", "pending", "amount")
+
+
+class FakeEngine:
+    """Words from ink projections of a greyscale image, at a fixed cost per megapixel."""
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def __call__(self, image):
+        time.sleep(self.cost * image.width * image.height / 1e6)
+        ink = image.point(lambda v: 255 if v < 128 else 0)
+        rows = ink.resize((1, ink.height), Image.Resampling.BOX).tobytes()
+        words = []
+        for top, bottom in _runs(rows, gap=4):
+            if bottom - top < 6:
+                continue  # specks, not text
+            band = ink.crop((0, top, ink.width, bottom))
+            cols = band.resize((band.width, 1), Image.Resampling.BOX).tobytes()
+            height = bottom - top
+            for left, right in _runs(cols, gap=max(2, height // 2)):
+                words.append(("x" * max(1, (right - left) // max(1, height // 2)), left, top, right - left, height, 90.0))
+        return words
+
+
+def _runs(profile, gap):
+    """(start, end) runs of non-zero entries, bridging gaps of up to gap entries."""
+    runs, start, last = [], None, None
+    for i, value in enumerate(profile):
+        if value:
+            if start is None:
+                start = i
+            elif i - last > gap + 1:
+                runs.append((start, last + 1))
+                start = i
+            last = i
+    if start is not None:
+        runs.append((start, last + 1))
+    return runs
+
+
+def draw_document(lines, top=60, clock="10:41", dialog=False):
+    img = Image.new("RGB", SCREEN, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, SCREEN[0], 40), fill=(230, 230, 240))
+    draw.text((20, 12), "Orders - Spreadsheet", fill=(0, 0, 0))
+    for i, line in enumerate(lines):
+        y = top + i * LINE_HEIGHT
+        if 48 <= y < SCREEN[1] - 40:
+            draw.text((40, y), line, fill=(0, 0, 0))
+    draw.rectangle((0, SCREEN[1] - 40, SCREEN[0], SCREEN[1]), fill=(30, 30, 40))
+    draw.text((SCREEN[0] - 80, SCREEN[1] - 28), clock, fill=(255, 255, 255))
+    if dialog:
+        draw.rectangle((660, 400, 1260, 640), fill=(245, 245, 245), outline=(0, 0, 0))
+        draw.text((700, 430), "Save changes to orders.xlsx?", fill=(0, 0, 0))
+        draw.text((760, 580), "Save      Don't save      Cancel", fill=(0, 0, 0))
+    return img
+
+
+def scripted_frames():
+    lines = [" ".join(f"{WORDS[(i + j) % len(WORDS)]} {1000 + i * 7 + j}" for j in range(6)) for i in range(44)]
+    steps = [("first frame", draw_document(lines))]
+    typed = list(lines)
+    for n in range(1, 4):
+        typed[10] = lines[10] + " note" + "s" * n
+        steps.append((f"type {n}", draw_document(typed)))
+    steps.append(("clock tick", draw_document(typed, clock="10:42")))
+    steps.append(("dialog opens", draw_document(typed, clock="10:42", dialog=True)))
+    steps.append(("dialog closes", draw_document(typed, clock="10:42")))
+    steps.append(("scroll 1 line", draw_document(typed, top=60 - LINE_HEIGHT, clock="10:42")))
+    return [(label, (img.size, fakes.to_bgra(img))) for label, img in steps]
+
+
+def measure(engine, frames):
+    incremental = OcrIndex(engine)
+    rows = []
+    for label, frame in frames:
+        inc = incremental.update(*frame)
+        full = OcrIndex(engine).update(*frame)
+        rows.append({"step": label, "tiles_ocr": inc["tiles_ocr"], "tiles": inc["tiles"],
+                     "pixels_share": inc["pixels_ocr"] / full["pixels_ocr"] if full["pixels_ocr"] else 0.0,
+                     "incremental_s": inc["seconds"], "full_s": full["seconds"],
+                     "lines": inc["lines"], "words": inc["words"]})
+    fresh = OcrIndex(engine)
+    fresh.update(*frames[-1][1])
+    return rows, agreement(incremental.words, fresh.words)
+
+
+def agreement(words, reference):
+    """Share of reference words with an incremental word of the same text centered inside its box."""
+    if not reference:
+        return 1.0
+
+    def inside(word, ref):
+        x1, y1, x2, y2 = ref["box"]
+        cx, cy = (word["box"][0] + word["box"][2]) / 2, (word["box"][1] + word["box"][3]) / 2
+        return x1 - 1 <= cx <= x2 + 1 and y1 - 1 <= cy <= y2 + 1
+    found = sum(1 for ref in reference
+                if any(w["text"].lower() == ref["text"].lower() and inside(w, ref) for w in words))
+    return found / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=("auto", "tesseract", "fake"), default="auto")
+    parser.add_argument("--cost", type=float, default=0.25, help="Fake engine seconds per megapixel")
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    engine = None
+    if args.engine != "fake":
+        try:
+            engine = ocr_index.load_tesseract()
+        except LookupError as e:
+            if args.engine == "tesseract":
+                print(e)
+                return 1
+    name = "tesseract" if engine else f"fake ({args.cost:g}s/MP)"
+    engine = engine or FakeEngine(args.cost)
+
+    frames = scripted_frames()
+    rows, agreed = measure(engine, frames)
+    print(f"OCR index, {name} engine, {ocr_index.TILE_COLS}x{ocr_index.TILE_ROWS} tiles, {SCREEN[0]}x{SCREEN[1]}")
+    print(f"  {'step':14} {'tiles':>9} {'pixels':>7} {'incr s':>8} {'full s':>8} {'lines':>6}")
+    for r in rows:
+        print(f"  {r['step']:14} {r['tiles_ocr']:4}/{r['tiles']:<4} {r['pixels_share']:7.0%} "
+              f"{r['incremental_s']:8.3f} {r['full_s']:8.3f} {r['lines']:6}")
+    after_first = rows[1:]
+    inc = sum(r["incremental_s"] for r in after_first)
+    full = sum(r["full_s"] for r in after_first)
+    print(f"after the first frame: {inc:.2f}s incremental vs {full:.2f}s full ({inc / full:.0%})")
+    print(f"incremental vs fresh read of the last frame: {agreed:.1%} of words agree")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"engine": name, "steps": rows, "agreement": agreed}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
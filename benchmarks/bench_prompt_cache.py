@@ -0,0 +1,94 @@
+"""
+Measure the prompt prefix cache: the replay benchmark with the static prefix
+sent inline every request (AGENT_PROMPT_CACHE=0) vs held in the context cache.
+
+Reports per request the billed prompt tokens, how many of them came from the
+cache, the uncached remainder, and API latency. The mock server charges
+--prefill seconds per 1k uncached prompt tokens, so latency here stands in for
+time to first token (requests are not streamed). Token counts are the mock
+server's estimates (characters / 4), so treat them as relative numbers.
+
+Usage:
+    python benchmarks/bench_prompt_cache.py
+    python benchmarks/bench_prompt_cache.py --actions text --prefill 0.05 --json cache.json
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+from mock_model_server import MockModelServer
+
+SETTINGS = (("inline", "0"), ("cached", "1"))
+
+
+def measure(agent_module, frames, latency, prefill):
+    import replay_bench
+    results = {}
+    for label, flag in SETTINGS:
+        os.environ["AGENT_PROMPT_CACHE"] = flag
+        server = MockModelServer(latency=latency, prefill=prefill)
+        server.start()
+        try:
+            run = replay_bench.run_once(agent_module, frames, [], replay_bench.DEFAULT_TASK, server)
+        finally:
+            server.stop()
+        requests = run["requests"] or 1
+        api = [e["stages"].get("api", 0.0) * 1000 for e in run["events"]]
+        results[label] = {
+            "requests": run["requests"],
+            "prompt_tokens_per_request": run["prompt_tokens"] / requests,
+            "cached_tokens_per_request": run["cached_tokens"] / requests,
+            "uncached_tokens_per_request": (run["prompt_tokens"] - run["cached_tokens"]) / requests,
+            "api_ms_p50": statistics.median(api) if api else 0.0,
+            "api_ms_mean": statistics.fmean(api) if api else 0.0,
+        }
+    return results
+
+
+def print_comparison(results):
+    keys = ["prompt_tokens_per_request", "cached_tokens_per_request", "uncached_tokens_per_request",
+            "api_ms_p50", "api_ms_mean"]
+    print(f"  {'':28} {'inline':>10} {'cached':>10} {'change':>8}")
+    for key in keys:
+        a, b = results["inline"][key], results["cached"][key]
+        change = f"{(b - a) / a:+.0%}" if a else "n/a"
+        print(f"  {key:28} {a:10.1f} {b:10.1f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=6)
+    parser.add_argument("--actions", choices=("functions", "text"), default="functions")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock model latency in seconds")
+    parser.add_argument("--prefill", type=float, default=0.02, help="Mock seconds per 1k uncached prompt tokens")
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    fakes.install()
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    os.chdir(tempfile.mkdtemp(prefix="bench-prompt-cache-"))
+    os.environ["AGENT_RECORD"] = "0"
+    os.environ["AGENT_SKILLS"] = "0"
+    os.environ["AGENT_ACTIONS"] = args.actions
+    import agent as agent_module
+
+    results = measure(agent_module, fakes.synthetic_frames(args.frames), args.latency, args.prefill)
+    print(f"prompt prefix cache ({args.actions} mode, mock estimates)")
+    print_comparison(results)
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
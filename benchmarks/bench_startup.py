@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark: import and first-frame time in fresh interpreters.
+
+Each sample runs in a new Python process (bytecode already cached) and
+measures, cumulatively:
+    import_tools    import tools
+    import_agent    import agent
+    agent_ready     + ComputerUseAgent() with a Gemini client
+    first_frame     + first capture_screen()
+    daemon_ready    import agent_daemon + AgentDaemon warm-up (separate process)
+
+Input and capture use the headless stand-ins from fakes.py unless --real is
+given. --root points at another checkout (e.g. a git worktree of an older
+revision) to compare before/after.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 10
+    git worktree add /tmp/before HEAD~1 && python benchmarks/bench_startup.py --root /tmp/before
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from turn_metrics import percentile
+
+AGENT_PROBE = r"""
+import sys, time, json
+sys.path[:0] = [{root!r}, {here!r}]
+if {fake}:
+    import fakes
+    fakes.install()
+marks = {{}}
+t0 = time.perf_counter()
+import tools
+marks["import_tools"] = time.perf_counter() - t0
+import agent
+marks["import_agent"] = time.perf_counter() - t0
+a = agent.ComputerUseAgent(api_keys={{"gemini": "bench"}}, base_url="http://127.0.0.1:9")
+marks["agent_ready"] = time.perf_counter() - t0
+if {fake}:
+    pause = time.perf_counter()
+    sct = fakes.FakeMss(fakes.synthetic_frames(1))
+    t0 += time.perf_counter() - pause  # building the synthetic frame is not startup cost
+else:
+    sct = a.screen_factory()
+a.capture_screen(sct)
+marks["first_frame"] = time.perf_counter() - t0
+a.ledger.close()
+print(json.dumps(marks))
+"""
+
+DAEMON_PROBE = r"""
+import sys, time, json
+sys.path[:0] = [{root!r}, {here!r}]
+if {fake}:
+    import fakes
+    fakes.install()
+    frames = None
+t0 = time.perf_counter()
+import agent_daemon
+d = agent_daemon.AgentDaemon({{"gemini": "bench"}})
+if {fake}:
+    pause = time.perf_counter()
+    frames = fakes.synthetic_frames(1)
+    t0 += time.perf_counter() - pause
+    d.agent.screen_factory = lambda: fakes.FakeMss(frames)
+    d.agent.ui_summary_provider = lambda: fakes.SYNTHETIC_UI_SUMMARY
+d.start()
+print(json.dumps({{"daemon_ready": time.perf_counter() - t0}}))
+d.close()
+"""
+
+STAGES = ["import_tools", "import_agent", "agent_ready", "first_frame", "daemon_ready"]
+
+
+def run_probe(template, root, fake, cwd):
+    code = template.format(root=root, here=HERE, fake=fake)
+    env = dict(os.environ, AGENT_RECORD="0")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ROOT, help="Source tree to measure")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--real", action="store_true", help="Use the real pyautogui/mss backends (needs a display)")
+    parser.add_argument("--no-daemon", action="store_true", help="Skip the daemon warm-up probe")
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    fake = not args.real
+    cwd = tempfile.mkdtemp(prefix="bench-startup-")
+    probes = [AGENT_PROBE]
+    if not args.no_daemon and os.path.exists(os.path.join(root, "agent_daemon.py")):
+        probes.append(DAEMON_PROBE)
+
+    # One untimed run per probe so every sample sees warm bytecode caches
+    for probe in probes:
+        run_probe(probe, root, fake, cwd)
+
+    samples = {}
+    for _ in range(args.repeat):
+        for probe in probes:
+            for name, value in run_probe(probe, root, fake, cwd).items():
+                samples.setdefault(name, []).append(value)
+
+    report = {"root": root, "repeat": args.repeat, "fake_backends": fake, "stages": {}}
+    print(f"{root} ({args.repeat} runs, {'fake' if fake else 'real'} backends)")
+    print(f"{'stage':>14} {'p50 ms':>9} {'min ms':>9} {'max ms':>9}")
+    for name in STAGES:
+        if name not in samples:
+            continue
+        ordered = sorted(samples[name])
+        report["stages"][name] = {"p50": percentile(ordered, 50), "min": ordered[0], "max": ordered[-1]}
+        print(f"{name:>14} {percentile(ordered, 50)*1000:9.1f} {ordered[0]*1000:9.1f} {ordered[-1]*1000:9.1f}")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
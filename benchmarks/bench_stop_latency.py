@@ -0,0 +1,120 @@
+"""
+Measure stop latency: how long run_task takes to return after stop() while
+the agent is blocked in each kind of long operation.
+
+Scenarios (each turn's reply is scripted on the mock model server):
+    model      the model request itself is slow (--slow seconds)
+    shell      SHELL('sleep N'), killed on stop
+    wait_for   WAIT_FOR_PROCESS on a process that never appears
+    batch      one reply with many WAIT(1) actions
+    type       TYPE of a long string (the fake keyboard takes 10 ms per key)
+
+stop() is called --after seconds into the task, once the agent is inside the
+long operation. The mock server keeps serving a cancelled request, so only
+the agent side of the latency is measured.
+
+Usage:
+    python benchmarks/bench_stop_latency.py
+    python benchmarks/bench_stop_latency.py --runs 5 --slow 20 --json stop.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+from mock_model_server import MockModelServer
+
+DONE = "REASONING: Finished.\nACTION: DONE"
+
+
+def scenarios(slow):
+    long_text = "x" * int(slow * 100)
+    return {
+        "model": [{"text": DONE, "latency": slow}],
+        "shell": [f"REASONING: Run it.\nACTION: SHELL('sleep {slow:g}')", DONE],
+        "wait_for": [f"REASONING: Wait for it.\nACTION: WAIT_FOR_PROCESS('no-such-process', {slow:g})", DONE],
+        "batch": ["REASONING: Wait a while.\n" + "\n".join(["ACTION: WAIT(1)"] * int(slow)), DONE],
+        "type": [f"REASONING: Type it.\nACTION: TYPE('{long_text}')", DONE],
+    }
+
+
+def measure(agent_module, frames, script, after):
+    """Seconds from stop() to run_task returning, and the task status."""
+    server = MockModelServer(script=script)
+    server.start()
+    agent = agent_module.ComputerUseAgent(api_keys={"gemini": "mock"}, base_url=server.base_url)
+    agent.screen_factory = lambda: fakes.FakeMss(frames)
+    agent.ui_summary_provider = lambda: fakes.SYNTHETIC_UI_SUMMARY
+    result = {}
+    done = threading.Event()
+
+    def run():
+        result.update(agent.run_task("Stop latency benchmark", logger=lambda msg: None))
+        done.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    try:
+        thread.start()
+        time.sleep(after)
+        stopped = time.perf_counter()
+        agent.stop()
+        done.wait()
+        latency = time.perf_counter() - stopped
+    finally:
+        agent.ledger.close()
+        server.stop()
+    return latency, result.get("status")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--slow", type=float, default=10.0, help="Seconds each long operation would take")
+    parser.add_argument("--after", type=float, default=1.0, help="Seconds into the task to call stop()")
+    parser.add_argument("--only", action="append", help="Run only these scenarios")
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    fake = fakes.install()
+    # A keyboard that takes real time per key, as pyautogui.write(interval=...) does
+    fake.write = lambda text, interval=0.0, **kwargs: time.sleep(len(text) * interval)
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    os.chdir(tempfile.mkdtemp(prefix="bench-stop-latency-"))
+    os.environ["AGENT_RECORD"] = "0"
+    os.environ["AGENT_SKILLS"] = "0"
+    os.environ["AGENT_PROMPT_CACHE"] = "0"
+    import agent as agent_module
+
+    frames = fakes.synthetic_frames(2)
+    report = {}
+    print(f"stop latency, stop() {args.after:g}s into a {args.slow:g}s operation ({args.runs} runs)")
+    print(f"  {'scenario':10} {'p50 ms':>9} {'max ms':>9}  status")
+    for name, script in scenarios(args.slow).items():
+        if args.only and name not in args.only:
+            continue
+        latencies, statuses = [], set()
+        for _ in range(args.runs):
+            latency, status = measure(agent_module, frames, script, args.after)
+            latencies.append(latency * 1000)
+            statuses.add(status)
+        report[name] = {"p50_ms": statistics.median(latencies), "max_ms": max(latencies),
+                        "statuses": sorted(str(s) for s in statuses)}
+        print(f"  {name:10} {report[name]['p50_ms']:9.1f} {report[name]['max_ms']:9.1f}  {','.join(report[name]['statuses'])}")
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Headless stand-ins for the display and input backends used by benchmarks.
+
+install() must run before importing agent/tools: it registers a no-op
+pyautogui module that records calls instead of moving the real mouse.
+FakeMss replays a list of frames through the mss grab() interface.
+PIL is imported only where frames are built, so installing the fakes does
+not skew import-time measurements.
+"""
+import sys
+import types
+
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+
+class FakePyAutoGUI(types.ModuleType):
+    """pyautogui replacement: every input call is recorded and returns immediately."""
+
+    def __init__(self, screen_size=DEFAULT_SCREEN_SIZE):
+        super().__init__("pyautogui")
+        self.FAILSAFE = True
+        self.PAUSE = 0.0
+        self.screen_size = screen_size
+        self.calls = []
+        self._position = (0, 0)
+
+    def size(self):
+        return self.screen_size
+
+    def position(self):
+        return self._position
+
+    def moveTo(self, x=None, y=None, *args, **kwargs):
+        self.calls.append(("moveTo", (x, y)))
+        self._position = (x, y)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args))
+        return record
+
+
+def install(screen_size=DEFAULT_SCREEN_SIZE):
+    """Register FakePyAutoGUI as the pyautogui module. Returns the fake."""
+    fake = FakePyAutoGUI(screen_size)
+    sys.modules["pyautogui"] = fake
+    return fake
+
+
+def to_bgra(img):
+    """RGB PIL image -> raw BGRA bytes as mss returns them."""
+    from PIL import Image
+    r, g, b = img.convert("RGB").split()
+    alpha = Image.new("L", img.size, 255)
+    return Image.merge("RGBA", (b, g, r, alpha)).tobytes()
+
+
+class _Shot:
+    __slots__ = ("size", "bgra")
+
+    def __init__(self, size, bgra):
+        self.size = size
+        self.bgra = bgra
+
+
+class FakeMss:
+    """
+    mss.mss() replacement replaying frames in order.
+    Each grab() returns the next frame; the last frame repeats once exhausted.
+    """
+
+    def __init__(self, frames):
+        if not frames:
+            raise ValueError("FakeMss needs at least one frame")
+        self._shots = [_Shot(f.size, to_bgra(f)) for f in frames]
+        w, h = frames[0].size
+        self.monitors = [
+            {"left": 0, "top": 0, "width": w, "height": h},
+            {"left": 0, "top": 0, "width": w, "height": h},
+        ]
+        self.index = 0
+        self.grabs = 0
+
+    def grab(self, monitor):
+        shot = self._shots[min(self.index, len(self._shots) - 1)]
+        self.index += 1
+        self.grabs += 1
+        return shot
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+
+def synthetic_frames(count, size=DEFAULT_SCREEN_SIZE, seed=0):
+    """
+    Deterministic desktop-like frames: a title bar, a sidebar and a text
+    area whose content changes every frame.
+    """
+    import random
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    w, h = size
+    frames = []
+    for i in range(count):
+        img = Image.new("RGB", size, (236, 239, 244))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([0, 0, w, 40], fill=(40, 44, 52))
+        draw.text((12, 12), f"Synthetic Window - frame {i}", fill=(255, 255, 255))
+        draw.rectangle([0, 40, 240, h], fill=(250, 250, 250))
+        for row in range(12):
+            draw.text((16, 60 + row * 28), f"Item {row}", fill=(20, 20, 20))
+        for line in range(20 + i % 10):
+            text = " ".join(rng.choice(["lorem", "ipsum", "dolor", "sit", "amet", "agent", "turn"]) for _ in range(8))
+            draw.text((280, 70 + line * 22), text, fill=(30, 30, 30))
+        draw.rectangle([w - 200, h - 80, w - 40, h - 40], outline=(0, 120, 215), width=2)
+        draw.text((w - 170, h - 68), "OK", fill=(0, 120, 215))
+        frames.append(img)
+    return frames
+
+
+SYNTHETIC_UI_SUMMARY = """Foreground Window: Synthetic Window
+Detected UI Elements:
+- Button: "File" at (20, 30)
+- Button: "Edit" at (60, 30)
+- Edit: "Search" at (500, 60)
+- ListItem: "Item 0" at (40, 80)
+- ListItem: "Item 1" at (40, 105)
+- Button: "OK" at (937, 944)"""
+
+
+class _ControlType:
+    ButtonControl = 50000
+    EditControl = 50004
+    MenuItemControl = 50011
+    HyperlinkControl = 50005
+    ComboBoxControl = 50003
+    TabItemControl = 50019
+    ListItemControl = 50007
+    TextControl = 50020
+    TreeItemControl = 50024
+    MenuBarControl = 50010
+    PaneControl = 50033
+    WindowControl = 50032
+
+
+_CONTROL_NAMES = {v: k for k, v in vars(_ControlType).items() if not k.startswith("_")}
+
+
+class _Rect:
+    __slots__ = ("left", "top", "right", "bottom")
+
+    def __init__(self, left, top, right, bottom):
+        self.left, self.top, self.right, self.bottom = left, top, right, bottom
+
+    def width(self):
+        return self.right - self.left
+
+    def height(self):
+        return self.bottom - self.top
+
+
+class FakeControl:
+    """Minimal uiautomation Control: Name, ControlType, BoundingRectangle, GetChildren()."""
+
+    def __init__(self, name, control_type, rect, children=()):
+        self.Name = name
+        self.ControlType = control_type
+        self.ControlTypeName = _CONTROL_NAMES[control_type]
+        self.BoundingRectangle = _Rect(*rect)
+        self._children = list(children)
+
+    def GetChildren(self):
+        return self._children
+
+
+def synthetic_control_tree(rows=12, cols=8, screen_size=DEFAULT_SCREEN_SIZE):
+    """A window with a toolbar, a list and a grid of buttons, including near-duplicates."""
+    w, h = screen_size
+    ct = _ControlType
+    toolbar = FakeControl("Toolbar", ct.PaneControl, (0, 0, w, 40), [
+        FakeControl(name, ct.ButtonControl, (10 + i * 60, 5, 60 + i * 60, 35))
+        for i, name in enumerate(["File", "Edit", "View", "Help"])
+    ])
+    items = FakeControl("List", ct.PaneControl, (0, 40, 240, h), [
+        FakeControl(f"Item {i}", ct.ListItemControl, (0, 40 + i * 28, 240, 66 + i * 28)) for i in range(rows)
+    ])
+    grid = []
+    for r in range(rows):
+        row = [FakeControl(f"Cell {r},{c}", ct.ButtonControl, (260 + c * 100, 60 + r * 40, 350 + c * 100, 95 + r * 40))
+               for c in range(cols)]
+        # Same control reported twice, as nested UIA providers often do
+        row.append(FakeControl(f"Cell {r},0", ct.ButtonControl, (261, 61 + r * 40, 351, 96 + r * 40)))
+        grid.append(FakeControl(f"Row {r}", ct.PaneControl, (260, 60 + r * 40, w, 95 + r * 40), row))
+    content = FakeControl("Content", ct.PaneControl, (240, 40, w, h), grid)
+    return FakeControl("Synthetic Window", ct.WindowControl, (0, 0, w, h), [toolbar, items, content])
+
+
+class FakeUIAutomation(types.ModuleType):
+    """uiautomation replacement whose foreground window is a fixed control tree."""
+
+    ControlType = _ControlType
+
+    def __init__(self, window):
+        super().__init__("uiautomation")
+        self.window = window
+
+    def GetForegroundWindow(self):
+        return self.window
@@ -0,0 +1,229 @@
+"""
+Microbenchmarks for the agent and tools hot paths.
+
+Runs on fixed synthetic inputs with fake mss / pyautogui / uiautomation
+stand-ins, so no display or network is needed. Results are written as JSON
+and compared against a stored baseline; any benchmark slower than
+baseline * (1 + threshold) is reported, and with --check fails the run.
+Use --check against a baseline recorded on the same machine.
+
+Each benchmark is timed next to a fixed calibration loop (Python bytecode
+plus zlib and hashlib over a buffer), and is compared as the ratio of its
+fastest sample to the calibration's. A baseline recorded on one machine
+therefore still applies on a faster or slower one, or under a changing load.
+
+Usage:
+    python benchmarks/microbench.py                      # run + compare with baseline
+    python benchmarks/microbench.py --update-baseline    # record a new baseline
+    python benchmarks/microbench.py --check              # exit 1 on regressions
+    python benchmarks/microbench.py --only ahash --out results.json
+"""
+import io
+import os
+import zlib
+import hashlib
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+
+BASELINE_FILE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUT = "microbench_results.json"
+DEFAULT_THRESHOLD = 0.25
+SCREEN_SIZE = (2560, 1440)
+CALIBRATION_DATA = bytes(range(256)) * 1024
+
+
+def calibration():
+    """Fixed mix of interpreter and C work that machine speed scales like the benchmarks."""
+    total = 0
+    for i in range(5000):
+        total += i * i % 7
+    zlib.compress(CALIBRATION_DATA, 1)
+    hashlib.blake2b(CALIBRATION_DATA).digest()
+    return total
+
+
+def build_benchmarks():
+    """Return {name: zero-arg callable}. Imports the agent only after fakes are installed."""
+    fakes.install(screen_size=SCREEN_SIZE)
+    sys.modules["uiautomation"] = fakes.FakeUIAutomation(fakes.synthetic_control_tree(screen_size=SCREEN_SIZE))
+
+    import agent
+    import tools
+    import ui_inspector
+    import screen_history
+    ui_inspector.auto = sys.modules["uiautomation"]
+
+    frame = fakes.synthetic_frames(1, size=SCREEN_SIZE)[0]
+    sct = fakes.FakeMss([frame])
+    os.environ["AGENT_RECORD"] = "0"
+    bench_agent = agent.ComputerUseAgent()
+    captured = bench_agent.capture_screen(sct)
+    hash_a = agent._ahash(captured)
+    hash_b = hash_a ^ 0b1011
+
+    def capture():
+        bench_agent.capture_screen(sct)
+
+    def jpeg_encode():
+        buf = io.BytesIO()
+        captured.save(buf, format="JPEG")
+
+    action_lines = [
+        "ACTION: CLICK(500, 500)",
+        "ACTION: TYPE('hello, world')",
+        "ACTION: HOTKEY('ctrl', 'shift', 'esc')",
+        "ACTION: DRAG(100, 200, 300, 400)",
+        "ACTION: SCROLL_AT(500, 500, -5)",
+    ]
+
+    def execute_actions():
+        for line in action_lines:
+            bench_agent.execute_action(line)
+
+    def denormalize():
+        for x in range(0, 1000, 10):
+            tools.denormalize(x, 1000 - x)
+
+    history = [object() for _ in range(agent.MAX_CONTEXT_MESSAGES + 2)]
+
+    def prune():
+        h = list(history)
+        for _ in range(100):
+            h.append(object())
+            h = agent.prune_history(h)
+
+    # A full index of alternating screens: every lookup scans it and finds a cycle
+    frames = fakes.synthetic_frames(2, size=SCREEN_SIZE)
+    prints = [screen_history.fingerprint(f) for f in frames]
+    screens = screen_history.ScreenHistory()
+    for turn in range(screen_history.DEFAULT_CAPACITY):
+        screens.add(turn, prints[turn % 2])
+
+    def screen_cycle():
+        screens.add(0, prints[0])
+        screens.detect_cycle()
+
+    sys.modules["pyautogui"].calls.clear()
+    return {
+        "capture_screen": capture,
+        "ahash": lambda: agent._ahash(captured),
+        "hamming_distance": lambda: agent._hamming_distance(hash_a, hash_b),
+        "screen_fingerprint": lambda: screen_history.fingerprint(captured),
+        "screen_cycle_lookup": screen_cycle,
+        "jpeg_encode": jpeg_encode,
+        "execute_action_x5": execute_actions,
+        "ui_tree_summary": ui_inspector.get_ui_tree_summary,
+        "denormalize_x100": denormalize,
+        "prune_history_x100": prune,
+    }
+
+
+def measure(func, repeat=7, min_time=0.2):
+    """Median/min seconds per call over `repeat` samples of an auto-ranged loop."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    samples = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {
+        "median_us": samples[len(samples) // 2] * 1e6,
+        "min_us": samples[0] * 1e6,
+        "max_us": samples[-1] * 1e6,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of (name, baseline_us, current_us, ratio) regressions.
+    Both sides are scaled by their calibration timing when they have one;
+    baseline_us is the baseline's time scaled to this run's calibration.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            continue
+        if base.get("calibration_us") and result.get("calibration_us"):
+            expected = base["min_us"] * result["calibration_us"] / base["calibration_us"]
+            current = result["min_us"]
+        else:
+            expected, current = base["median_us"], result["median_us"]
+        ratio = current / expected if expected else 1.0
+        if ratio > 1.0 + threshold:
+            regressions.append((name, expected, current, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Results JSON path")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a benchmark counts as regressed (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="Exit 1 when a benchmark regressed")
+    parser.add_argument("--only", action="append", help="Run only the named benchmark(s)")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    baseline_path = os.path.abspath(args.baseline)
+    # The agent writes a usage ledger on construction; keep it out of the tree
+    os.chdir(tempfile.mkdtemp(prefix="microbench-"))
+    benchmarks = build_benchmarks()
+    if args.only:
+        benchmarks = {k: v for k, v in benchmarks.items() if k in args.only}
+
+    results = {}
+    for name, func in benchmarks.items():
+        results[name] = measure(func, repeat=args.repeat)
+        results[name]["calibration_us"] = measure(calibration, repeat=args.repeat)["min_us"]
+        print(f"{name:>20}: {results[name]['median_us']:12.2f} us  (min {results[name]['min_us']:.2f}, "
+              f"calibration {results[name]['calibration_us']:.2f})")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {out}")
+
+    if args.update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline updated: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("no baseline found; run with --update-baseline to create one")
+        return 0
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, base, cur, ratio in regressions:
+        print(f"{'REGRESSION' if args.check else 'slower'} {name}: {base:.2f} us (baseline, calibrated) "
+              f"-> {cur:.2f} us ({ratio:.2f}x)")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%} vs baseline ({baseline.get('created')})")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
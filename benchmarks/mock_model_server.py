@@ -0,0 +1,282 @@
+"""
+Mock Gemini server speaking the generateContent REST protocol.
+
+Returns scripted responses with configurable latency and reports request
+bytes and estimated token counts in usageMetadata, so the agent can run
+end-to-end without network access or API cost.
+
+It also stands in for the context cache: POST cachedContents stores a
+prefix's token estimate, and requests naming it with cachedContent are
+charged those tokens as cachedContentTokenCount. --prefill adds latency per
+1k uncached prompt tokens, to model time to first token.
+
+Point the agent at it with GEMINI_BASE_URL=http://127.0.0.1:<port>.
+
+Usage:
+    python benchmarks/mock_model_server.py --port 8765 --script responses.json --latency 0.8
+"""
+import re
+import io
+import sys
+import json
+import math
+import time
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTE = re.compile(r"^/(v1beta|v1alpha|v1)/(?:models|tunedModels)/([^/:]+):(generateContent|streamGenerateContent)")
+CACHE_ROUTE = re.compile(r"^/(v1beta|v1alpha|v1)/cachedContents$")
+
+DEFAULT_SCRIPT = [
+    "REASONING: Open the menu.\nACTION: CLICK(20, 30)",
+    "REASONING: Type the query.\nACTION: CLICK(500, 60)\nACTION: TYPE('hello world')\nACTION: PRESS('enter')",
+    "REASONING: Scroll to the results.\nACTION: SCROLL(-5)",
+    "REASONING: Confirm.\nACTION: CLICK(937, 944)",
+    "REASONING: The task is complete.\nACTION: DONE",
+]
+
+
+def decode_inline_data(data):
+    """Inline data may arrive as standard or URL-safe base64, with or without padding."""
+    data = data + "=" * (-len(data) % 4)
+    if "-" in data or "_" in data:
+        return base64.urlsafe_b64decode(data)
+    return base64.b64decode(data)
+
+
+def estimate_image_tokens(data):
+    """Gemini-style image cost: 258 tokens per 768px tile (one tile if both sides <= 384)."""
+    try:
+        from PIL import Image
+        w, h = Image.open(io.BytesIO(data)).size
+    except Exception:
+        return 258
+    if w <= 384 and h <= 384:
+        return 258
+    return 258 * math.ceil(w / 768) * math.ceil(h / 768)
+
+
+def estimate_prompt_tokens(body):
+    tokens = 0
+    parts = []
+    system = body.get("systemInstruction") or body.get("system_instruction")
+    if system:
+        parts.extend(system.get("parts", []))
+    for content in body.get("contents", []):
+        parts.extend(content.get("parts", []))
+    # Function declarations are billed as prompt tokens on every request
+    if body.get("tools"):
+        tokens += len(json.dumps(body["tools"])) // 4
+    for part in parts:
+        if "text" in part:
+            tokens += max(1, len(part["text"]) // 4)
+        inline = part.get("inlineData") or part.get("inline_data")
+        if inline:
+            tokens += estimate_image_tokens(decode_inline_data(inline.get("data", "")))
+        if "functionResponse" in part or "function_response" in part:
+            tokens += len(json.dumps(part)) // 4
+    return tokens
+
+
+class ScriptedError(Exception):
+    def __init__(self, status):
+        super().__init__(f"Scripted error {status}")
+        self.status = status
+
+
+class MockModelServer:
+    """
+    Threaded HTTP server replaying a response script.
+    Script entries are response texts, or dicts with 'text' or raw 'parts'
+    and an optional per-response 'latency'; a dict with 'error' (an HTTP
+    status) is answered with that error. The last entry repeats once the
+    script is exhausted.
+    """
+
+    def __init__(self, script=None, latency=0.0, jitter=0.0, host="127.0.0.1", port=0, seed=0, prefill=0.0):
+        self.script = list(script or DEFAULT_SCRIPT)
+        self.latency = latency
+        self.jitter = jitter
+        # Seconds per 1k uncached prompt tokens
+        self.prefill = prefill
+        self.caches = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                match = ROUTE.match(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length)
+                if CACHE_ROUTE.match(self.path):
+                    try:
+                        self._send(200, server.create_cache(json.loads(raw or b"{}")))
+                    except ValueError:
+                        self._send(400, {"error": {"code": 400, "message": "Invalid JSON"}})
+                    return
+                if not match:
+                    self._send(404, {"error": {"code": 404, "message": f"Unknown route {self.path}"}})
+                    return
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    self._send(400, {"error": {"code": 400, "message": "Invalid JSON"}})
+                    return
+                try:
+                    payload = server.handle(body, len(raw))
+                except KeyError as e:
+                    self._send(404, {"error": {"code": 404, "message": f"Cached content {e} not found"}})
+                    return
+                except ScriptedError as e:
+                    self._send(e.status, {"error": {"code": e.status, "message": str(e)}})
+                    return
+                except Exception as e:
+                    self._send(500, {"error": {"code": 500, "message": f"Mock server error: {e}"}})
+                    return
+                if match.group(3) == "streamGenerateContent":
+                    data = f"data: {json.dumps(payload)}\r\n\r\n".encode()
+                    self._send_raw(200, data, "text/event-stream")
+                else:
+                    self._send(200, payload)
+
+            def _send(self, status, payload):
+                self._send_raw(status, json.dumps(payload).encode(), "application/json")
+
+            def _send_raw(self, status, data, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # the client gave up on the request (e.g. the agent was stopped)
+                with server._lock:
+                    server.bytes_sent += len(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.prompt_tokens = 0
+            self.cached_tokens = 0
+            self.output_tokens = 0
+
+    def create_cache(self, body):
+        tokens = estimate_prompt_tokens(body)
+        with self._lock:
+            name = f"cachedContents/mock-{len(self.caches) + 1}"
+            self.caches[name] = tokens
+        ttl = float(str(body.get("ttl", "3600s")).rstrip("s") or 3600)
+        expire = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + ttl))
+        return {
+            "name": name,
+            "model": body.get("model", ""),
+            "displayName": body.get("displayName", ""),
+            "expireTime": expire,
+            "usageMetadata": {"totalTokenCount": tokens},
+        }
+
+    def handle(self, body, body_size):
+        prompt_tokens = estimate_prompt_tokens(body)
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            # Unknown names raise KeyError, answered with 404 like an expired cache
+            with self._lock:
+                cached_tokens = self.caches[body["cachedContent"]]
+            prompt_tokens += cached_tokens
+        with self._lock:
+            index = min(self.requests, len(self.script) - 1)
+            self.requests += 1
+            self.bytes_received += body_size
+            entry = self.script[index]
+            delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+
+        if isinstance(entry, str):
+            entry = {"text": entry}
+        delay = entry.get("latency", delay) + self.prefill * (prompt_tokens - cached_tokens) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        if entry.get("error"):
+            raise ScriptedError(int(entry["error"]))
+
+        parts = entry.get("parts") or [{"text": entry.get("text", "")}]
+        output_tokens = sum(max(1, len(json.dumps(p)) // 4) for p in parts)
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.output_tokens += output_tokens
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": parts},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "cachedContentTokenCount": cached_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": "mock",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-model-server", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with a list of scripted responses")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of simulated model latency")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on latency")
+    parser.add_argument("--prefill", type=float, default=0.0, help="Extra seconds per 1k uncached prompt tokens")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    server = MockModelServer(script, latency=args.latency, jitter=args.jitter, host=args.host, port=args.port,
+                             prefill=args.prefill)
+    print(f"Mock model server on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
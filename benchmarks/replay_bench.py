@@ -0,0 +1,198 @@
+"""
+Offline end-to-end replay benchmark for ComputerUseAgent.run_task.
+
+Drives the real agent loop against recorded (or synthetic) screens, a no-op
+input backend and a local mock model server, then reports turns per second,
+per-stage latency distributions and bytes/tokens sent. Needs no display,
+network or API key.
+
+A scenario directory contains:
+    frames/0000.png ...   one screen per turn (png or jpg)
+    ui.jsonl              optional, one JSON string of UI metadata per turn
+    responses.json        optional, scripted model responses (see mock_model_server)
+    task.txt              optional, the task instruction
+
+Usage:
+    python benchmarks/replay_bench.py                          # built-in synthetic scenario
+    python benchmarks/replay_bench.py --scenario runs/notepad --latency 0.8 --repeat 3
+    python benchmarks/replay_bench.py --json bench_output.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+from mock_model_server import MockModelServer, DEFAULT_SCRIPT
+from turn_metrics import percentile, TURN_STAGES
+
+DEFAULT_TASK = "Search for 'hello world' in the synthetic window and confirm."
+
+
+def load_scenario(path):
+    """Return (frames, ui_summaries, script, task) for a scenario directory."""
+    from PIL import Image
+    files = sorted(glob.glob(os.path.join(path, "frames", "*.png")) + glob.glob(os.path.join(path, "frames", "*.jpg")))
+    if not files:
+        raise SystemExit(f"No frames found in {path}/frames")
+    frames = [Image.open(f).convert("RGB") for f in files]
+
+    ui = []
+    ui_file = os.path.join(path, "ui.jsonl")
+    if os.path.exists(ui_file):
+        with open(ui_file, "r", encoding="utf-8") as f:
+            ui = [json.loads(line) for line in f if line.strip()]
+
+    script = None
+    script_file = os.path.join(path, "responses.json")
+    if os.path.exists(script_file):
+        with open(script_file, "r", encoding="utf-8") as f:
+            script = json.load(f)
+
+    task = DEFAULT_TASK
+    task_file = os.path.join(path, "task.txt")
+    if os.path.exists(task_file):
+        with open(task_file, "r", encoding="utf-8") as f:
+            task = f.read().strip()
+    return frames, ui, script, task
+
+
+def distribution(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"n": 0}
+    return {
+        "n": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "max": ordered[-1],
+    }
+
+
+def run_once(agent_module, frames, ui, task, server, verbose=False):
+    agent = agent_module.ComputerUseAgent(api_keys={"gemini": "mock"}, base_url=server.base_url)
+    agent.screen_factory = lambda: fakes.FakeMss(frames)
+
+    ui_calls = [0]
+
+    def ui_summary():
+        i = ui_calls[0]
+        ui_calls[0] += 1
+        if not ui:
+            return fakes.SYNTHETIC_UI_SUMMARY
+        return ui[min(i, len(ui) - 1)]
+    agent.ui_summary_provider = ui_summary
+
+    events = []
+    log = print if verbose else (lambda msg: None)
+    server.reset_stats()
+    start = time.perf_counter()
+    agent.run_task(task, logger=log, timing_callback=events.append)
+    elapsed = time.perf_counter() - start
+    agent.ledger.close()
+    return {
+        "turns": len(events),
+        "seconds": elapsed,
+        "events": events,
+        "requests": server.requests,
+        "bytes_sent": server.bytes_received,
+        "bytes_received": server.bytes_sent,
+        "prompt_tokens": server.prompt_tokens,
+        "cached_tokens": server.cached_tokens,
+        "output_tokens": server.output_tokens,
+    }
+
+
+def summarize(runs):
+    turns = sum(r["turns"] for r in runs)
+    seconds = sum(r["seconds"] for r in runs)
+    stage_values = {}
+    totals = []
+    for r in runs:
+        for event in r["events"]:
+            totals.append(event["total"])
+            for name, value in event["stages"].items():
+                stage_values.setdefault(name, []).append(value)
+    names = [s for s in TURN_STAGES if s in stage_values] + [s for s in stage_values if s not in TURN_STAGES]
+    requests = sum(r["requests"] for r in runs) or 1
+    return {
+        "runs": len(runs),
+        "turns": turns,
+        "seconds": seconds,
+        "turns_per_second": turns / seconds if seconds else 0.0,
+        "turn_latency": distribution(totals),
+        "stages": {name: distribution(stage_values[name]) for name in names},
+        "requests": sum(r["requests"] for r in runs),
+        "bytes_sent": sum(r["bytes_sent"] for r in runs),
+        "bytes_sent_per_request": sum(r["bytes_sent"] for r in runs) / requests,
+        "prompt_tokens": sum(r["prompt_tokens"] for r in runs),
+        "output_tokens": sum(r["output_tokens"] for r in runs),
+        "prompt_tokens_per_request": sum(r["prompt_tokens"] for r in runs) / requests,
+    }
+
+
+def print_report(report):
+    print(f"runs={report['runs']} turns={report['turns']} wall={report['seconds']:.2f}s "
+          f"turns/s={report['turns_per_second']:.2f}")
+    t = report["turn_latency"]
+    if t["n"]:
+        print(f"turn latency: mean {t['mean']*1000:.1f}ms p50 {t['p50']*1000:.1f}ms p95 {t['p95']*1000:.1f}ms")
+    print(f"{'stage':>10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, d in report["stages"].items():
+        print(f"{name:>10} {d['mean']*1000:9.2f} {d['p50']*1000:9.2f} {d['p95']*1000:9.2f} {d['max']*1000:9.2f}")
+    print(f"requests={report['requests']} bytes sent={report['bytes_sent']} "
+          f"({report['bytes_sent_per_request']/1024:.1f} KiB/request)")
+    print(f"tokens: prompt={report['prompt_tokens']} ({report['prompt_tokens_per_request']:.0f}/request) "
+          f"output={report['output_tokens']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", help="Scenario directory (default: synthetic)")
+    parser.add_argument("--frames", type=int, default=8, help="Synthetic frame count")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", dest="json_out", help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Print the agent log")
+    args = parser.parse_args()
+
+    if args.scenario:
+        frames, ui, script, task = load_scenario(args.scenario)
+    else:
+        frames, ui, script, task = fakes.synthetic_frames(args.frames), [], DEFAULT_SCRIPT, DEFAULT_TASK
+
+    fakes.install(screen_size=frames[0].size)
+    json_out = os.path.abspath(args.json_out) if args.json_out else None
+    # Keep the usage ledger and traces out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix="replay-bench-"))
+    # Repeats measure model turns, so later runs must not replay a skill learned by the first
+    os.environ["AGENT_SKILLS"] = "0"
+    import agent as agent_module
+
+    server = MockModelServer(script, latency=args.latency, jitter=args.jitter)
+    server.start()
+    try:
+        runs = [run_once(agent_module, frames, ui, task, server, args.verbose) for _ in range(args.repeat)]
+    finally:
+        server.stop()
+
+    report = summarize(runs)
+    print_report(report)
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Soak test: run synthetic tasks in a loop on one warm agent and watch memory
+and latency over time.
+
+The real run_task loop runs against the stand-ins used by the other
+benchmarks (synthetic frames, the no-op input backend, the mock model
+server). Every --error-every tasks the model answers with an error, to cover
+the error path. Every --sample-every tasks (after gc.collect) it records:
+    rss            resident set size (psutil), and its high-water mark
+    traced         bytes held by Python allocations (tracemalloc), and its peak
+    objects        objects tracked by the garbage collector
+    threads, fds   live threads and open file descriptors
+    latency        p50/p95/max of turn time and of each turn stage since the last sample
+
+After the --warmup tasks, it compares the rest of the run against thresholds:
+    leak     the slope of traced or objects per 1000 tasks (least squares over
+             the second half of the run, once caches and the allocator have
+             settled), or any growth in threads or fds. RSS swings by tens of
+             MB as frame buffers are freed and reused, so it is flagged only
+             when its slope is over the limit and its high-water mark rose by
+             more than RSS_NOISE_MB in that second half (hours-long runs are
+             needed to see a slow native leak this way)
+    drift    p50 of the last quarter of the run vs the first quarter, per stage
+It also lists the allocation sites and object types that grew the most
+between the end of the warm-up and the end of the run.
+
+The report (JSON) holds the samples, the findings and the git revision, so
+runs of different versions can be compared: --compare an older report prints
+the change in each headline number. Exits 1 when anything is flagged.
+
+Recording and skills are off unless set in the environment (AGENT_RECORD,
+AGENT_SKILLS); the agent writes its files to a temporary directory.
+
+Usage:
+    python benchmarks/soak.py --tasks 300
+    python benchmarks/soak.py --minutes 60 --out soak_report.json --compare soak_baseline.json
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import threading
+import statistics
+import subprocess
+import tracemalloc
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import fakes
+from mock_model_server import MockModelServer, DEFAULT_SCRIPT
+from turn_metrics import percentile, TURN_STAGES
+
+DEFAULT_OUT = "soak_report.json"
+TASK = "Search for 'hello world' in the synthetic window and confirm (run {n})."
+ERROR_SCRIPT = [DEFAULT_SCRIPT[0], {"error": 400}]
+
+# Leak thresholds, per 1000 tasks after the warm-up
+MAX_RSS_SLOPE_MB = 16.0
+MAX_TRACED_SLOPE_MB = 8.0
+MAX_OBJECTS_SLOPE = 20000
+# RSS high-water rise in the second half that counts as growth rather than allocator noise
+RSS_NOISE_MB = 32.0
+# Drift: last quarter p50 over first quarter p50, ignored below MIN_DRIFT_MS of change
+MAX_DRIFT = 1.25
+MIN_DRIFT_MS = 5.0
+TOP_N = 10
+TRACE_FRAMES = 8
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs; 0.0 with fewer than two distinct xs."""
+    if len(set(xs)) < 2:
+        return 0.0
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def type_counts():
+    return Counter(type(o).__qualname__ for o in gc.get_objects())
+
+
+def peak_rss():
+    """Process high-water RSS in bytes, or None where getrusage is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class Soak:
+    def __init__(self, agent_module, server, frames, error_every=10, trace=True):
+        self.server = server
+        self.error_every = error_every
+        self.trace = trace
+        self.agent = agent_module.ComputerUseAgent(api_keys={"gemini": "mock"}, base_url=server.base_url)
+        self.agent.screen_factory = lambda: fakes.FakeMss(frames)
+        self.agent.ui_summary_provider = lambda: fakes.SYNTHETIC_UI_SUMMARY
+        self.process = None
+        try:
+            import psutil
+            self.process = psutil.Process()
+        except ImportError:
+            pass
+        self.tasks = 0
+        self.statuses = Counter()
+        self.samples = []
+        self._events = []
+        self._start = None
+
+    def run_task(self):
+        self.tasks += 1
+        failing = self.error_every and self.tasks % self.error_every == 0
+        self.server.script = list(ERROR_SCRIPT if failing else DEFAULT_SCRIPT)
+        self.server.reset_stats()
+        result = self.agent.run_task(TASK.format(n=self.tasks), logger=lambda msg: None,
+                                     timing_callback=self._events.append)
+        self.statuses[result["status"]] += 1
+
+    def sample(self):
+        gc.collect()
+        events, self._events = self._events, []
+        latency = {}
+        for stage in ("total",) + TURN_STAGES:
+            values = sorted((e["total"] if stage == "total" else e["stages"].get(stage, 0.0)) * 1000 for e in events)
+            if values:
+                latency[stage] = {"p50": percentile(values, 50), "p95": percentile(values, 95), "max": values[-1]}
+        traced = tracemalloc.get_traced_memory() if self.trace else (None, None)
+        record = {
+            "tasks": self.tasks,
+            "seconds": time.perf_counter() - self._start,
+            "rss": self.process.memory_info().rss if self.process else None,
+            "rss_peak": peak_rss(),
+            "traced": traced[0],
+            "traced_peak": traced[1],
+            "objects": len(gc.get_objects()),
+            "threads": threading.active_count(),
+            "fds": self.process.num_fds() if self.process and hasattr(self.process, "num_fds") else None,
+            "turns": len(events),
+            "latency": latency,
+        }
+        self.samples.append(record)
+        return record
+
+    def run(self, tasks, minutes, warmup, sample_every, log=print):
+        self._start = time.perf_counter()
+        if self.trace:
+            tracemalloc.start(TRACE_FRAMES)
+        deadline = self._start + minutes * 60 if minutes else None
+        baseline = None
+        try:
+            while (not tasks or self.tasks < tasks) and (deadline is None or time.perf_counter() < deadline):
+                self.run_task()
+                if self.tasks == warmup:
+                    self.sample()
+                    gc.collect()
+                    baseline = (tracemalloc.take_snapshot() if self.trace else None, type_counts())
+                elif self.tasks % sample_every == 0:
+                    s = self.sample()
+                    log(f"  task {s['tasks']:5}  {s['seconds']:7.0f}s  rss {_mb(s['rss'])}  traced {_mb(s['traced'])}  "
+                        f"objects {s['objects']:8}  threads {s['threads']:3}  "
+                        f"turn p50 {s['latency'].get('total', {}).get('p50', 0):6.1f}ms")
+            if not self.samples or self.samples[-1]["tasks"] != self.tasks:
+                self.sample()
+            growth = {}
+            if baseline is not None:
+                gc.collect()
+                growth = self._growth(*baseline)
+        finally:
+            if self.trace:
+                tracemalloc.stop()
+            self.agent.ledger.close()
+        return growth
+
+    def _growth(self, snapshot, counts):
+        growth = {"allocations": [], "types": []}
+        # Counted first: the snapshot diff below allocates thousands of objects of its own
+        now = type_counts()
+        if snapshot is not None:
+            # The soak's own samples and bookkeeping are not the agent's growth
+            ours = (tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__))
+            stats = tracemalloc.take_snapshot().filter_traces(ours).compare_to(snapshot.filter_traces(ours), "lineno")
+            for stat in sorted(stats, key=lambda s: -s.size_diff)[:TOP_N]:
+                if stat.size_diff <= 0:
+                    break
+                frame = stat.traceback[0]
+                growth["allocations"].append({"site": f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno}",
+                                              "bytes": stat.size_diff, "count": stat.count_diff})
+        changes = Counter({name: now[name] - counts.get(name, 0) for name in now})
+        growth["types"] = [{"type": name, "count": n} for name, n in changes.most_common(TOP_N) if n > 0]
+        return growth
+
+
+def _mb(value):
+    return f"{value / 1e6:8.1f}MB" if value is not None else "     n/a"
+
+
+def analyze(samples, warmup):
+    """Slopes, watermarks, drift and findings over the samples taken after the warm-up."""
+    steady = [s for s in samples if s["tasks"] >= warmup]
+    result = {"slopes": {}, "watermarks": {}, "drift": {}, "findings": []}
+    if len(steady) < 4:
+        result["findings"].append("too few samples after the warm-up to judge leaks or drift")
+        return result
+    tail = steady[len(steady) // 2:]
+    tasks = [s["tasks"] for s in tail]
+    for key in ("rss_peak", "traced_peak"):
+        if tail[0].get(key) is not None:
+            result["watermarks"][key] = {"mid": tail[0][key] / 1e6, "end": tail[-1][key] / 1e6}
+    for key, limit, scale, unit in (("rss", MAX_RSS_SLOPE_MB, 1e6, "MB"), ("traced", MAX_TRACED_SLOPE_MB, 1e6, "MB"),
+                                    ("objects", MAX_OBJECTS_SLOPE, 1, "objects")):
+        if tail[0][key] is None:
+            continue
+        per_1000 = slope(tasks, [s[key] for s in tail]) * 1000 / scale
+        result["slopes"][key] = per_1000
+        if per_1000 <= limit:
+            continue
+        mark = result["watermarks"].get("rss_peak")
+        if key == "rss" and mark and mark["end"] - mark["mid"] <= RSS_NOISE_MB:
+            continue  # swinging under a fixed high-water mark, not growing
+        result["findings"].append(f"leak: {key} grows {per_1000:.1f} {unit} per 1000 tasks (limit {limit:g})")
+    for key in ("threads", "fds"):
+        if steady[0][key] is not None and steady[-1][key] > steady[0][key]:
+            result["findings"].append(f"leak: {key} went from {steady[0][key]} to {steady[-1][key]}")
+
+    quarter = max(1, len(steady) // 4)
+    for stage in ("total",) + TURN_STAGES:
+        first = [s["latency"][stage]["p50"] for s in steady[1:1 + quarter] if stage in s["latency"]]
+        last = [s["latency"][stage]["p50"] for s in steady[-quarter:] if stage in s["latency"]]
+        if not first or not last:
+            continue
+        before, after = statistics.median(first), statistics.median(last)
+        ratio = after / before if before else 1.0
+        worst = max(s["latency"][stage]["max"] for s in steady if stage in s["latency"])
+        result["drift"][stage] = {"first_p50": before, "last_p50": after, "ratio": ratio, "max": worst}
+        if ratio > MAX_DRIFT and after - before > MIN_DRIFT_MS:
+            result["findings"].append(f"drift: {stage} p50 {before:.1f}ms -> {after:.1f}ms ({ratio:.2f}x)")
+    return result
+
+
+def headline(report):
+    """The numbers --compare tracks between versions."""
+    last = report["samples"][-1] if report["samples"] else {}
+    numbers = {f"{k} slope /1000 tasks": v for k, v in report["analysis"]["slopes"].items()}
+    for stage in ("total", "api", "execute"):
+        drift = report["analysis"]["drift"].get(stage)
+        if drift:
+            numbers[f"{stage} p50 ms (last quarter)"] = drift["last_p50"]
+    if last.get("rss") is not None:
+        numbers["final rss MB"] = last["rss"] / 1e6
+    for key, mark in report["analysis"].get("watermarks", {}).items():
+        numbers[f"{key.replace('_', ' ')} MB"] = mark["end"]
+    return numbers
+
+
+def print_report(report, previous=None):
+    a = report["analysis"]
+    print(f"soak: {report['tasks']} tasks in {report['seconds']:.0f}s ({report['statuses']}), revision {report['revision']}")
+    for key, value in a["slopes"].items():
+        unit = "objects" if key == "objects" else "MB"
+        print(f"  {key:8} {value:+10.2f} {unit} per 1000 tasks")
+    for key, mark in a.get("watermarks", {}).items():
+        print(f"  {key:12} {mark['mid']:8.1f}MB mid-run -> {mark['end']:8.1f}MB at the end")
+    for stage, d in a["drift"].items():
+        print(f"  {stage:8} p50 {d['first_p50']:7.1f}ms -> {d['last_p50']:7.1f}ms ({d['ratio']:.2f}x), max {d['max']:7.1f}ms")
+    if report["growth"].get("allocations"):
+        print("top allocation growth since warm-up:")
+        for g in report["growth"]["allocations"]:
+            print(f"  {g['bytes'] / 1024:+9.1f} KiB {g['count']:+7}  {g['site']}")
+    if report["growth"].get("types"):
+        print("top object type growth since warm-up: " + ", ".join(f"{t['type']} +{t['count']}" for t in report["growth"]["types"]))
+    if previous:
+        before = headline(previous)
+        print(f"vs {previous.get('revision')}:")
+        for key, value in headline(report).items():
+            if key in before:
+                print(f"  {key:32} {before[key]:10.2f} -> {value:10.2f}")
+    for finding in a["findings"]:
+        print(f"FLAG {finding}")
+    if not a["findings"]:
+        print("no leaks or drift beyond the thresholds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200, help="Stop after this many tasks (0: no limit)")
+    parser.add_argument("--minutes", type=float, default=0, help="Stop after this many minutes (0: no limit)")
+    parser.add_argument("--warmup", type=int, default=20, help="Tasks before the baseline sample")
+    parser.add_argument("--sample-every", type=int, default=10)
+    parser.add_argument("--error-every", type=int, default=10, help="Every Nth task's model call fails (0: never)")
+    parser.add_argument("--latency", type=float, default=0.01, help="Mock model latency in seconds")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip allocation tracing (it slows Python down)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Report JSON path")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    args = parser.parse_args()
+    if not args.tasks and not args.minutes:
+        parser.error("set --tasks or --minutes")
+
+    out = os.path.abspath(args.out)
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    fakes.install()
+    os.chdir(tempfile.mkdtemp(prefix="soak-"))
+    os.environ.setdefault("AGENT_RECORD", "0")
+    os.environ.setdefault("AGENT_SKILLS", "0")
+    import agent as agent_module
+
+    server = MockModelServer(latency=args.latency)
+    server.start()
+    soak = Soak(agent_module, server, fakes.synthetic_frames(6), args.error_every, trace=not args.no_tracemalloc)
+    start = time.perf_counter()
+    try:
+        growth = soak.run(args.tasks, args.minutes, args.warmup, args.sample_every)
+    finally:
+        server.stop()
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "tasks": soak.tasks,
+        "seconds": time.perf_counter() - start,
+        "statuses": dict(soak.statuses),
+        "samples": soak.samples,
+        "growth": growth,
+        "analysis": analyze(soak.samples, args.warmup),
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report, previous)
+    print(f"report written to {out}")
+    return 1 if report["analysis"]["findings"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
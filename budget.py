@@ -0,0 +1,106 @@
+"""
+Task Budget - per-task limits on tokens, cost, wall time and turns.
+
+run_task checks the budget before every turn. As the most consumed budget
+nears its limit the agent steps down one level at a time:
+
+    image      screenshots are downscaled to DEGRADED_IMAGE_SIZE
+    context    history is pruned to DEGRADED_CONTEXT_MESSAGES
+    model      requests go to the fallback model, if one is configured
+
+and once any budget is used up the task is aborted with a report.
+
+Limits come from the environment (unset or 0 means unlimited) or are passed
+to run_task as a dict with the same keys:
+    AGENT_BUDGET_TOKENS    input + output tokens
+    AGENT_BUDGET_COST      USD
+    AGENT_BUDGET_SECONDS   wall-clock seconds
+    AGENT_BUDGET_TURNS     model turns
+    AGENT_FALLBACK_MODEL   cheaper model for the last step
+"""
+import os
+import time
+
+LIMIT_KEYS = ("tokens", "cost", "seconds", "turns")
+
+# (fraction of the tightest budget used, level entered)
+DEGRADE_STEPS = ((0.5, "image"), (0.7, "context"), (0.85, "model"))
+LEVELS = ("normal",) + tuple(level for _, level in DEGRADE_STEPS)
+
+DEGRADED_IMAGE_SIZE = 1024
+DEGRADED_CONTEXT_MESSAGES = 3
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def limits_from_env(environ=os.environ):
+    return {key: _number(environ.get(f"AGENT_BUDGET_{key.upper()}")) for key in LIMIT_KEYS}
+
+
+class TaskBudget:
+    """
+    Consumption of one task against its limits. The level only moves down
+    (towards cheaper settings) within a task, so a turn that happened to be
+    cheap does not flip the agent back to full resolution.
+    """
+
+    def __init__(self, limits=None, fallback_model=None):
+        limits = limits_from_env() if limits is None else limits
+        self.limits = {key: _number(limits.get(key)) for key in LIMIT_KEYS}
+        if fallback_model is None:
+            fallback_model = os.environ.get("AGENT_FALLBACK_MODEL", "").strip() or None
+        self.fallback_model = fallback_model
+        self.used = {key: 0 for key in LIMIT_KEYS}
+        self.level = 0
+        self._start = time.perf_counter()
+
+    @property
+    def enabled(self):
+        return any(limit is not None for limit in self.limits.values())
+
+    def update(self, tokens, cost, turns):
+        """Record totals so far for the task; returns the new level name if it changed."""
+        self.used.update(tokens=tokens, cost=cost, turns=turns, seconds=time.perf_counter() - self._start)
+        fraction = self.fraction()
+        level = self.level
+        for i, (threshold, name) in enumerate(DEGRADE_STEPS, start=1):
+            if fraction >= threshold and (name != "model" or self.fallback_model):
+                level = max(level, i)
+        if level != self.level:
+            self.level = level
+            return LEVELS[level]
+        return None
+
+    def fraction(self):
+        """Share of the tightest budget used, 0.0 when nothing is limited."""
+        return max((self.used[key] / limit for key, limit in self.limits.items() if limit is not None), default=0.0)
+
+    def exceeded(self):
+        """Names of the budgets that are used up."""
+        return [key for key, limit in self.limits.items() if limit is not None and self.used[key] >= limit]
+
+    def at_least(self, level):
+        return self.level >= LEVELS.index(level)
+
+    def snapshot(self):
+        return {
+            "used": dict(self.used),
+            "limits": dict(self.limits),
+            "fraction": self.fraction(),
+            "level": LEVELS[self.level],
+        }
+
+
+def format_budget(snapshot):
+    """One-line summary, e.g. 'budget 62% [image] tok 31k/50k $0.02/0.05 12s/120s turns 4/20'."""
+    used, limits = snapshot["used"], snapshot["limits"]
+    fields = (("tokens", "tok ", lambda v: f"{v / 1000:.0f}k"), ("cost", "$", lambda v: f"{v:.2f}"),
+              ("seconds", "", lambda v: f"{v:.0f}s"), ("turns", "turns ", lambda v: f"{v:.0f}"))
+    parts = [f"{label}{fmt(used[key])}/{fmt(limits[key])}" for key, label, fmt in fields if limits[key] is not None]
+    return f"budget {snapshot['fraction'] * 100:.0f}% [{snapshot['level']}] " + " ".join(parts)
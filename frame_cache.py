@@ -0,0 +1,112 @@
+"""
+Frame Cache - recent full-resolution screen captures for local zooming.
+
+capture_screen() downscales the frame it sends to the model. The original
+BGRA bytes from mss are kept here (no copy, they are immutable bytes) under a
+total byte budget, so a ZOOM request can be answered from native pixels
+without a new screenshot or a remote code-execution round trip.
+"""
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # ~4 frames at 2560x1440
+ZOOM_MIN_SIDE = 768   # small crops are upscaled to at least this long side...
+ZOOM_MAX_UPSCALE = 4  # ...but never by more than this factor
+ZOOM_MAX_SIDE = 1536  # large crops are downscaled to at most this long side
+ZOOM_MIN_REGION = 8   # pixels; smaller regions are grown around their center
+
+
+class FrameCache:
+    """LRU of (size, bgra bytes) frames keyed by an increasing frame id."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, size, bgra):
+        """Store a frame and return its id. The newest frame is always kept, even if over budget."""
+        with self._lock:
+            frame_id = self._next_id
+            self._next_id += 1
+            self._frames[frame_id] = (size, bgra)
+            self._bytes += len(bgra)
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                _, (_, old) = self._frames.popitem(last=False)
+                self._bytes -= len(old)
+                self.evictions += 1
+            return frame_id
+
+    def get(self, frame_id=None):
+        """(size, bgra) for frame_id, or the newest frame. None if evicted or empty."""
+        with self._lock:
+            if not self._frames:
+                return None
+            if frame_id is None:
+                frame_id = next(reversed(self._frames))
+            return self._frames.get(frame_id)
+
+    def latest_id(self):
+        with self._lock:
+            return next(reversed(self._frames)) if self._frames else None
+
+    def crop(self, x1, y1, x2, y2, frame_id=None):
+        """
+        Crop a region given in normalized 0-1000 screen coordinates from the
+        full-resolution frame. Returns (PIL RGB image, pixel box) or None.
+        Only the rows inside the region are decoded.
+        """
+        from PIL import Image
+        frame = self.get(frame_id)
+        if frame is None:
+            return None
+        (width, height), bgra = frame
+        left, top, right, bottom = region_to_pixels(x1, y1, x2, y2, width, height)
+
+        stride = width * 4
+        band = bgra[top * stride:bottom * stride]
+        img = Image.frombytes("RGB", (width, bottom - top), band, "raw", "BGRX")
+        img = img.crop((left, 0, right, bottom - top))
+
+        long_side = max(img.size)
+        scale = 1.0
+        if long_side < ZOOM_MIN_SIDE:
+            scale = min(ZOOM_MAX_UPSCALE, ZOOM_MIN_SIDE / long_side)
+        elif long_side > ZOOM_MAX_SIDE:
+            scale = ZOOM_MAX_SIDE / long_side
+        if scale != 1.0:
+            new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        return img, (left, top, right, bottom)
+
+    def stats(self):
+        with self._lock:
+            return {"frames": len(self._frames), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+
+def region_to_pixels(x1, y1, x2, y2, width, height):
+    """Normalized 0-1000 corners (any order) -> clamped pixel box of at least ZOOM_MIN_REGION."""
+    x1, x2 = sorted((max(0, min(1000, x1)), max(0, min(1000, x2))))
+    y1, y2 = sorted((max(0, min(1000, y1)), max(0, min(1000, y2))))
+    left, right = int(x1 * width / 1000), int(round(x2 * width / 1000))
+    top, bottom = int(y1 * height / 1000), int(round(y2 * height / 1000))
+
+    min_w, min_h = min(ZOOM_MIN_REGION, width), min(ZOOM_MIN_REGION, height)
+    if right - left < min_w:
+        cx = (left + right) // 2
+        left = max(0, min(width - min_w, cx - min_w // 2))
+        right = left + min_w
+    if bottom - top < min_h:
+        cy = (top + bottom) // 2
+        top = max(0, min(height - min_h, cy - min_h // 2))
+        bottom = top + min_h
+    return left, top, right, bottom
@@ -0,0 +1,89 @@
+"""
+Image Policy - decides per turn whether the screenshot is attached.
+
+When the UI element list is rich (enough named elements) and stable (same
+window, mostly the same elements and a similar screen fingerprint as the last
+turn), the turn is sent as text only. The screenshot is still captured, so
+ZOOM and loop detection keep working; it is just not encoded or uploaded.
+
+The image is attached anyway on the first turn, at least every IMAGE_EVERY
+turns, after the model asks for it (SCREENSHOT), and on low confidence: a
+failed action, a turn without actions, or a stuck-loop hint.
+
+AGENT_TEXT_TURNS=0 attaches the image every turn.
+"""
+import os
+
+from ui_inspector import parse_ui_summary
+
+MIN_ELEMENTS = 5          # fewer elements than this is too thin to act on blind
+MIN_NAMED_FRACTION = 0.6  # share of elements that have a name
+MIN_OVERLAP = 0.6         # Jaccard overlap of (type, name) with the last turn
+MAX_HASH_DISTANCE = 16    # of 64 bits; more means the screen changed beyond the tree
+IMAGE_EVERY = 4           # never go longer than this without a screenshot
+
+
+def _hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class ImagePolicy:
+    """Per-task state; call decide() once per turn, before encoding."""
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get("AGENT_TEXT_TURNS", "1").strip() != "0"
+        self.enabled = enabled
+        self.turns = 0
+        self.text_turns = 0
+        self._since_image = 0
+        self._force = "first turn"
+        self._title = None
+        self._elements = None
+        self._hash = None
+
+    def request_image(self, reason):
+        """Attach the screenshot on the next turn."""
+        if self._force is None:
+            self._force = reason
+
+    def decide(self, ui_summary, screen_hash):
+        """Returns (attach image, reason)."""
+        title, elements = parse_ui_summary(ui_summary)
+        keys = {(el["type"], el["name"]) for el in elements}
+        attach, reason = self._check(title, elements, keys, screen_hash)
+
+        self.turns += 1
+        self._force = None
+        self._title, self._elements, self._hash = title, keys, screen_hash
+        if attach:
+            self._since_image = 0
+        else:
+            self._since_image += 1
+            self.text_turns += 1
+        return attach, reason
+
+    def _check(self, title, elements, keys, screen_hash):
+        if not self.enabled:
+            return True, "text-only turns disabled"
+        if self._force:
+            return True, self._force
+        if self._since_image + 1 >= IMAGE_EVERY:
+            return True, "periodic"
+        if len(elements) < MIN_ELEMENTS:
+            return True, f"only {len(elements)} UI elements"
+        named = sum(1 for el in elements if el["name"])
+        if named < MIN_NAMED_FRACTION * len(elements):
+            return True, f"{len(elements) - named} of {len(elements)} elements unnamed"
+        if title != self._title:
+            return True, "window changed"
+        overlap = len(keys & self._elements) / len(keys | self._elements) if self._elements else 0.0
+        if overlap < MIN_OVERLAP:
+            return True, f"UI changed ({overlap:.0%} overlap)"
+        if screen_hash is not None and self._hash is not None and _hamming(screen_hash, self._hash) > MAX_HASH_DISTANCE:
+            return True, "screen changed outside the UI tree"
+        return False, f"{named} named elements, {overlap:.0%} overlap"
+
+    @property
+    def text_fraction(self):
+        return self.text_turns / self.turns if self.turns else 0.0
@@ -0,0 +1,78 @@
+"""
+Log Pipeline - non-blocking log and event queue between the agent thread and Tk.
+
+Producers (any thread) only enqueue. The Tk side drains a batch on a timer,
+and a background listener writes every message to a rotating log file.
+"""
+import queue
+import logging
+import logging.handlers
+
+LOG_FILE = "agent.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# Max items handed to the UI per drain; the rest wait for the next tick
+DRAIN_BATCH_SIZE = 500
+
+
+class LogPipeline:
+    """
+    Thread-safe log/event pipeline.
+    log() and post() never block; drain() must be called from the UI thread.
+    """
+
+    def __init__(self, log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, echo=True):
+        self._ui_queue = queue.SimpleQueue()
+        self._file_queue = queue.SimpleQueue()
+
+        handlers = []
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            handlers.append(file_handler)
+        if echo:
+            # Keep console log too, written off the producer thread
+            handlers.append(logging.StreamHandler())
+        self._listener = logging.handlers.QueueListener(self._file_queue, *handlers)
+        self._listener.start()
+
+        self._logger = logging.getLogger(f"computeruse.log_pipeline.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(logging.handlers.QueueHandler(self._file_queue))
+
+    def log(self, message):
+        """Queue a log line for the UI view and the log file."""
+        message = str(message)
+        self._ui_queue.put(("log", message))
+        self._logger.info(message)
+
+    def post(self, kind, payload=None):
+        """Queue a UI event (e.g. 'status', 'complete') for the next drain."""
+        self._ui_queue.put((kind, payload))
+
+    def drain(self, max_items=DRAIN_BATCH_SIZE):
+        """
+        Pop up to max_items queued items.
+        Returns (log_lines, events) where events is a list of (kind, payload).
+        """
+        lines = []
+        events = []
+        for _ in range(max_items):
+            try:
+                kind, payload = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                lines.append(payload)
+            else:
+                events.append((kind, payload))
+        return lines, events
+
+    def close(self):
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
@@ -3,7 +3,19 @@ from tkinter import ttk, messagebox
 import threading
 import time
 import os
+import argparse
 from agent import ComputerUseAgent
+from log_pipeline import LogPipeline
+from turn_metrics import LatencyStats, format_breakdown
+from budget import format_budget
+from profiler import profiler, requested as profiler_requested
+
+# Max lines kept in the log view; the full log is in the rotating log file
+MAX_LOG_LINES = 2000
+# How often the UI drains queued log lines and events (ms)
+LOG_DRAIN_INTERVAL_MS = 100
+# Minimum time between latency HUD redraws (seconds)
+HUD_REFRESH_SECONDS = 0.5
 
 class App:
     def __init__(self, root):
@@ -15,8 +27,14 @@ class App:
         self.agent = None
         self.is_running = False
         self.emergency_root = None
+        self.log_pipeline = LogPipeline()
+        self.latency_stats = LatencyStats()
+        self._last_timing = None
+        self._hud_dirty = False
+        self._hud_last_draw = 0.0
 
         self.setup_ui()
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self.drain_log_pipeline)
 
     def setup_ui(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -48,6 +66,12 @@ class App:
         self.clear_log_button = ttk.Button(button_frame, text="Clear Log", command=self.clear_log)
         self.clear_log_button.pack(side=tk.LEFT, padx=5)
 
+        # Sampling profiler; can be switched while a task runs (see profiler.py)
+        self.profile_var = tk.BooleanVar(value=profiler.enabled)
+        self.profile_check = ttk.Checkbutton(button_frame, text="Profile", variable=self.profile_var,
+                                             command=self.toggle_profile)
+        self.profile_check.pack(side=tk.RIGHT, padx=5)
+
         # Status
         self.status_label = ttk.Label(main_frame, text="Status: Idle")
         self.status_label.pack(pady=5)
@@ -81,8 +105,8 @@ class App:
         
         # Position at top center
         screen_width = self.emergency_root.winfo_screenwidth()
-        w = 320
-        h = 110
+        w = 400
+        h = 150
         x = (screen_width // 2) - (w // 2)
         y = 30
         self.emergency_root.geometry(f"{w}x{h}+{x}+{y}")
@@ -101,15 +125,39 @@ class App:
         
         self.status_text = canvas.create_text(
             w//2,
-            32,
+            28,
             text="🧠 Thinking...",
             fill="#ffffff",
             font=("Segoe UI", 13),
         )
+
+        # Latency HUD: last turn breakdown + rolling percentiles, and budget use when limited
+        self.hud_breakdown_text = canvas.create_text(
+            w//2,
+            52,
+            text="",
+            fill="#b0b0b0",
+            font=("Consolas", 8),
+        )
+        self.hud_percentile_text = canvas.create_text(
+            w//2,
+            67,
+            text="",
+            fill="#b0b0b0",
+            font=("Consolas", 8),
+        )
+        self.hud_budget_text = canvas.create_text(
+            w//2,
+            82,
+            text="",
+            fill="#b0b0b0",
+            font=("Consolas", 8),
+        )
+        self._hud_dirty = self._last_timing is not None
         
-        canvas.create_line(20, 58, w-20, 58, fill='#3a3a3a', width=1)
+        canvas.create_line(20, 96, w-20, 96, fill='#3a3a3a', width=1)
         
-        btn_y1, btn_y2 = 68, 98
+        btn_y1, btn_y2 = 108, 138
         btn_x1, btn_x2 = w//2 - 60, w//2 + 60
         stop_color, stop_hover = "#e74c3c", "#ff6b5b"
         
@@ -170,8 +218,11 @@ class App:
                 "typing": "⌨️ Typing...",
                 "scrolling": "📜 Scrolling...",
                 "waiting": "⏳ Waiting...",
+                "checking": "🔍 Checking...",
+                "reading": "📖 Reading...",
                 "acting": "⚡ Acting...",
                 "done": "✅ Done!",
+                "budget exceeded": "💸 Budget exceeded",
             }
             display_text = status_map.get(status.lower(), f"🔄 {status}")
             try:
@@ -189,17 +240,85 @@ class App:
             self.emergency_root = None
 
     def log(self, message):
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
-        print(message) # Keep console log too
+        """Safe to call from any thread; the UI picks it up on the next drain."""
+        self.log_pipeline.log(message)
+
+    def drain_log_pipeline(self):
+        """Apply queued log lines and agent events to the UI in one batch."""
+        try:
+            lines, events = self.log_pipeline.drain()
+            if lines:
+                self.log_text.config(state=tk.NORMAL)
+                self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+                # Keep the view a fixed-size ring buffer
+                line_count = int(self.log_text.index("end-1c").split(".")[0])
+                if line_count > MAX_LOG_LINES:
+                    self.log_text.delete("1.0", f"{line_count - MAX_LOG_LINES + 1}.0")
+                self.log_text.see(tk.END)
+                self.log_text.config(state=tk.DISABLED)
+
+            # Only the latest status in a batch is visible, so skip the rest
+            last_status = None
+            for kind, payload in events:
+                if kind == "status":
+                    last_status = payload
+                elif kind == "timing":
+                    self.latency_stats.add(payload)
+                    self._last_timing = payload
+                    self._hud_dirty = True
+                elif kind == "complete":
+                    if last_status is not None:
+                        self.update_agent_status(last_status)
+                        last_status = None
+                    self.on_task_complete()
+            if last_status is not None:
+                self.update_agent_status(last_status)
+
+            if self._hud_dirty and time.monotonic() - self._hud_last_draw >= HUD_REFRESH_SECONDS:
+                self.update_latency_hud()
+        except Exception as e:
+            # A failing handler must not stop draining for the rest of the session
+            self.log(f"Log drain error: {e}")
+        finally:
+            self.root.after(LOG_DRAIN_INTERVAL_MS, self.drain_log_pipeline)
+
+    def update_latency_hud(self):
+        """Redraw the per-turn breakdown and rolling p50/p95 in the overlay"""
+        if not (self.emergency_root and self._last_timing):
+            return
+        p50, p95 = self.latency_stats.percentiles()
+        api_p50, api_p95 = self.latency_stats.percentiles("api")
+        try:
+            self.emergency_canvas.itemconfig(self.hud_breakdown_text, text=format_breakdown(self._last_timing))
+            self.emergency_canvas.itemconfig(
+                self.hud_percentile_text,
+                text=f"turn p50 {p50:.2f}s p95 {p95:.2f}s | api {api_p50:.2f}/{api_p95:.2f}s | n={self.latency_stats.turns}",
+            )
+            budget = self._last_timing.get("budget")
+            self.emergency_canvas.itemconfig(
+                self.hud_budget_text,
+                text=format_budget(budget) if budget else "",
+                fill="#e67e22" if budget and budget["level"] != "normal" else "#b0b0b0",
+            )
+        except tk.TclError:
+            pass
+        self._hud_dirty = False
+        self._hud_last_draw = time.monotonic()
 
     def clear_log(self):
         self.log_text.config(state=tk.NORMAL)
         self.log_text.delete("1.0", tk.END)
         self.log_text.config(state=tk.DISABLED)
 
+    def toggle_profile(self):
+        if self.profile_var.get():
+            profiler.start()
+            self.log("--- Profiling started ---")
+        else:
+            path = profiler.stop()
+            if path:
+                self.log(f"--- Profile written to {path} ---")
+
     def toggle_agent(self):
         gemini_key = os.environ.get("GOOGLE_API_KEY", "").strip()
         
@@ -256,15 +375,21 @@ class App:
         try:
             # Small delay to ensure window is minimized before first screenshot
             time.sleep(0.5)
-            # Pass a logger function and status callback to the agent
+            # Logger and status callback only enqueue; Tk applies them on its own thread
             def status_updater(status):
-                self.root.after(0, lambda s=status: self.update_agent_status(s))
-            self.agent.run_task(instruction, logger=self.log, status_callback=status_updater)
-            
-            self.root.after(0, self.on_task_complete)
+                self.log_pipeline.post("status", status)
+            def timing_updater(event):
+                self.log_pipeline.post("timing", event)
+            self.agent.run_task(
+                instruction,
+                logger=self.log,
+                status_callback=status_updater,
+                timing_callback=timing_updater,
+            )
         except Exception as e:
-            self.root.after(0, lambda: self.log(f"CRITICAL ERROR: {str(e)}"))
-            self.root.after(0, self.on_task_complete)
+            self.log(f"CRITICAL ERROR: {str(e)}")
+        finally:
+            self.log_pipeline.post("complete")
 
     def on_task_complete(self):
         self.is_running = False
@@ -280,6 +405,16 @@ class App:
         self.root.attributes("-topmost", True)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini Computer Use Agent")
+    parser.add_argument("--profile", action="store_true", help="Run the sampling profiler for the whole session")
+    args = parser.parse_args()
+    if profiler_requested(args.profile):
+        profiler.start()
     root = tk.Tk()
     app = App(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app.log_pipeline.close()
+        if profiler.enabled:
+            print(f"Profile written to {profiler.stop()}")
@@ -0,0 +1,310 @@
+"""
+OCR Index - text on screen by position, from a local OCR engine.
+
+Each frame is cut into a TILE_COLS x TILE_ROWS grid (full-width bands by
+default) and every tile's pixels are hashed. Words are cached per tile hash,
+relative to the tile's corner, so a tile that looks the same as one already
+read (unchanged, or blank anywhere on screen) costs nothing. Only the tiles
+with new content are OCR'd: runs of them in a row, merged with the rows below
+into blocks of at most MAX_BLOCK_ROWS, each cropped with a MARGIN so words on
+a tile edge are read whole. Blocks are OCR'd in parallel; a word belongs to
+the tile its center falls in.
+
+The index holds words and lines (words grouped by baseline and spacing) with
+boxes in normalized 0-1000 screen coordinates. summary() is the "Screen Text"
+block of the turn prompt and find() answers the FIND_TEXT action.
+
+The default engine is a locally installed Tesseract (the `tesseract`
+executable on PATH, or TESSERACT_CMD), registered as the "ocr" backend in
+backends.py. Enable with AGENT_OCR=1; AGENT_OCR_LANG picks the Tesseract
+language (default "eng").
+"""
+import io
+import os
+import csv
+import time
+import hashlib
+import difflib
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Full-width bands: a word never crosses a vertical tile edge, and a text line is
+# shorter than the MARGIN that blocks reach into the bands above and below
+TILE_COLS = 1
+TILE_ROWS = 24
+MARGIN = 24              # pixels of context around each OCR block
+MAX_BLOCK_ROWS = 6       # tile rows per OCR block, so a full screen splits across workers
+OCR_SCALE = 2            # screen text is small; engines read it better upscaled
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+OCR_TIMEOUT = 15
+MIN_CONFIDENCE = 40      # of 100
+MAX_CACHED_TILES = 4096
+LINE_GAP = 1.5           # max gap between words of a line, in word heights
+MAX_PROMPT_LINES = 80
+MAX_LINE_CHARS = 120
+FIND_MAX_MATCHES = 5
+FIND_CUTOFF = 0.8        # difflib ratio for a fuzzy FIND_TEXT match
+
+
+class TesseractEngine:
+    """Runs the tesseract CLI on a PIL image; returns [(text, left, top, width, height, confidence)]."""
+
+    def __init__(self, command, lang="eng"):
+        self.command = command
+        self.lang = lang
+
+    def __call__(self, image):
+        buf = io.BytesIO()
+        image.save(buf, format="PNG", compress_level=1)
+        # Blocks already run in parallel; one thread per tesseract process avoids oversubscription
+        env = dict(os.environ, OMP_THREAD_LIMIT="1")
+        result = subprocess.run([self.command, "stdin", "stdout", "-l", self.lang, "--psm", "11", "tsv"],
+                                input=buf.getvalue(), capture_output=True, timeout=OCR_TIMEOUT, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode(errors="replace").strip() or f"tesseract exited {result.returncode}")
+        words = []
+        rows = csv.DictReader(io.StringIO(result.stdout.decode("utf-8", errors="replace")), delimiter="\t",
+                              quoting=csv.QUOTE_NONE)
+        for row in rows:
+            text = (row.get("text") or "").strip()
+            if row.get("level") != "5" or not text:
+                continue
+            words.append((text, int(row["left"]), int(row["top"]), int(row["width"]), int(row["height"]),
+                          float(row["conf"])))
+        return words
+
+
+def load_tesseract():
+    """The Tesseract engine, or LookupError when no tesseract executable is installed."""
+    import shutil
+    command = shutil.which(os.environ.get("TESSERACT_CMD") or "tesseract")
+    if command is None:
+        raise LookupError("tesseract executable not found (install Tesseract or set TESSERACT_CMD)")
+    return TesseractEngine(command, os.environ.get("AGENT_OCR_LANG", "eng").strip() or "eng")
+
+
+def enabled():
+    return os.environ.get("AGENT_OCR", "0").strip() == "1"
+
+
+def _tile_edges(length, count):
+    return [length * i // count for i in range(count + 1)]
+
+
+def _blocks(dirty):
+    """
+    Dirty (row, col) tiles -> blocks (row0, row1, col0, col1), end exclusive:
+    runs of adjacent tiles in a row, extended down while the next row has the same run.
+    """
+    runs = {}
+    for row, col in sorted(dirty):
+        spans = runs.setdefault(row, [])
+        if spans and spans[-1][1] == col:
+            spans[-1][1] = col + 1
+        else:
+            spans.append([col, col + 1])
+    blocks = []
+    for row in sorted(runs):
+        for col0, col1 in runs[row]:
+            for block in blocks:
+                if block[1] == row and block[2:] == [col0, col1] and block[1] - block[0] < MAX_BLOCK_ROWS:
+                    block[1] = row + 1
+                    break
+            else:
+                blocks.append([row, row + 1, col0, col1])
+    return [tuple(b) for b in blocks]
+
+
+def _build_lines(words):
+    """Group words (dicts with pixel 'px' boxes) into lines in reading order."""
+    lines = []
+    for word in sorted(words, key=lambda w: w["px"][0]):
+        left, top, right, bottom = word["px"]
+        height = bottom - top
+        best = None
+        for line in lines:
+            l_top, l_bottom = line["px"][1], line["px"][3]
+            overlap = min(bottom, l_bottom) - max(top, l_top)
+            gap = left - line["px"][2]
+            if overlap >= 0.5 * min(height, l_bottom - l_top) and -height <= gap <= LINE_GAP * max(height, l_bottom - l_top):
+                if best is None or gap < left - best["px"][2]:
+                    best = line
+        if best is None:
+            lines.append({"words": [word], "px": list(word["px"])})
+        else:
+            best["words"].append(word)
+            best["px"] = [min(best["px"][0], left), min(best["px"][1], top),
+                          max(best["px"][2], right), max(best["px"][3], bottom)]
+    lines.sort(key=lambda line: (line["px"][1] // 8, line["px"][0]))
+    return lines
+
+
+class OcrIndex:
+    """Words and lines on the current screen; update() with each full-resolution frame."""
+
+    def __init__(self, engine, tiles=(TILE_COLS, TILE_ROWS), max_tiles=MAX_CACHED_TILES):
+        self.engine = engine
+        self.cols, self.rows = tiles
+        self.max_tiles = max_tiles
+        self.size = None
+        self.words = []
+        self.lines = []
+        self.stats = {"frames": 0, "tiles": 0, "tiles_ocr": 0, "blocks": 0, "pixels_ocr": 0, "seconds": 0.0,
+                      "errors": 0}
+        self.last_error = None
+        self._cache = OrderedDict()      # tile hash -> [(text, left, top, right, bottom, conf)] relative to the tile
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _tile_hashes(self, size, bgra):
+        width, height = size
+        stride = width * 4
+        xs, ys = _tile_edges(width, self.cols), _tile_edges(height, self.rows)
+        view = memoryview(bgra)
+        hashes = {}
+        for row in range(self.rows):
+            hashers = [hashlib.blake2b(digest_size=16) for _ in range(self.cols)]
+            for y in range(ys[row], ys[row + 1]):
+                line = view[y * stride:(y + 1) * stride]
+                for col, hasher in enumerate(hashers):
+                    hasher.update(line[xs[col] * 4:xs[col + 1] * 4])
+            for col, hasher in enumerate(hashers):
+                hashes[(row, col)] = hasher.digest()
+        return hashes, xs, ys
+
+    def update(self, size, bgra):
+        """Read the tiles of this frame not seen before and rebuild the index. Returns this frame's stats."""
+        with self._lock:
+            start = time.perf_counter()
+            hashes, xs, ys = self._tile_hashes(size, bgra)
+            dirty = {tile for tile, digest in hashes.items() if digest not in self._cache}
+            blocks = _blocks(dirty)
+            found = {tile: [] for tile in dirty}
+            pixels = 0
+            if blocks:
+                from PIL import Image
+                frame = Image.frombytes("RGB", size, bgra, "raw", "BGRX")
+                jobs = []
+                for row0, row1, col0, col1 in blocks:
+                    box = (max(0, xs[col0] - MARGIN), max(0, ys[row0] - MARGIN),
+                           min(size[0], xs[col1] + MARGIN), min(size[1], ys[row1] + MARGIN))
+                    pixels += (box[2] - box[0]) * (box[3] - box[1])
+                    jobs.append(((row0, row1, col0, col1), box, frame.crop(box)))
+                if self._pool is None and len(jobs) > 1:
+                    self._pool = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+                results = self._pool.map(self._read, jobs) if len(jobs) > 1 else map(self._read, jobs)
+                for (row0, row1, col0, col1), box, words in results:
+                    for text, left, top, right, bottom, conf in words:
+                        # The word belongs to the tile its center is in, if that tile is part of this block
+                        cx, cy = (left + right) / 2 + box[0], (top + bottom) / 2 + box[1]
+                        col = next(c for c in range(self.cols) if cx < xs[c + 1] or c == self.cols - 1)
+                        row = next(r for r in range(self.rows) if cy < ys[r + 1] or r == self.rows - 1)
+                        if row0 <= row < row1 and col0 <= col < col1:
+                            ox, oy = xs[col] - box[0], ys[row] - box[1]
+                            found[(row, col)].append((text, left - ox, top - oy, right - ox, bottom - oy, conf))
+            for tile in dirty:
+                self._cache[hashes[tile]] = found[tile]
+            for digest in hashes.values():
+                self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_tiles:
+                self._cache.popitem(last=False)
+
+            words = []
+            for (row, col), digest in hashes.items():
+                for text, left, top, right, bottom, conf in self._cache[digest]:
+                    px = (left + xs[col], top + ys[row], right + xs[col], bottom + ys[row])
+                    words.append({"text": text, "conf": conf, "px": px, "box": self._normalize(px, size)})
+            self.size = size
+            self.words = words
+            self.lines = [{"text": " ".join(w["text"] for w in line["words"]), "words": line["words"],
+                           "box": self._normalize(line["px"], size)} for line in _build_lines(words)]
+            seconds = time.perf_counter() - start
+            frame_stats = {"tiles": len(hashes), "tiles_ocr": len(dirty), "blocks": len(blocks),
+                           "pixels_ocr": pixels, "seconds": seconds, "words": len(words), "lines": len(self.lines)}
+            self.stats["frames"] += 1
+            for key in ("tiles", "tiles_ocr", "blocks", "pixels_ocr", "seconds"):
+                self.stats[key] += frame_stats[key]
+            return frame_stats
+
+    def _read(self, job):
+        (block, box, image) = job
+        from PIL import Image
+        image = image.convert("L")
+        if OCR_SCALE != 1:
+            image = image.resize((image.width * OCR_SCALE, image.height * OCR_SCALE), Image.Resampling.BICUBIC)
+        try:
+            raw = self.engine(image)
+        except Exception as e:
+            # The tiles are cached empty; they are read again once their content changes
+            self.stats["errors"] += 1
+            self.last_error = str(e)
+            raw = []
+        words = []
+        for text, left, top, width, height, conf in raw:
+            if conf < MIN_CONFIDENCE:
+                continue
+            words.append((text, left // OCR_SCALE, top // OCR_SCALE, (left + width) // OCR_SCALE,
+                          (top + height) // OCR_SCALE, conf))
+        return block, box, words
+
+    @staticmethod
+    def _normalize(px, size):
+        width, height = size
+        return (px[0] * 1000 // width, px[1] * 1000 // height, px[2] * 1000 // width, px[3] * 1000 // height)
+
+    def summary(self, max_lines=MAX_PROMPT_LINES):
+        """The Screen Text block for the prompt: one line per text line with its center, or '' when empty."""
+        lines = self.lines
+        if not lines:
+            return ""
+        out = ["Screen Text (OCR):"]
+        for line in lines[:max_lines]:
+            x1, y1, x2, y2 = line["box"]
+            text = line["text"] if len(line["text"]) <= MAX_LINE_CHARS else line["text"][:MAX_LINE_CHARS] + "..."
+            out.append(f'- "{text}" at ({(x1 + x2) // 2}, {(y1 + y2) // 2})')
+        if len(lines) > max_lines:
+            out.append(f"... {len(lines) - max_lines} more lines; use FIND_TEXT to locate other text.")
+        return "\n".join(out)
+
+    def find(self, text, limit=FIND_MAX_MATCHES):
+        """
+        Lines containing text (case-insensitive), best first, as
+        {"text", "line", "x", "y", "box"}: box and center cover only the matched
+        words. Falls back to the closest single words when nothing contains it.
+        """
+        wanted = " ".join(text.lower().split())
+        if not wanted:
+            return []
+        matches = []
+        for line in self.lines:
+            lowered = line["text"].lower()
+            start = lowered.find(wanted)
+            if start < 0:
+                continue
+            # Map the character range back to the words it touches
+            span, offset = [], 0
+            for word in line["words"]:
+                end = offset + len(word["text"])
+                if end > start and offset < start + len(wanted):
+                    span.append(word)
+                offset = end + 1
+            matches.append(self._match(line, span or line["words"]))
+        if not matches:
+            scored = [(difflib.SequenceMatcher(None, wanted, w["text"].lower()).ratio(), w) for w in self.words]
+            scored = sorted((s for s in scored if s[0] >= FIND_CUTOFF), key=lambda s: -s[0])
+            matches = [self._match(None, [w]) for _, w in scored]
+        return matches[:limit]
+
+    def _match(self, line, words):
+        px = (min(w["px"][0] for w in words), min(w["px"][1] for w in words),
+              max(w["px"][2] for w in words), max(w["px"][3] for w in words))
+        box = self._normalize(px, self.size)
+        return {"text": " ".join(w["text"] for w in words), "line": line["text"] if line else None,
+                "x": (box[0] + box[2]) // 2, "y": (box[1] + box[3]) // 2, "box": box}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.words, self.lines = [], []
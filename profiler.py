@@ -0,0 +1,282 @@
+"""
+Profiler - low-overhead sampling profiler for agent sessions.
+
+A background thread snapshots the Python stacks of the threads running
+run_task every INTERVAL seconds (sys._current_frames, no tracing hooks, so
+the agent runs at full speed between samples). Each sample is attributed to
+the run_task stage its thread is in (turn_metrics.ACTIVE_STAGES; "task" for
+work between stages) and, where the platform exposes per-thread CPU clocks,
+marked "cpu" if the thread burned CPU since the last sample or "wait" if it
+was blocked (API request, sleep, subprocess, disk).
+
+stop() writes two files to profiles/:
+    <session>.collapsed   flamegraph.pl / speedscope / inferno input, one
+                          "stage;state;outer;...;inner count" line per stack
+    <session>.txt         samples per stage and state, top functions by self
+                          and by total samples
+
+Enable with AGENT_PROFILE=1 or --profile on main.py, agent_daemon.py and
+batch_runner.py; toggle at runtime from the GUI's Profile checkbox or the
+daemon's POST /profile.
+
+Usage:
+    python profiler.py profiles/<session>.collapsed --top 30   # re-summarize
+    python profiler.py --overhead                             # cost per sample
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import Counter
+
+from turn_metrics import ACTIVE_STAGES, TURN_STAGES
+
+PROFILE_DIR = "profiles"
+INTERVAL = 0.01        # seconds between samples (100 Hz)
+MAX_DEPTH = 64         # frames kept per stack, innermost first
+TOP_N = 25
+TASK_FUNCTION = "run_task"
+
+
+def _has_cpu_clock():
+    return hasattr(time, "pthread_getcpuclockid") and hasattr(time, "clock_gettime")
+
+
+class SamplingProfiler:
+    """
+    Counts (stage, state, stack) samples. Start and stop from any thread;
+    a stopped profiler keeps its counts until the next start.
+    """
+
+    def __init__(self, interval=INTERVAL, all_threads=False):
+        self.interval = interval
+        # Also sample threads outside run_task, attributed to stage "idle"
+        self.all_threads = all_threads
+        self.session = None
+        self.samples = 0
+        self.sample_seconds = 0.0
+        self.started = None
+        self.elapsed = 0.0
+        self._counts = Counter()
+        self._labels = {}
+        self._clocks = {}
+        self._cpu = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._counts.clear()
+            self._cpu.clear()
+            self.samples = 0
+            self.sample_seconds = 0.0
+            self.session = time.strftime("%Y%m%d-%H%M%S")
+            self.started = time.perf_counter()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, directory=PROFILE_DIR):
+        """Stop sampling and write the session; returns the summary path, or None if not running."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._stop.set()
+        thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self.export(directory)
+
+    def _run(self):
+        own = threading.get_ident()
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            next_at += self.interval
+            start = time.perf_counter()
+            self.sample(exclude=own)
+            self.sample_seconds += time.perf_counter() - start
+            # Sleep to the next slot; after a slow sample, skip the slots it overran
+            delay = next_at - time.perf_counter()
+            if delay < 0:
+                next_at = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def sample(self, exclude=None):
+        """Record one sample of every agent thread."""
+        self.samples += 1
+        for thread, frame in sys._current_frames().items():
+            if thread == exclude:
+                continue
+            stack = []
+            in_task = False
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                in_task = in_task or code.co_name == TASK_FUNCTION
+                frame = frame.f_back
+            stage = ACTIVE_STAGES.get(thread) or ("task" if in_task else None)
+            if stage is None:
+                if not self.all_threads:
+                    continue
+                stage = "idle"
+            self._counts[(stage, self._state(thread), tuple(reversed(stack)))] += 1
+
+    def _state(self, thread):
+        """'cpu' if the thread ran since its last sample, 'wait' if it was blocked, else 'wall'."""
+        if not _has_cpu_clock():
+            return "wall"
+        try:
+            clock = self._clocks.get(thread)
+            if clock is None:
+                clock = self._clocks[thread] = time.pthread_getcpuclockid(thread)
+            now = time.clock_gettime(clock)
+        except (OSError, OverflowError):
+            return "wall"
+        last = self._cpu.get(thread)
+        self._cpu[thread] = now
+        if last is None:
+            return "wall"
+        return "cpu" if now - last >= self.interval / 2 else "wait"
+
+    def collapsed(self):
+        """Collapsed stack lines, 'stage;state;outer;...;inner count'."""
+        return [";".join((f"[{stage}]", f"[{state}]") + stack) + f" {count}"
+                for (stage, state, stack), count in sorted(self._counts.items(), key=lambda kv: -kv[1])]
+
+    def export(self, directory=PROFILE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"profile-{self.session}")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        header = (f"{self.samples} samples in {self.elapsed:.1f}s at {1 / self.interval:.0f} Hz, "
+                  f"sampler cost {self.overhead() * 100:.2f}% of one core")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(header + "\n\n" + format_summary(summarize(self.collapsed())))
+        return base + ".txt"
+
+    def overhead(self):
+        """Share of wall time the sampler thread spent taking samples."""
+        return self.sample_seconds / self.elapsed if self.elapsed else 0.0
+
+
+def parse_collapsed(lines):
+    """Collapsed lines -> [(stage, state, frames outer to inner, count)]."""
+    stacks = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        path, _, count = line.rpartition(" ")
+        frames = path.split(";")
+        if len(frames) < 2:
+            continue
+        stacks.append((frames[0].strip("[]"), frames[1].strip("[]"), frames[2:], int(count)))
+    return stacks
+
+
+def summarize(lines, top=TOP_N):
+    """Samples per stage and state, and the top functions by self and total samples."""
+    stacks = parse_collapsed(lines)
+    total = sum(count for *_, count in stacks)
+    stages = {}
+    own = Counter()
+    inclusive = Counter()
+    for stage, state, frames, count in stacks:
+        states = stages.setdefault(stage, Counter())
+        states[state] += count
+        if frames:
+            own[frames[-1]] += count
+        for label in set(frames):
+            inclusive[label] += count
+    return {
+        "samples": total,
+        "stages": {stage: dict(states) for stage, states in stages.items()},
+        "self": own.most_common(top),
+        "total": inclusive.most_common(top),
+    }
+
+
+def format_summary(summary):
+    total = summary["samples"] or 1
+    order = [s for s in TURN_STAGES if s in summary["stages"]] + sorted(s for s in summary["stages"] if s not in TURN_STAGES)
+    lines = ["stage         samples      %  " + "  ".join(f"{s:>6}" for s in ("cpu", "wait", "wall"))]
+    for stage in order:
+        states = summary["stages"][stage]
+        count = sum(states.values())
+        lines.append(f"{stage:12} {count:8} {count / total * 100:6.1f}  "
+                     + "  ".join(f"{states.get(s, 0):6}" for s in ("cpu", "wait", "wall")))
+    for title, key in (("top self", "self"), ("top total", "total")):
+        lines.append("")
+        lines.append(f"{title}:")
+        for label, count in summary[key]:
+            lines.append(f"  {count:8} {count / total * 100:6.1f}%  {label}")
+    return "\n".join(lines) + "\n"
+
+
+def measure_overhead(samples=2000, depth=40):
+    """Average seconds per sample with one extra thread parked at the given stack depth."""
+    ready = threading.Event()
+    done = threading.Event()
+
+    def nest(n):
+        if n:
+            return nest(n - 1)
+        ready.set()
+        done.wait()
+
+    def run_task():
+        nest(depth)
+
+    thread = threading.Thread(target=run_task, daemon=True)
+    thread.start()
+    ready.wait()
+    profiler = SamplingProfiler()
+    start = time.perf_counter()
+    for _ in range(samples):
+        profiler.sample()
+    elapsed = (time.perf_counter() - start) / samples
+    done.set()
+    thread.join()
+    return elapsed
+
+
+profiler = SamplingProfiler()
+
+
+def requested(flag=False):
+    """True when an entry point got --profile or AGENT_PROFILE is set."""
+    return flag or os.environ.get("AGENT_PROFILE", "").strip() not in ("", "0")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collapsed", nargs="?", help="Collapsed stack file to summarize")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--overhead", action="store_true", help="Measure the cost of one sample")
+    args = parser.parse_args()
+    if args.overhead:
+        seconds = measure_overhead()
+        print(f"sample cost: {seconds * 1e6:.0f} us ({seconds / INTERVAL * 100:.2f}% of one core at {1 / INTERVAL:.0f} Hz)")
+    elif args.collapsed:
+        with open(args.collapsed, "r", encoding="utf-8") as f:
+            print(format_summary(summarize(f, args.top)), end="")
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Prompt Builder - static prefix caching and per-turn prompt assembly.
+
+The system instruction and function declarations are the same for every
+request in an action mode, so they form a static prefix. ContextCache keeps
+it in the provider's context cache (Gemini cachedContents), created once per
+TTL and referenced by name from each request. If the provider refuses it
+(for example a prefix below its minimum size), the prefix is sent inline as
+the request's system_instruction. benchmarks/mock_model_server.py implements
+the cachedContents endpoint as the local stand-in.
+
+The task text is sent once, as a pinned first message that history pruning
+keeps. Action categories that only matter in some states (scrolling, text
+fields, clipboard) are left out of the prefix until the UI summary or the
+task calls for them; a task's prefix only grows, so it changes at most once
+per situational category.
+
+AGENT_PROMPT_CACHE=0 disables the provider cache.
+"""
+import json
+import time
+import hashlib
+import threading
+
+from tools import ACTIONS, ACTION_CATEGORIES
+from ui_inspector import parse_ui_summary
+from async_runtime import TaskCancelled
+
+CACHE_TTL_SECONDS = 3600
+CACHE_REFRESH_MARGIN = 60    # recreate a cache this long before the provider expires it
+CACHE_RETRY_SECONDS = 600    # after a refusal, send the prefix inline for this long
+
+# Categories added to the prefix once the UI shows one of these element types
+SITUATIONAL_CATEGORIES = {
+    "SCROLL ACTIONS": {"List", "ListItem", "Tree", "TreeItem", "DataGrid", "DataItem", "Table", "Document", "ScrollBar"},
+    "TEXT FIELD ACTIONS": {"Edit", "Document", "ComboBox"},
+    "CLIPBOARD ACTIONS": {"Edit", "Document"},
+}
+# Task words that make a situational category relevant whatever is on screen
+SITUATIONAL_KEYWORDS = {
+    "SCROLL ACTIONS": ("scroll", "page", "list", "result"),
+    "TEXT FIELD ACTIONS": ("clear", "replace", "field", "form"),
+    "CLIPBOARD ACTIONS": ("copy", "paste", "clipboard"),
+}
+
+
+def situational_categories(task, ui_summary):
+    """Situational categories relevant to this turn; all of them when the UI tree is unknown."""
+    _, elements = parse_ui_summary(ui_summary)
+    if not elements:
+        return list(SITUATIONAL_CATEGORIES)
+    present = {el["type"] for el in elements}
+    task = task.lower()
+    return [category for category, wanted in SITUATIONAL_CATEGORIES.items()
+            if present & wanted or any(word in task for word in SITUATIONAL_KEYWORDS[category])]
+
+
+def prefix_categories(situational, exclude=()):
+    """Core categories plus the given situational ones, in registry order, less any excluded."""
+    return [c for c in ACTION_CATEGORIES
+            if (c not in SITUATIONAL_CATEGORIES or c in situational) and c not in exclude]
+
+
+def action_names(categories):
+    return tuple(a.name for a in ACTIONS.values() if a.category in categories)
+
+
+def task_message(task):
+    """The pinned first message; the task text is not repeated in later turns."""
+    return f"Task: {task}"
+
+
+def turn_prompt(ui_summary, image, screen_text=""):
+    """The per-turn message; screen_text is the OCR index summary, if any."""
+    if screen_text:
+        ui_summary = f"{ui_summary}\n\n{screen_text}"
+    if image:
+        return f"{ui_summary}\n\nCurrent screen state is attached. What are the next actions for the task?"
+    return (f"{ui_summary}\n\nNo screenshot this turn; the UI element list above is current. "
+            "What are the next actions for the task? Call SCREENSHOT if you need to see the screen.")
+
+
+class ContextCache:
+    """Provider cache names for static prefixes, keyed by a hash of their content."""
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.stats = {"created": 0, "hits": 0, "refused": 0}
+        self.last_error = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, *parts):
+        digest = hashlib.sha1(model.encode("utf-8"))
+        for part in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key, create):
+        """
+        Cache name for key. create(ttl_seconds) makes the provider cache and
+        returns its name; it is called when the entry is missing or about to
+        expire. Returns None while the provider refuses the prefix.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1]:
+                if entry[0] is not None:
+                    self.stats["hits"] += 1
+                return entry[0]
+        try:
+            name = create(self.ttl)
+        except TaskCancelled:
+            raise
+        except Exception as e:
+            with self._lock:
+                self.stats["refused"] += 1
+                self.last_error = str(e)
+                self._entries[key] = (None, now + CACHE_RETRY_SECONDS)
+            return None
+        with self._lock:
+            self.stats["created"] += 1
+            self._entries[key] = (name, now + self.ttl - CACHE_REFRESH_MARGIN)
+        return name
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
@@ -0,0 +1,99 @@
+"""
+Screen History - bounded index of recent screen fingerprints for loop detection.
+
+Each turn's screen is reduced to a fingerprint: a 64-bit average hash of the
+whole screen plus a 64-bit average hash per tile of a TILES x TILES grid. The
+tile bits are computed with PIL in one pass (every thumbnail pixel against its
+tile's mean) and packed into one integer, so comparing two screens is two XORs
+and two popcounts, whatever the tile count. A revisit needs both the global
+and the summed tile distance to be small; the tiles catch local differences
+(an open menu, a different page body) that barely move the global hash.
+
+The index finds revisits (this screen was seen at turn N) and cycles: the
+last P screens repeat the P screens before them (A->B->A->B is a cycle of
+period 2), with the actions that led around the loop.
+"""
+from collections import deque
+
+from PIL import Image, ImageChops
+
+TILES = 8                 # tile grid is TILES x TILES
+HASH_SIZE = 8             # bits per side of each hash (8 -> 64 bits)
+GLOBAL_DISTANCE = 4       # of 64 bits
+TILE_DISTANCE = 24        # of TILES * TILES * 64 bits, summed over all tiles
+MAX_PERIOD = 4            # longest cycle looked for, in turns
+DEFAULT_CAPACITY = 64
+
+_SIDE = TILES * HASH_SIZE
+# subtract() clamps at 0, so (tile mean - pixel) is 0 exactly when the pixel is at least the mean
+_AT_LEAST_MEAN = [255] + [0] * 255
+
+
+def _average_hash(pixels):
+    avg = sum(pixels) / len(pixels)
+    bits = 0
+    for i, p in enumerate(pixels):
+        if p >= avg:
+            bits |= 1 << i
+    return bits
+
+
+def fingerprint(image):
+    """PIL image -> (global hash, packed tile hashes)."""
+    small = image.convert("L").resize((_SIDE, _SIDE), Image.Resampling.BILINEAR)
+    global_hash = _average_hash(small.resize((HASH_SIZE, HASH_SIZE), Image.Resampling.BOX).tobytes())
+    means = small.resize((TILES, TILES), Image.Resampling.BOX).resize((_SIDE, _SIDE), Image.Resampling.NEAREST)
+    bits = ImageChops.subtract(means, small).point(_AT_LEAST_MEAN, "1")
+    return global_hash, int.from_bytes(bits.tobytes(), "big")
+
+
+def same_screen(a, b):
+    return (a[0] ^ b[0]).bit_count() <= GLOBAL_DISTANCE and (a[1] ^ b[1]).bit_count() <= TILE_DISTANCE
+
+
+class ScreenHistory:
+    """Recent screens in turn order: [turn, fingerprint, action labels]."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._entries = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, turn, fp):
+        """Record this turn's screen. Returns the last earlier turn with the same screen, or None."""
+        revisit = None
+        # Skip the previous turn: an unchanged screen is handled by the consecutive-hash check
+        for entry in list(self._entries)[-2::-1]:
+            if same_screen(entry[1], fp):
+                revisit = entry[0]
+                break
+        self._entries.append([turn, fp, []])
+        return revisit
+
+    def set_actions(self, turn, labels):
+        """Actions run from the screen recorded for turn."""
+        if self._entries and self._entries[-1][0] == turn:
+            self._entries[-1][2] = list(labels)
+
+    def detect_cycle(self):
+        """
+        The shortest period P (2..MAX_PERIOD) for which the last P screens
+        match the P before them, as {"period", "turns", "actions"}, or None.
+        actions are the labels that led around the loop once, in turn order.
+        """
+        entries = list(self._entries)
+        # A screen that did not change at all is a period-1 loop, left to the consecutive-hash check
+        if len(entries) < 2 or same_screen(entries[-1][1], entries[-2][1]):
+            return None
+        for period in range(2, MAX_PERIOD + 1):
+            if len(entries) < 2 * period:
+                break
+            if all(same_screen(entries[-1 - i][1], entries[-1 - i - period][1]) for i in range(period)):
+                loop = entries[-1 - period:-1]
+                return {
+                    "period": period,
+                    "turns": [entry[0] for entry in loop],
+                    "actions": [label for entry in loop for label in entry[2]],
+                }
+        return None
@@ -0,0 +1,366 @@
+"""
+Session Recorder - compact on-disk recording of agent sessions.
+
+Layout of a session directory:
+    meta.json    task, frame size, tile size, timing summary
+    frames.bin   keyframes (zlib raw RGB) and tile deltas (zlib changed tiles)
+    events.bin   zlib JSON per turn: prompt, response, actions, results, timings
+    index.bin    one fixed-size record per turn pointing into both files
+
+Recording happens on a background thread; the agent loop only hands over
+raw frame bytes. The text of TYPE, TYPE_UNICODE and SET_CLIPBOARD is
+redacted from the events before they are written, and prune_recordings()
+keeps the recordings directory under a size and age cap. SessionReader mmaps the files and can seek to any turn by
+decoding its keyframe plus the deltas after it.
+
+Usage:
+    python session_recorder.py recordings/<session>                   # summary
+    python session_recorder.py recordings/<session> --turn 5 --out frame.png
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import zlib
+import queue
+import struct
+import shutil
+import argparse
+import threading
+
+RECORDINGS_DIR = "recordings"
+# Retention: sessions past either cap are deleted, oldest first, before a new one starts
+MAX_RECORDINGS_MB = 1024
+MAX_RECORDING_DAYS = 7
+TILE_SIZE = 64
+KEYFRAME_INTERVAL = 20
+# Store a keyframe instead of a delta when more than this fraction of tiles changed
+KEYFRAME_CHANGE_RATIO = 0.5
+COMPRESS_LEVEL = 1
+
+FRAME_KEY = 0
+FRAME_DELTA = 1
+FRAME_NONE = 2
+
+# turn, kind, keyframe turn, width, height, frame offset, frame length, event offset, event length, timestamp
+INDEX_RECORD = struct.Struct("<IBIHHQIQId")
+TILE_HEADER = struct.Struct("<HH")
+
+# Actions whose argument is text the user may not want on disk (passwords, clipboard)
+SECRET_ARGS_PATTERN = re.compile(r"\b(TYPE_UNICODE|TYPE|SET_CLIPBOARD)\((.*)\)")
+
+
+def redact(value):
+    """Copy of a JSON-like value with the text of typing and clipboard actions replaced."""
+    if isinstance(value, str):
+        return SECRET_ARGS_PATTERN.sub(lambda m: f"{m.group(1)}(<{len(m.group(2))} chars redacted>)", value)
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+def prune_recordings(root=RECORDINGS_DIR, max_bytes=MAX_RECORDINGS_MB * 1e6, max_age=MAX_RECORDING_DAYS * 86400):
+    """
+    Delete session directories older than max_age seconds, then the oldest
+    ones until the rest fit in max_bytes. Returns the number deleted.
+    """
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return 0
+    sessions = []
+    for name in names:
+        path = os.path.join(root, name)
+        if not os.path.isfile(os.path.join(path, "meta.json")):
+            continue  # not a session directory
+        try:
+            files = [os.stat(os.path.join(path, f)) for f in os.listdir(path)]
+        except OSError:
+            continue
+        sessions.append((max(st.st_mtime for st in files), sum(st.st_size for st in files), path))
+    sessions.sort()
+    now, total, deleted = time.time(), sum(size for _, size, _ in sessions), 0
+    for mtime, size, path in sessions:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def _band(raw, stride, y0, y1):
+    return raw[y0 * stride:y1 * stride]
+
+
+def diff_tiles(prev, cur, width, height, tile=TILE_SIZE):
+    """
+    Return [(tx, ty, tile bytes)] for tiles that differ between two raw RGB frames.
+    Unchanged horizontal bands are skipped with a single comparison.
+    """
+    stride = width * 3
+    changed = []
+    for ty, y0 in enumerate(range(0, height, tile)):
+        y1 = min(y0 + tile, height)
+        if _band(prev, stride, y0, y1) == _band(cur, stride, y0, y1):
+            continue
+        for tx, x0 in enumerate(range(0, width, tile)):
+            x1 = min(x0 + tile, width)
+            a, b = x0 * 3, x1 * 3
+            for row in range(y0, y1):
+                off = row * stride
+                if prev[off + a:off + b] != cur[off + a:off + b]:
+                    rows = [cur[r * stride + a:r * stride + b] for r in range(y0, y1)]
+                    changed.append((tx, ty, b"".join(rows)))
+                    break
+    return changed
+
+
+def encode_delta(tiles):
+    parts = [struct.pack("<I", len(tiles))]
+    for tx, ty, data in tiles:
+        parts.append(TILE_HEADER.pack(tx, ty))
+        parts.append(data)
+    return zlib.compress(b"".join(parts), COMPRESS_LEVEL)
+
+
+def apply_delta(frame, payload, width, height, tile=TILE_SIZE):
+    """Write the tiles of a delta payload into a bytearray frame in place."""
+    data = zlib.decompress(payload)
+    stride = width * 3
+    (count,) = struct.unpack_from("<I", data, 0)
+    pos = 4
+    for _ in range(count):
+        tx, ty = TILE_HEADER.unpack_from(data, pos)
+        pos += TILE_HEADER.size
+        x0, y0 = tx * tile, ty * tile
+        row_len = (min(x0 + tile, width) - x0) * 3
+        for row in range(y0, min(y0 + tile, height)):
+            off = row * stride + x0 * 3
+            frame[off:off + row_len] = data[pos:pos + row_len]
+            pos += row_len
+
+
+class SessionRecorder:
+    """
+    Append-only session writer.
+    record_turn() never blocks: if the writer thread falls behind, the frame
+    for that turn is skipped (later deltas are taken against the last stored
+    frame, so the stream stays consistent) while its events are still kept.
+    """
+
+    def __init__(self, directory, task="", keyframe_interval=KEYFRAME_INTERVAL, tile=TILE_SIZE, max_pending=4):
+        self.directory = directory
+        self.tile = tile
+        self.keyframe_interval = keyframe_interval
+        os.makedirs(directory, exist_ok=True)
+        self._frames = open(os.path.join(directory, "frames.bin"), "ab")
+        self._events = open(os.path.join(directory, "events.bin"), "ab")
+        self._index = open(os.path.join(directory, "index.bin"), "ab")
+        self.meta = {"task": task, "tile": tile, "started": time.time(), "turns": 0,
+                     "keyframes": 0, "deltas": 0, "dropped_frames": 0, "agent_seconds": 0.0}
+        self._prev = None
+        self._prev_size = None
+        self._last_key_turn = None
+        self._frames_since_key = 0
+        self.max_pending = max_pending
+        self._pending_frames = 0
+        self._pending_lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name="session-recorder", daemon=True)
+        self._thread.start()
+        self._write_meta()
+
+    def record_turn(self, turn, image, events, seconds=0.0):
+        """Queue one turn: the frame the model saw plus its structured events."""
+        frame = None
+        if image is not None:
+            with self._pending_lock:
+                if self._pending_frames < self.max_pending:
+                    self._pending_frames += 1
+                    frame = (image.size, (image if image.mode == "RGB" else image.convert("RGB")).tobytes())
+                else:
+                    self.meta["dropped_frames"] += 1
+        self._queue.put((turn, time.time(), events, seconds, frame))
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write_turn(*item)
+            except Exception as e:
+                print(f"Session recorder error: {e}")
+            finally:
+                if item[-1] is not None:
+                    with self._pending_lock:
+                        self._pending_frames -= 1
+
+    def _write_turn(self, turn, ts, events, seconds, frame):
+        kind, key_turn, payload = FRAME_NONE, self._last_key_turn or 0, b""
+        width = height = 0
+        if frame is not None:
+            (width, height), raw = frame
+            tiles = None
+            if self._prev is not None and self._prev_size == (width, height) \
+                    and self._frames_since_key < self.keyframe_interval:
+                tiles = diff_tiles(self._prev, raw, width, height, self.tile)
+                total = -(-width // self.tile) * -(-height // self.tile)
+                if len(tiles) > total * KEYFRAME_CHANGE_RATIO:
+                    tiles = None
+            if tiles is None:
+                kind, key_turn = FRAME_KEY, turn
+                payload = zlib.compress(raw, COMPRESS_LEVEL)
+                self._last_key_turn = turn
+                self._frames_since_key = 0
+                self.meta["keyframes"] += 1
+            else:
+                kind = FRAME_DELTA
+                payload = encode_delta(tiles)
+                self._frames_since_key += 1
+                self.meta["deltas"] += 1
+            self._prev, self._prev_size = raw, (width, height)
+
+        frame_off = self._frames.tell()
+        self._frames.write(payload)
+        event_data = zlib.compress(json.dumps(redact(events), default=str).encode("utf-8"), COMPRESS_LEVEL)
+        event_off = self._events.tell()
+        self._events.write(event_data)
+        self._index.write(INDEX_RECORD.pack(turn, kind, key_turn, width, height,
+                                            frame_off, len(payload), event_off, len(event_data), ts))
+        for f in (self._frames, self._events, self._index):
+            f.flush()
+        self.meta["turns"] += 1
+        self.meta["agent_seconds"] += seconds
+
+    def _write_meta(self):
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def stats(self):
+        """Bytes on disk and storage rate per hour of recorded agent time."""
+        size = sum(os.path.getsize(os.path.join(self.directory, n))
+                   for n in ("frames.bin", "events.bin", "index.bin"))
+        seconds = self.meta["agent_seconds"]
+        return {
+            "turns": self.meta["turns"],
+            "bytes": size,
+            "agent_seconds": seconds,
+            "bytes_per_hour": size * 3600.0 / seconds if seconds else 0.0,
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        for f in (self._frames, self._events, self._index):
+            f.close()
+        self.meta["finished"] = time.time()
+        self.meta.update({"stats": self.stats()})
+        self._write_meta()
+        return self.meta["stats"]
+
+
+class SessionReader:
+    """
+    Random-access reader over a recorded session using mmap.
+    frame(turn) decodes only the turn's keyframe and the deltas after it.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.tile = self.meta.get("tile", TILE_SIZE)
+        self._files = []
+        self._index = self._map("index.bin")
+        self._frames = self._map("frames.bin")
+        self._events = self._map("events.bin")
+        count = len(self._index) // INDEX_RECORD.size
+        self._records = {}
+        self.turns = []
+        for i in range(count):
+            rec = INDEX_RECORD.unpack_from(self._index, i * INDEX_RECORD.size)
+            self._records[rec[0]] = rec
+            self.turns.append(rec[0])
+        self._cache = None  # (turn, bytearray) of the last decoded frame
+
+    def _map(self, name):
+        f = open(os.path.join(self.directory, name), "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def events(self, turn):
+        rec = self._records[turn]
+        off, length = rec[7], rec[8]
+        return json.loads(zlib.decompress(self._slice(self._events, off, length)))
+
+    @staticmethod
+    def _slice(buf, off, length):
+        return buf[off:off + length]
+
+    def frame(self, turn):
+        """PIL image of the frame recorded at turn (None if it was skipped)."""
+        from PIL import Image
+        rec = self._records[turn]
+        kind, key_turn, width, height = rec[1], rec[2], rec[3], rec[4]
+        if kind == FRAME_NONE:
+            return None
+
+        if self._cache and self._cache[0] <= turn and self._cache[0] >= key_turn:
+            start_turn, frame = self._cache[0], bytearray(self._cache[1])
+        else:
+            key = self._records[key_turn]
+            frame = bytearray(zlib.decompress(self._slice(self._frames, key[5], key[6])))
+            start_turn = key_turn
+
+        for t in self.turns:
+            if t <= start_turn or t > turn:
+                continue
+            r = self._records[t]
+            if r[1] == FRAME_DELTA:
+                apply_delta(frame, self._slice(self._frames, r[5], r[6]), width, height, self.tile)
+        self._cache = (turn, bytes(frame))
+        return Image.frombytes("RGB", (width, height), bytes(frame))
+
+    def close(self):
+        for buf in (self._index, self._frames, self._events):
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+        for f in self._files:
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a recorded agent session.")
+    parser.add_argument("session", help="Session directory")
+    parser.add_argument("--turn", type=int, help="Turn to show")
+    parser.add_argument("--out", help="Write the turn's frame to this image file")
+    args = parser.parse_args()
+
+    reader = SessionReader(args.session)
+    stats = reader.meta.get("stats", {})
+    print(f"task: {reader.meta.get('task')}")
+    print(f"turns: {len(reader.turns)} keyframes: {reader.meta.get('keyframes')} deltas: {reader.meta.get('deltas')}")
+    if stats:
+        print(f"size: {stats['bytes'] / 1e6:.2f} MB over {stats['agent_seconds']:.1f}s "
+              f"({stats['bytes_per_hour'] / 1e6:.1f} MB per agent hour)")
+    if args.turn is not None:
+        print(json.dumps(reader.events(args.turn), indent=2))
+        if args.out:
+            img = reader.frame(args.turn)
+            if img is not None:
+                img.save(args.out)
+                print(f"frame written to {args.out}")
+    reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
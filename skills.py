@@ -0,0 +1,460 @@
+"""
+Skill Library - replay of successful task trajectories without model turns.
+
+A finished run_task is compiled into a skill: the task text becomes a
+template whose parameters are the literals that also appear in the actions
+(typed text, app names, paths), and every model turn that ran actions becomes
+a step with preconditions taken from the screen the model saw:
+
+    title      foreground window title (from the UI summary or the window manager)
+    targets    the UI element each click landed on, matched by type and name;
+               clicks are shifted if the element has moved
+    hash       screen fingerprint, only checked when a step has neither of the above
+
+A new task that fits a template runs the skill locally. Each parameter only
+matches text shaped like the recorded value: at most as many words, and no
+clause words ("and", "then") or punctuation the recorded value did not have,
+so instructions appended to a task never end up inside a parameter.
+Preconditions are polled before each step and the first mismatch hands
+control back to the model, which continues from the current screen; a
+completed replay is checked by one model turn before the task counts as done.
+SHELL commands are never replayed.
+
+Usage:
+    python skills.py                  # list skills and hit statistics
+    python skills.py --search "open notepad and type hi"
+"""
+import os
+import re
+import sys
+import json
+import time
+import difflib
+import hashlib
+import threading
+
+from tools import get_action
+from ui_inspector import parse_ui_summary
+
+DEFAULT_SKILLS_FILE = "skills.json"
+SKILLS_VERSION = 2         # 2: parameters carry the shape of their recorded value
+
+MIN_SKILL_STEPS = 2        # shorter trajectories save too little to be worth a skill
+MIN_STATIC_CHARS = 8       # a template must have this much fixed text to match anything
+MAX_MISMATCHES = 3         # consecutive hand-backs before a skill is dropped
+TARGET_RADIUS = 25         # normalized units between a click and the element it hit
+RETARGET_RADIUS = 150      # how far a target element may have moved
+HASH_DISTANCE = 10         # of 64 bits, for steps checked by fingerprint only
+STEP_TIMEOUT = 5.0         # seconds to wait for a step's preconditions
+POLL_INTERVAL = 0.3
+
+# String arguments that can carry task parameters (keys and hotkeys never do)
+PARAM_ARGS = {"text", "app_name", "command", "name", "title", "process_name"}
+# Actions a skill never runs without the model (trajectories using them are not compiled)
+NO_REPLAY_ACTIONS = {"SHELL"}
+# Words that start a new instruction; a parameter may only contain those its recorded value had
+CLAUSE_WORDS = ("and", "then", "or", "but", "also", "after", "before", "afterwards", "next", "finally")
+CLAUSE_PUNCTUATION = ".,;:!?\"'“”‘’()"
+FAILED_RESULTS = ("Error executing action", "Unknown action", "Could not parse action", "Failed to open app",
+                  "Expectation failed")
+
+_PLACEHOLDER = re.compile(r"\{(p\d+)\}")
+_QUOTED = re.compile(r"[\"'“‘]([^\"'”’]+)[\"'”’]")
+
+
+# ---------------------------------------------------------------------------
+# Observations
+# ---------------------------------------------------------------------------
+
+def foreground_title():
+    """Foreground window title from the window manager, or None."""
+    try:
+        from window_manager import get_window_manager
+        manager = get_window_manager()
+        info = manager.get_foreground_window_info() if manager else None
+        return (info or {}).get("title") or None
+    except Exception:
+        return None
+
+
+def observation(summary, screen_hash):
+    """Precondition inputs for one screen: title, UI elements and fingerprint."""
+    title, elements = parse_ui_summary(summary)
+    if title is None:
+        title = foreground_title()
+    return {"title": title, "elements": elements, "hash": screen_hash}
+
+
+def _nearest(elements, x, y, radius, kind=None, name=None):
+    best, best_dist = None, radius + 1
+    for el in elements:
+        if kind is not None and (el["type"] != kind or el["name"] != name):
+            continue
+        dist = max(abs(el["x"] - x), abs(el["y"] - y))
+        if dist < best_dist:
+            best, best_dist = el, dist
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
+def _normalize_task(text):
+    return " ".join(text.split()).rstrip(".!")
+
+
+def _word_in(value, text):
+    return re.search(r"(?<!\w)" + re.escape(value) + r"(?!\w)", text) is not None
+
+
+def extract_parameters(task, string_args):
+    """
+    Literals of the task that also appear in an action's string arguments:
+    quoted phrases first, then maximal runs of task words found together in
+    one argument. Returns the values, longest first.
+    """
+    values = []
+    for quoted in _QUOTED.findall(task):
+        quoted = quoted.strip()
+        if quoted and any(_word_in(quoted, arg) for arg in string_args):
+            values.append(quoted)
+
+    words = task.split()
+    i = 0
+    while i < len(words):
+        best = None
+        for j in range(len(words), i, -1):
+            run = " ".join(words[i:j]).strip(".,;:!?\"'“”‘’")
+            if len(run) >= 3 and any(_word_in(run, arg) for arg in string_args):
+                best = (j, run)
+                break
+        if best:
+            i = best[0]
+            if not any(_word_in(best[1], v) for v in values):
+                values.append(best[1])
+        else:
+            i += 1
+    return sorted(set(values), key=len, reverse=True)
+
+
+def _substitute(text, params):
+    """Replace parameter values (longest first) with {pN} placeholders."""
+    for name, value in params:
+        text = re.sub(r"(?<!\w)" + re.escape(value) + r"(?!\w)", "{" + name + "}", text)
+    return text
+
+
+def fill(text, values):
+    return _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), text) if text else text
+
+
+def param_shape(value):
+    """What a parameter may match: up to as many words as the recorded value, with its clause words and punctuation."""
+    words = value.split()
+    return {
+        "words": len(words),
+        "clauses": sorted({w.lower() for w in words} & set(CLAUSE_WORDS)),
+        "punctuation": "".join(sorted(set(value) & set(CLAUSE_PUNCTUATION))),
+    }
+
+
+def _param_regex(name, shape):
+    excluded = "".join(c for c in CLAUSE_PUNCTUATION if c not in shape["punctuation"])
+    clauses = [w for w in CLAUSE_WORDS if w not in shape["clauses"]]
+    token = (r"(?!(?:" + "|".join(clauses) + r")(?!\w))" if clauses else "") + r"[^\s" + re.escape(excluded) + "]+"
+    return f"(?P<{name}>{token}(?:\\s+{token}){{0,{max(0, shape['words'] - 1)}}}?)"
+
+
+def template_pattern(template, shapes):
+    parts = _PLACEHOLDER.split(template)
+    regex = ""
+    for i, part in enumerate(parts):
+        if i % 2:
+            regex += _param_regex(part, shapes[part])
+        else:
+            regex += r"\s+".join(re.escape(word) for word in part.split(" ")) if part else ""
+    return re.compile(regex, re.IGNORECASE)
+
+
+def static_text(template):
+    return " ".join(_PLACEHOLDER.sub(" ", template).split())
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+def _action_args(name, args):
+    """Planned action args (positional text or call dict) -> args dict, or None."""
+    action = get_action(name) if name else None
+    if action is None or action.func is None:
+        return None
+    try:
+        bound = action.bind(args)
+    except (ValueError, TypeError, IndexError):
+        return None
+    return action.name, dict(zip([p.name for p in action.params], bound))
+
+
+def compile_skill(task, trajectory):
+    """
+    Build a skill dict from a successful trajectory, a list of
+    {"observation": ..., "actions": [(name, args, result)]} per model turn.
+    Returns None when the trajectory is too short or had failed actions.
+    """
+    steps = []
+    for turn in trajectory:
+        actions = []
+        for name, args, result in turn["actions"]:
+            if result and str(result).startswith(FAILED_RESULTS):
+                return None
+            if str(name).upper() in NO_REPLAY_ACTIONS:
+                return None
+            normalized = _action_args(name, args)
+            if normalized is None:
+                return None
+            actions.append(normalized)
+        if actions:
+            steps.append((turn["observation"], actions))
+    if len(steps) < MIN_SKILL_STEPS:
+        return None
+
+    string_args = [str(value) for _, actions in steps for _, args in actions
+                   for key, value in args.items() if key in PARAM_ARGS and value]
+    task = _normalize_task(task)
+    params = [(f"p{i + 1}", value) for i, value in enumerate(extract_parameters(task, string_args))]
+    template = _substitute(task, params)
+    if len(static_text(template)) < MIN_STATIC_CHARS:
+        return None
+
+    compiled = []
+    for obs, actions in steps:
+        step = {"title": _substitute(obs["title"], params) if obs.get("title") else None,
+                "hash": f"{obs['hash']:016x}" if obs.get("hash") is not None else None,
+                "actions": []}
+        for name, args in actions:
+            entry = {"name": name, "args": {k: _substitute(v, params) if k in PARAM_ARGS and isinstance(v, str) else v
+                                            for k, v in args.items()}}
+            if "x" in args and "y" in args:
+                target = _nearest(obs.get("elements") or [], args["x"], args["y"], TARGET_RADIUS)
+                if target is not None and target["name"]:
+                    entry["target"] = dict(target, name=_substitute(target["name"], params))
+            step["actions"].append(entry)
+        compiled.append(step)
+
+    return {
+        "id": hashlib.sha1(template.lower().encode("utf-8")).hexdigest()[:10],
+        "template": template,
+        "params": [name for name, _ in params],
+        "shapes": {name: param_shape(value) for name, value in params},
+        "example": task,
+        "steps": compiled,
+        "created": time.time(),
+        "uses": 0, "completed": 0, "mismatches": 0, "turns_saved": 0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def check_step(step, values, obs):
+    """
+    Compare a step's preconditions with the current observation.
+    Returns (ok, reason, {action index: (dx, dy)} shifts for moved targets).
+    """
+    expected_title = fill(step.get("title"), values)
+    if expected_title and obs.get("title") and expected_title.lower() != obs["title"].lower():
+        return False, f"window is '{obs['title']}', expected '{expected_title}'", {}
+
+    shifts = {}
+    checked = bool(expected_title and obs.get("title"))
+    for i, action in enumerate(step["actions"]):
+        target = action.get("target")
+        if not target or not obs.get("elements"):
+            continue
+        name = fill(target["name"], values)
+        found = _nearest(obs["elements"], target["x"], target["y"], RETARGET_RADIUS, target["type"], name)
+        if found is None:
+            return False, f"{target['type']} '{name}' not found", {}
+        shifts[i] = (found["x"] - target["x"], found["y"] - target["y"])
+        checked = True
+
+    if not checked and step.get("hash") and obs.get("hash") is not None:
+        distance = (int(step["hash"], 16) ^ obs["hash"]).bit_count()
+        if distance > HASH_DISTANCE:
+            return False, f"screen differs from the recorded one ({distance}/64 bits)", {}
+    return True, None, shifts
+
+
+def run_skill(skill, values, observe, act, should_stop=lambda: False, log=print):
+    """
+    Run a skill's steps. observe() returns the current observation and
+    act(name, args, label) runs one action and returns its result string.
+    Returns (steps run, labels of the actions run, mismatch reason or None).
+    """
+    steps_run, labels = 0, []
+    for index, step in enumerate(skill["steps"]):
+        deadline = time.perf_counter() + STEP_TIMEOUT
+        while True:
+            if should_stop():
+                return steps_run, labels, "stopped"
+            ok, reason, shifts = check_step(step, values, observe())
+            if ok or time.perf_counter() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        if not ok:
+            return steps_run, labels, f"step {index + 1}: {reason}"
+
+        for i, action in enumerate(step["actions"]):
+            if should_stop():
+                return steps_run, labels, "stopped"
+            if action["name"] in NO_REPLAY_ACTIONS:
+                return steps_run, labels, f"step {index + 1}: {action['name']} is not replayed without the model"
+            args = {k: fill(v, values) if isinstance(v, str) else v for k, v in action["args"].items()}
+            if i in shifts and shifts[i] != (0, 0):
+                args["x"] += shifts[i][0]
+                args["y"] += shifts[i][1]
+            label = f"{action['name']}({', '.join(repr(v) if isinstance(v, str) else str(v) for v in args.values())})"
+            log(f"  [Skill] > {label}")
+            result = act(action["name"], args, label)
+            labels.append(label)
+            if result and str(result).startswith(FAILED_RESULTS):
+                return steps_run, labels, f"step {index + 1}: {result}"
+        steps_run += 1
+    return steps_run, labels, None
+
+
+# ---------------------------------------------------------------------------
+# Library
+# ---------------------------------------------------------------------------
+
+class SkillLibrary:
+    """Persistent skills keyed by id, searched by task text."""
+
+    def __init__(self, path=DEFAULT_SKILLS_FILE):
+        self.path = path
+        self.skills = {}
+        self.stats = {"lookups": 0, "hits": 0, "completed": 0, "mismatches": 0, "turns_saved": 0}
+        self._lock = threading.Lock()
+        self._patterns = {}
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == SKILLS_VERSION:
+                self.skills = data.get("skills", {})
+                self.stats.update(data.get("stats", {}))
+        except Exception as e:
+            print(f"Error loading skills: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": SKILLS_VERSION, "stats": self.stats, "skills": self.skills}, f, indent=1)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Error saving skills: {e}")
+
+    def _pattern(self, skill):
+        pattern = self._patterns.get(skill["id"])
+        if pattern is None:
+            pattern = self._patterns[skill["id"]] = template_pattern(skill["template"], skill["shapes"])
+        return pattern
+
+    def find(self, task):
+        """
+        The most specific skill whose template matches the task, as
+        (skill, parameter values), or None. Counts as a lookup.
+        """
+        task = _normalize_task(task)
+        best, best_key = None, None
+        with self._lock:
+            self.stats["lookups"] += 1
+            for skill in self.skills.values():
+                match = self._pattern(skill).fullmatch(task)
+                if not match:
+                    continue
+                key = (len(static_text(skill["template"])), skill["completed"])
+                if best_key is None or key > best_key:
+                    best, best_key = (skill, match.groupdict()), key
+        return best
+
+    def search(self, task, limit=5):
+        """Skills ranked by similarity of their fixed text to the task: [(score, skill)]."""
+        task = _normalize_task(task).lower()
+        with self._lock:
+            scored = [(difflib.SequenceMatcher(None, static_text(s["template"]).lower(), task).ratio(), s)
+                      for s in self.skills.values()]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+    def add(self, task, trajectory):
+        """Compile and store a skill for a successful task. Returns it, or None."""
+        skill = compile_skill(task, trajectory)
+        if skill is None:
+            return None
+        with self._lock:
+            old = self.skills.get(skill["id"])
+            if old is not None and len(old["steps"]) <= len(skill["steps"]):
+                return None  # keep the existing, shorter route
+            self.skills[skill["id"]] = skill
+            self._patterns.pop(skill["id"], None)
+        self.save()
+        return skill
+
+    def record(self, skill, steps_run, reason):
+        """Update hit statistics after a replay; drops skills that keep mismatching."""
+        with self._lock:
+            stored = self.skills.get(skill["id"], skill)
+            stored["uses"] += 1
+            stored["turns_saved"] += steps_run
+            stored["last_used"] = time.time()
+            self.stats["hits"] += 1
+            self.stats["turns_saved"] += steps_run
+            if reason is None:
+                stored["completed"] += 1
+                stored["mismatches"] = 0
+                self.stats["completed"] += 1
+            elif reason != "stopped":
+                stored["mismatches"] += 1
+                self.stats["mismatches"] += 1
+                if stored["mismatches"] >= MAX_MISMATCHES:
+                    self.skills.pop(skill["id"], None)
+        self.save()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="List or search the skill library.")
+    parser.add_argument("--file", default=DEFAULT_SKILLS_FILE)
+    parser.add_argument("--search", help="Rank skills by similarity to this task")
+    args = parser.parse_args()
+
+    library = SkillLibrary(args.file)
+    if args.search:
+        match = library.find(args.search)
+        if match:
+            print(f"match: {match[0]['id']} {match[0]['template']!r} {match[1]}")
+        for score, skill in library.search(args.search):
+            print(f"{score:.2f}  {skill['id']}  {skill['template']}")
+        return 0
+    stats = library.stats
+    print(f"{len(library.skills)} skills, {stats['hits']} hits in {stats['lookups']} lookups, "
+          f"{stats['completed']} completed, {stats['mismatches']} handed back, {stats['turns_saved']} turns saved")
+    for skill in sorted(library.skills.values(), key=lambda s: -s["uses"]):
+        print(f"  {skill['id']}  {len(skill['steps'])} steps  {skill['uses']} uses  "
+              f"{skill['turns_saved']} turns saved  {skill['template']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,14 @@
-import sys
-import pyautogui
 import time
-import pyperclip
-
-# Configure pyautogui
-pyautogui.FAILSAFE = True  # Move mouse to corner to abort
-pyautogui.PAUSE = 0.05 # Reduced pause between actions for speed
-
-# Windows-only window management import
-if sys.platform == 'win32':
-    from win_app_control import (
-        maximize_foreground_window as _maximize_fg,
-        open_app as _open_app
-    )
-else:
-    _maximize_fg = None
-    _open_app = None
+import threading
+
+# pyautogui, pyperclip and mss are imported (and pyautogui configured) on first use; see backends.py
+from backends import lazy
+pyautogui = lazy("input", namespace=globals(), symbol="pyautogui")
+pyperclip = lazy("clipboard", namespace=globals(), symbol="pyperclip")
+screen_capture = lazy("capture", namespace=globals(), symbol="screen_capture")
+
+from window_manager import get_window_manager, app_lookup_keys
+from ui_inspector import get_ui_tree_summary, parse_ui_summary
 
 def get_screen_size():
     return pyautogui.size()
@@ -52,12 +45,16 @@ def triple_click(x, y, normalized=True):
         x, y = denormalize(x, y)
     pyautogui.tripleClick(x, y)
 
+TYPE_CHUNK = 16   # characters typed between stop checks
+
 def type_text(text):
-    pyautogui.write(text, interval=0.01) # Faster typing
+    for i in range(0, len(text), TYPE_CHUNK):
+        if _wait_cancel.is_set():
+            return
+        pyautogui.write(text[i:i + TYPE_CHUNK], interval=0.01) # Faster typing
 
 def type_unicode(text):
     """Type text including unicode characters (slower but supports all characters)"""
-    import pyperclip
     old_clipboard = pyperclip.paste()
     pyperclip.copy(text)
     pyautogui.hotkey('ctrl', 'v')
@@ -83,8 +80,10 @@ def press_key(key):
 def hold_key(key, duration=0.5):
     """Hold a key down for a duration (useful for games or special interactions)"""
     pyautogui.keyDown(key)
-    time.sleep(duration)
-    pyautogui.keyUp(key)
+    try:
+        _wait_cancel.wait(duration)
+    finally:
+        pyautogui.keyUp(key)
 
 def scroll(amount):
     # positive for up, negative for down
@@ -138,19 +137,17 @@ def get_clipboard():
     return pyperclip.paste()
 
 def run_shell_command(command):
-    """Run a shell command and return output"""
-    import subprocess
-    import sys
+    """Run a shell command and return output; a stop kills it (see async_runtime.py)"""
+    import asyncio
+    from async_runtime import runtime, shell, TaskCancelled, SHELL_TIMEOUT
     try:
-        if sys.platform == 'win32':
-            # Use PowerShell on Windows for better compatibility with agent's expectations ($HOME, etc.)
-            result = subprocess.run(
-                ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command],
-                capture_output=True, text=True, timeout=10
-            )
-        else:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
-        return result.stdout + result.stderr
+        # PowerShell on Windows for better compatibility with agent's expectations ($HOME, etc.)
+        _, output = runtime.run(shell(command, timeout=SHELL_TIMEOUT))
+        return output
+    except TaskCancelled:
+        return "Command cancelled: the task was stopped."
+    except asyncio.TimeoutError:
+        return f"Command '{command}' timed out after {SHELL_TIMEOUT} seconds"
     except Exception as e:
         return str(e)
 
@@ -159,8 +156,10 @@ def click_and_hold(x, y, duration=1.0, normalized=True):
     if normalized:
         x, y = denormalize(x, y)
     pyautogui.mouseDown(x, y)
-    time.sleep(duration)
-    pyautogui.mouseUp()
+    try:
+        _wait_cancel.wait(duration)
+    finally:
+        pyautogui.mouseUp()
 
 def shift_click(x, y, normalized=True):
     """Shift+Click for range selection"""
@@ -189,17 +188,539 @@ def maximize_active_window():
     """
     Maximize the currently active (foreground) window.
     Returns (success: bool, reason: str).
-    On non-Windows platforms returns (False, 'unsupported').
+    Without a supported window manager backend returns (False, 'unsupported').
     """
-    if _maximize_fg is None:
+    wm = get_window_manager()
+    if wm is None:
         return False, 'unsupported'
-    return _maximize_fg()
+    return wm.maximize_foreground_window()
 
 def open_app(app_name):
     """
     Open an app: focus if already running, otherwise launch.
     Returns (success: bool, method: str).
     """
-    if _open_app is None:
+    wm = get_window_manager()
+    if wm is None:
         return False, 'unsupported'
-    return _open_app(app_name)
+    return wm.open_app(app_name)
+
+
+# ---------------------------------------------------------------------------
+# Waiting
+# ---------------------------------------------------------------------------
+# WAIT_FOR actions poll a local condition so the agent waits exactly as long as
+# the UI needs, inside one turn. Each returns a result string for the model.
+
+WAIT_FOR_TIMEOUT = 10.0
+WAIT_FOR_MAX_TIMEOUT = 30.0
+WAIT_FOR_POLL = 0.25
+REGION_SAMPLE_SIZE = 64      # regions are compared as 64x64 greyscale thumbnails
+REGION_CHANGE_LEVEL = 12     # grey-level difference (0-255) in any thumbnail cell that counts as a change
+REGION_STABLE_LEVEL = 3      # at most this much difference between polls counts as still
+REGION_STABLE_SECONDS = 0.5
+
+_wait_cancel = threading.Event()
+
+def cancel_waits():
+    """End any running wait, WAIT_FOR, hold or TYPE early (the agent calls this on stop)."""
+    _wait_cancel.set()
+
+def reset_waits():
+    _wait_cancel.clear()
+
+def _poll(check, timeout):
+    """
+    Call check() until it returns something truthy, the timeout passes or
+    waits are cancelled. Returns (last value, seconds waited).
+    """
+    timeout = min(max(float(timeout), 0.0), WAIT_FOR_MAX_TIMEOUT)
+    start = time.perf_counter()
+    while True:
+        value = check()
+        elapsed = time.perf_counter() - start
+        if value or elapsed >= timeout or _wait_cancel.is_set():
+            return value, elapsed
+        _wait_cancel.wait(min(WAIT_FOR_POLL, timeout - elapsed))
+
+def _find_element(name, control_type=""):
+    """The first UI element whose name contains name (and of control_type, if given), None, or 'unavailable'."""
+    wanted, control_type = name.lower(), control_type.lower().replace("control", "")
+    summary = get_ui_tree_summary()
+    if summary.startswith("UI metadata unavailable"):
+        return "unavailable"
+    for el in parse_ui_summary(summary)[1]:
+        if wanted in el["name"].lower() and (not control_type or el["type"].lower() == control_type):
+            return el
+    return None
+
+def _foreground_title(wm):
+    return (wm.get_foreground_window_info() or {}).get("title") or ""
+
+def wait_for_element(name, control_type="", timeout=WAIT_FOR_TIMEOUT):
+    """Wait until the UI tree has an element whose name contains name (and of control_type, if given)."""
+    found, seconds = _poll(lambda: _find_element(name, control_type), timeout)
+    if found == "unavailable":
+        return "WAIT_FOR_ELEMENT: UI metadata is unavailable here; use WAIT_FOR_CHANGE or WAIT_FOR_STABLE."
+    if not found:
+        return f"WAIT_FOR_ELEMENT: timed out after {seconds:.1f}s; no element named '{name}' appeared."
+    return f"WAIT_FOR_ELEMENT: {found['type']} \"{found['name']}\" at ({found['x']}, {found['y']}) after {seconds:.1f}s."
+
+def wait_for_window(title, timeout=WAIT_FOR_TIMEOUT):
+    """Wait until the foreground window title contains title."""
+    wm = get_window_manager()
+    if wm is None:
+        return "WAIT_FOR_WINDOW: window information is unavailable here."
+    title = title.lower()
+
+    def check():
+        current = _foreground_title(wm)
+        return current if title in current.lower() else None
+
+    found, seconds = _poll(check, timeout)
+    if not found:
+        current = _foreground_title(wm) or "none"
+        return f"WAIT_FOR_WINDOW: timed out after {seconds:.1f}s; the foreground window is '{current}'."
+    return f"WAIT_FOR_WINDOW: '{found}' is in the foreground after {seconds:.1f}s."
+
+def wait_for_process(process_name, timeout=WAIT_FOR_TIMEOUT):
+    """Wait until a process with this name (or a known alias) is running."""
+    import psutil
+    keys = set(app_lookup_keys(process_name))
+
+    def check():
+        for proc in psutil.process_iter(["name"]):
+            name = (proc.info.get("name") or "").lower()
+            if name in keys or (name.endswith(".exe") and name[:-4] in keys):
+                return proc.info["name"]
+        return None
+
+    found, seconds = _poll(check, timeout)
+    if not found:
+        return f"WAIT_FOR_PROCESS: timed out after {seconds:.1f}s; no process '{process_name}' is running."
+    return f"WAIT_FOR_PROCESS: {found} is running after {seconds:.1f}s."
+
+def _thumbnail(img):
+    from PIL import Image
+    return img.convert("L").resize((REGION_SAMPLE_SIZE, REGION_SAMPLE_SIZE), Image.Resampling.BILINEAR).tobytes()
+
+def _region_box(x1, y1, x2, y2, monitor):
+    """
+    mss box of a normalized region of monitor (left, top, width, height),
+    in the monitor's own pixels, so it matches frames grabbed from it
+    whatever the DPI scaling or the monitor's offset.
+    """
+    left, right = sorted((int(x1 * monitor["width"] / 1000), int(x2 * monitor["width"] / 1000)))
+    top, bottom = sorted((int(y1 * monitor["height"] / 1000), int(y2 * monitor["height"] / 1000)))
+    return {"left": monitor.get("left", 0) + left, "top": monitor.get("top", 0) + top,
+            "width": max(1, right - left), "height": max(1, bottom - top)}
+
+def _region_sampler(x1, y1, x2, y2):
+    """Returns (sample, close): sample() is a greyscale thumbnail of the region as bytes."""
+    from PIL import Image
+    sct = screen_capture()
+    # The monitor the agent captures each turn (and EXPECT_CHANGE's baseline comes from)
+    box = _region_box(x1, y1, x2, y2, sct.monitors[1])
+
+    def sample():
+        shot = sct.grab(box)
+        return _thumbnail(Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX"))
+    return sample, sct.close
+
+def _difference(a, b):
+    # Largest per-cell difference, so a small change (a spinner, one line of text) still counts
+    return max(abs(p - q) for p, q in zip(a, b))
+
+def wait_for_change(x1, y1, x2, y2, timeout=WAIT_FOR_TIMEOUT):
+    """Wait until the region differs from how it looked when the wait started."""
+    sample, close = _region_sampler(x1, y1, x2, y2)
+    try:
+        before = sample()
+        changed, seconds = _poll(lambda: _difference(before, sample()) >= REGION_CHANGE_LEVEL, timeout)
+    finally:
+        close()
+    if not changed:
+        return f"WAIT_FOR_CHANGE: region unchanged after {seconds:.1f}s."
+    return f"WAIT_FOR_CHANGE: region changed after {seconds:.1f}s."
+
+def wait_for_stable(x1, y1, x2, y2, timeout=WAIT_FOR_TIMEOUT):
+    """Wait until the region has stopped changing for REGION_STABLE_SECONDS."""
+    sample, close = _region_sampler(x1, y1, x2, y2)
+    state = {"last": None, "since": time.perf_counter()}
+
+    def check():
+        current, now = sample(), time.perf_counter()
+        if state["last"] is None or _difference(state["last"], current) > REGION_STABLE_LEVEL:
+            state["since"] = now
+        state["last"] = current
+        return now - state["since"] >= REGION_STABLE_SECONDS
+
+    try:
+        stable, seconds = _poll(check, timeout)
+    finally:
+        close()
+    if not stable:
+        return f"WAIT_FOR_STABLE: region still changing after {seconds:.1f}s."
+    return f"WAIT_FOR_STABLE: region stable after {seconds:.1f}s."
+
+
+# ---------------------------------------------------------------------------
+# Expectations
+# ---------------------------------------------------------------------------
+# EXPECT actions let one reply carry a multi-step plan: each step can be
+# followed by the state it should lead to. They poll like WAIT_FOR, but for a
+# shorter default, and a result starting with EXPECT_FAILED ends the plan: the
+# agent skips the remaining steps and reports the failure to the model.
+
+EXPECT_TIMEOUT = 3.0
+EXPECT_FAILED = "Expectation failed"
+
+# The native frame of the screen the model last saw, for EXPECT_CHANGE
+_expect_baseline = {"frame": None}
+
+def set_expect_baseline(size, bgra):
+    """The agent passes each turn's full-resolution capture; EXPECT_CHANGE compares against it."""
+    _expect_baseline["frame"] = (size, bgra)
+
+def expect_element(name, control_type="", timeout=EXPECT_TIMEOUT):
+    found, seconds = _poll(lambda: _find_element(name, control_type), timeout)
+    if found == "unavailable":
+        return f"{EXPECT_FAILED}: EXPECT_ELEMENT cannot be checked, UI metadata is unavailable here."
+    if not found:
+        return f"{EXPECT_FAILED}: no element named '{name}' after {seconds:.1f}s."
+    return f"EXPECT_ELEMENT: {found['type']} \"{found['name']}\" at ({found['x']}, {found['y']})."
+
+def _element_gone(name):
+    """True once no element's name contains name, 'unavailable' without UI metadata, else False."""
+    found = _find_element(name)
+    return found if found == "unavailable" else found is None
+
+def expect_no_element(name, timeout=EXPECT_TIMEOUT):
+    gone, seconds = _poll(lambda: _element_gone(name), timeout)
+    if gone == "unavailable":
+        return f"{EXPECT_FAILED}: EXPECT_NO_ELEMENT cannot be checked, UI metadata is unavailable here."
+    if not gone:
+        return f"{EXPECT_FAILED}: element '{name}' is still there after {seconds:.1f}s."
+    return f"EXPECT_NO_ELEMENT: no element named '{name}'."
+
+def expect_window(title, timeout=EXPECT_TIMEOUT):
+    wm = get_window_manager()
+    if wm is None:
+        return f"{EXPECT_FAILED}: EXPECT_WINDOW cannot be checked, window information is unavailable here."
+    found, seconds = _poll(lambda: title.lower() in _foreground_title(wm).lower(), timeout)
+    if not found:
+        return f"{EXPECT_FAILED}: the foreground window is '{_foreground_title(wm) or 'none'}', not '{title}', after {seconds:.1f}s."
+    return f"EXPECT_WINDOW: '{_foreground_title(wm)}' is in the foreground."
+
+def _baseline_sample(x1, y1, x2, y2):
+    """Thumbnail of the region in the baseline frame, or None without one."""
+    from PIL import Image
+    frame = _expect_baseline["frame"]
+    if frame is None:
+        return None
+    (width, height), bgra = frame
+    img = Image.frombytes("RGB", (width, height), bgra, "raw", "BGRX")
+    # The frame is a grab of the whole monitor, so the box is taken relative to it
+    box = _region_box(x1, y1, x2, y2, {"width": width, "height": height})
+    return _thumbnail(img.crop((box["left"], box["top"], box["left"] + box["width"], box["top"] + box["height"])))
+
+def expect_change(x1, y1, x2, y2, timeout=EXPECT_TIMEOUT):
+    """The region differs from how it looked on the screen the model last saw."""
+    sample, close = _region_sampler(x1, y1, x2, y2)
+    try:
+        before = _baseline_sample(x1, y1, x2, y2) or sample()
+        changed, seconds = _poll(lambda: _difference(before, sample()) >= REGION_CHANGE_LEVEL, timeout)
+    finally:
+        close()
+    if not changed:
+        return f"{EXPECT_FAILED}: region ({x1}, {y1})-({x2}, {y2}) unchanged after {seconds:.1f}s."
+    return "EXPECT_CHANGE: region changed."
+
+
+# ---------------------------------------------------------------------------
+# Screen text
+# ---------------------------------------------------------------------------
+# With AGENT_OCR=1 the agent keeps an OcrIndex (ocr_index.py) of the text on
+# screen. FIND_TEXT refreshes it from a fresh grab, which only re-reads the
+# tiles that changed, so it also sees the results of earlier steps in a plan.
+
+_text_index = {"index": None}
+
+def set_text_index(index):
+    """The agent passes its OcrIndex, or None when OCR is off."""
+    _text_index["index"] = index
+
+def find_text(text):
+    index = _text_index["index"]
+    if index is None:
+        return "FIND_TEXT: screen text is unavailable (OCR is off)."
+    try:
+        with screen_capture() as sct:
+            shot = sct.grab(sct.monitors[1])
+            index.update(tuple(shot.size), shot.bgra)
+    except Exception:
+        pass  # search the screen captured at the start of the turn
+    matches = index.find(text)
+    if not matches:
+        return f"FIND_TEXT: no text matching '{text}' on screen."
+    found = [f'"{m["text"]}" at ({m["x"]}, {m["y"]})' + (f' in "{m["line"]}"' if m["line"] and m["line"] != m["text"] else "")
+             for m in matches]
+    return "FIND_TEXT: " + found[0] + (f"; also {'; '.join(found[1:])}" if len(found) > 1 else "") + "."
+
+
+# ---------------------------------------------------------------------------
+# Action registry
+# ---------------------------------------------------------------------------
+# Every model-facing action is declared once here. The agent builds both the
+# text action list in its prompt and the function-calling schema from these
+# entries, and dispatches parsed text actions and function calls through them.
+
+# Parameter types: 'int' (coordinates are normalized 0-1000), 'number', 'string',
+# and 'strings' (variadic; collects the remaining positional text arguments)
+_SCHEMA_TYPES = {"int": "INTEGER", "number": "NUMBER", "string": "STRING"}
+
+class Param:
+    __slots__ = ("name", "type", "description", "default")
+
+    def __init__(self, name, type="int", description="", default=None):
+        self.name = name
+        self.type = type
+        self.description = description
+        self.default = default
+
+    @property
+    def required(self):
+        return self.default is None
+
+    def coerce(self, value):
+        if self.type == "int":
+            return int(float(value))
+        if self.type == "number":
+            return float(value)
+        if self.type == "strings":
+            return [str(v) for v in value] if isinstance(value, (list, tuple)) else [str(value)]
+        return str(value)
+
+class Action:
+    """
+    One action. func=None marks a control action the agent answers itself
+    (DONE, ZOOM, SCREENSHOT); status is the GUI status shown while it runs.
+    """
+    __slots__ = ("name", "func", "description", "params", "category", "status", "usage")
+
+    def __init__(self, name, func, description, params=(), category="SYSTEM ACTIONS", status="acting", usage=None):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.params = tuple(params)
+        self.category = category
+        self.status = status
+        self.usage = usage
+
+    @property
+    def function_name(self):
+        return self.name.lower()
+
+    def signature(self):
+        if self.usage:
+            return self.usage
+        names = []
+        for p in self.params:
+            names.append(f"{p.name}1, {p.name}2, ..." if p.type == "strings" else p.name)
+        return f"{self.name}({', '.join(names)})"
+
+    def bind(self, values):
+        """Positional text arguments or a function-call args dict -> list of call arguments."""
+        args = []
+        if isinstance(values, dict):
+            for p in self.params:
+                if p.name in values:
+                    args.append(p.coerce(values[p.name]))
+                elif p.required:
+                    raise ValueError(f"missing argument '{p.name}'")
+                else:
+                    args.append(p.default)
+            return args
+        values = list(values)
+        for i, p in enumerate(self.params):
+            if p.type == "strings":
+                args.append(p.coerce(values[i:]))
+                return args
+            # An empty string is an explicit value for string parameters (TYPE(''))
+            if i < len(values) and (values[i] != "" or p.type == "string"):
+                args.append(p.coerce(values[i]))
+            elif p.required:
+                raise ValueError(f"missing argument '{p.name}'")
+            else:
+                args.append(p.default)
+        return args
+
+    def call(self, values):
+        args = self.bind(values)
+        # Variadic parameters are spread into the function call
+        if self.params and self.params[-1].type == "strings":
+            args = args[:-1] + args[-1]
+        return self.func(*args)
+
+    def declaration(self):
+        """Gemini function declaration as a plain dict (no SDK import needed)."""
+        properties = {}
+        for p in self.params:
+            if p.type == "strings":
+                schema = {"type": "ARRAY", "items": {"type": "STRING"}}
+            else:
+                schema = {"type": _SCHEMA_TYPES[p.type]}
+            if p.description:
+                schema["description"] = p.description
+            properties[p.name] = schema
+        declaration = {"name": self.function_name, "description": self.description}
+        if properties:
+            declaration["parameters"] = {
+                "type": "OBJECT",
+                "properties": properties,
+                "required": [p.name for p in self.params if p.required],
+            }
+        return declaration
+
+ACTION_CATEGORIES = [
+    "MOUSE ACTIONS", "SCROLL ACTIONS", "KEYBOARD ACTIONS", "TEXT FIELD ACTIONS",
+    "CLIPBOARD ACTIONS", "WINDOW ACTIONS", "SYSTEM ACTIONS", "EXPECTATIONS", "SCREEN TEXT", "INSPECTION",
+]
+ACTIONS = {}
+_ACTION_ALIASES = {}
+
+def register_action(action, aliases=()):
+    ACTIONS[action.name] = action
+    for alias in aliases:
+        _ACTION_ALIASES[alias] = action.name
+    return action
+
+def get_action(name):
+    """Look up an action by text name (any case) or function name."""
+    key = name.upper()
+    return ACTIONS.get(_ACTION_ALIASES.get(key, key))
+
+def action_declarations(names=None):
+    """Function declarations for all actions, or only the given action names."""
+    return [a.declaration() for a in ACTIONS.values() if names is None or a.name in names]
+
+def action_prompt_text(exclude=(), categories=None):
+    """The text action list for the prompt, grouped by category; all categories by default."""
+    sections = []
+    for category in ACTION_CATEGORIES if categories is None else categories:
+        lines = [f"- {a.signature()}: {a.description}" for a in ACTIONS.values()
+                 if a.category == category and a.name not in exclude]
+        if lines:
+            sections.append(f"{category}:\n" + "\n".join(lines))
+    return "\n\n".join(sections)
+
+def _wait(seconds):
+    # Cap wait time to 1 second max to prevent slowdowns; a stop ends it early
+    _wait_cancel.wait(min(seconds, 1.0))
+
+def _shell_action(command):
+    output = run_shell_command(command)
+    if output:
+        print(f"Shell output: {output}")
+    return output
+
+def _open_app_action(app_name):
+    success, method = open_app(app_name)
+    if not success:
+        message = f"Failed to open app {app_name}"
+        print(message)
+        return message
+    return f"App {app_name} {method} successfully."
+
+def _maximize_action():
+    success, reason = maximize_active_window()
+    if not success and reason not in ('already_maximized', 'skip_process'):
+        message = f"Maximize window: {reason}"
+        print(message)
+        return message
+    return None
+
+_X = Param("x")
+_Y = Param("y")
+_TIMEOUT = Param("timeout", "number", f"Seconds to wait at most (max {WAIT_FOR_MAX_TIMEOUT:.0f})", WAIT_FOR_TIMEOUT)
+_EXPECT_TIMEOUT = Param("timeout", "number", "Seconds to wait for it at most", EXPECT_TIMEOUT)
+_REGION = [Param("x1", description="Left edge"), Param("y1", description="Top edge"),
+           Param("x2", description="Right edge"), Param("y2", description="Bottom edge")]
+
+for _action in [
+    Action("CLICK", click, "Left click at normalized coordinates (x, y).", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("DOUBLE_CLICK", double_click, "Double click at normalized coordinates (x, y). Good for opening files/apps.", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("TRIPLE_CLICK", triple_click, "Triple click to select an entire line or paragraph.", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("RIGHT_CLICK", right_click, "Right click to open context menus.", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("MIDDLE_CLICK", middle_click, "Middle click (opens links in new tab, paste in some terminals).", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("MOVE_MOUSE", move_mouse, "Move mouse without clicking (for hover effects, tooltips, dropdown menus).", [_X, _Y], "MOUSE ACTIONS"),
+    Action("CLICK_AND_HOLD", click_and_hold, "Click and hold for specified seconds (for drag menus, long press).",
+           [_X, _Y, Param("duration", "number", "Seconds", 1.0)], "MOUSE ACTIONS", "clicking"),
+    Action("SHIFT_CLICK", shift_click, "Shift+Click for range selection (select from last click to this point).", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("CTRL_CLICK", ctrl_click, "Ctrl+Click for multi-selection or opening links in new tabs.", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("ALT_CLICK", alt_click, "Alt+Click for special interactions.", [_X, _Y], "MOUSE ACTIONS", "clicking"),
+    Action("DRAG", drag, "Drag from (x1, y1) to (x2, y2). Good for moving windows, selecting text.",
+           [Param("x1"), Param("y1"), Param("x2"), Param("y2")], "MOUSE ACTIONS", "clicking"),
+
+    Action("SCROLL", scroll, "Scroll the mouse wheel at current position. Positive for up, negative for down. Use values like 3, 5, -3, -5.",
+           [Param("amount")], "SCROLL ACTIONS", "scrolling"),
+    Action("SCROLL_AT", scroll_at, "Scroll at a specific location.", [_X, _Y, Param("amount")], "SCROLL ACTIONS", "scrolling"),
+    Action("HORIZONTAL_SCROLL", horizontal_scroll, "Scroll horizontally. Positive for right, negative for left.",
+           [Param("amount")], "SCROLL ACTIONS", "scrolling"),
+
+    Action("TYPE", type_text, "Type the specified text (ASCII characters only).", [Param("text", "string")], "KEYBOARD ACTIONS", "typing"),
+    Action("TYPE_UNICODE", type_unicode, "Type text including special/unicode characters (use for non-English text, emojis).",
+           [Param("text", "string")], "KEYBOARD ACTIONS", "typing"),
+    Action("PRESS", press_key, "Press a specific key (e.g., 'enter', 'esc', 'backspace', 'tab', 'space', 'up', 'down', 'left', 'right', 'home', 'end', 'pageup', 'pagedown', 'f1'-'f12', 'win', 'delete').",
+           [Param("key", "string")], "KEYBOARD ACTIONS"),
+    Action("HOTKEY", hotkey, "Press a combination of keys (e.g., HOTKEY('ctrl', 'a'), HOTKEY('alt', 'f4'), HOTKEY('ctrl', 'shift', 'esc')).",
+           [Param("keys", "strings", "Keys pressed together, modifiers first")], "KEYBOARD ACTIONS", usage="HOTKEY(key1, key2, ...)"),
+    Action("HOLD_KEY", hold_key, "Hold a key for a duration in seconds.",
+           [Param("key", "string"), Param("duration", "number", "Seconds", 0.5)], "KEYBOARD ACTIONS"),
+
+    Action("CLEAR_FIELD", clear_field, "Focus a field at (x, y) and delete all its current text.", [_X, _Y], "TEXT FIELD ACTIONS"),
+
+    Action("COPY", copy_to_clipboard, "Send Ctrl+C to copy selected content.", (), "CLIPBOARD ACTIONS"),
+    Action("PASTE", paste_from_clipboard, "Send Ctrl+V to paste clipboard content.", (), "CLIPBOARD ACTIONS"),
+    Action("SET_CLIPBOARD", set_clipboard, "Set clipboard to specific text (useful before pasting).", [Param("text", "string")], "CLIPBOARD ACTIONS"),
+
+    Action("OPEN_APP", _open_app_action, "Open an application by name (e.g., 'notepad', 'chrome', 'calculator'). This is more reliable than searching the Start menu manually.",
+           [Param("app_name", "string")], "WINDOW ACTIONS"),
+    Action("MAXIMIZE_WINDOW", _maximize_action, "Maximize the currently active window. Use immediately after opening/focusing an app to avoid small-window scrolling problems.",
+           (), "WINDOW ACTIONS"),
+
+    Action("SHELL", _shell_action, "Execute a shell command (PowerShell). Use this for RELIABLE file operations (e.g., `mkdir`, `copy`, `move`, `del`), opening specific folders, or checking system state. This is much faster and more reliable than GUI clicks for these tasks.",
+           [Param("command", "string")], "SYSTEM ACTIONS"),
+    Action("WAIT", _wait, "Wait briefly for UI to load. Use SHORT waits: 0.3-0.5 seconds MAX. The system already handles delays. For anything slower, use a WAIT_FOR action.",
+           [Param("seconds", "number")], "SYSTEM ACTIONS", "waiting"),
+    Action("WAIT_FOR_ELEMENT", wait_for_element, "Wait until a UI element whose name contains name (optionally of a control type such as 'Button') appears. Returns where it is.",
+           [Param("name", "string"), Param("control_type", "string", "Control type, e.g. Button or Edit", ""), _TIMEOUT], "SYSTEM ACTIONS", "waiting"),
+    Action("WAIT_FOR_WINDOW", wait_for_window, "Wait until the foreground window title contains title (e.g. after opening an app or a dialog).",
+           [Param("title", "string"), _TIMEOUT], "SYSTEM ACTIONS", "waiting"),
+    Action("WAIT_FOR_PROCESS", wait_for_process, "Wait until a process with this name is running (e.g. 'notepad').",
+           [Param("process_name", "string"), _TIMEOUT], "SYSTEM ACTIONS", "waiting"),
+    Action("WAIT_FOR_CHANGE", wait_for_change, "Wait until the screen region (x1, y1)-(x2, y2) changes (e.g. a page starts rendering).",
+           _REGION + [_TIMEOUT], "SYSTEM ACTIONS", "waiting"),
+    Action("WAIT_FOR_STABLE", wait_for_stable, "Wait until the screen region (x1, y1)-(x2, y2) stops changing (e.g. a page or progress bar finished loading).",
+           _REGION + [_TIMEOUT], "SYSTEM ACTIONS", "waiting"),
+    Action("DONE", None, "Signal that the task is finished.", (), "SYSTEM ACTIONS", "done", usage="DONE"),
+
+    Action("EXPECT_ELEMENT", expect_element, "Check that a UI element whose name contains name (optionally of a control type) is present, waiting briefly. If not, the rest of the reply is not run.",
+           [Param("name", "string"), Param("control_type", "string", "Control type, e.g. Button or Edit", ""), _EXPECT_TIMEOUT], "EXPECTATIONS", "checking"),
+    Action("EXPECT_NO_ELEMENT", expect_no_element, "Check that no UI element's name contains name (e.g. a dialog closed), waiting briefly. If one remains, the rest of the reply is not run.",
+           [Param("name", "string"), _EXPECT_TIMEOUT], "EXPECTATIONS", "checking"),
+    Action("EXPECT_WINDOW", expect_window, "Check that the foreground window title contains title, waiting briefly. If not, the rest of the reply is not run.",
+           [Param("title", "string"), _EXPECT_TIMEOUT], "EXPECTATIONS", "checking"),
+    Action("EXPECT_CHANGE", expect_change, "Check that the screen region (x1, y1)-(x2, y2) looks different from the screenshot of this turn, waiting briefly. If not, the rest of the reply is not run.",
+           _REGION + [_EXPECT_TIMEOUT], "EXPECTATIONS", "checking"),
+
+    Action("FIND_TEXT", find_text, "Find text on the screen by local OCR (case-insensitive). Returns the center of each match, to click or read around it.",
+           [Param("text", "string")], "SCREEN TEXT", "reading"),
+
+    Action("ZOOM", None, "See the region between corners (x1, y1) and (x2, y2) at full resolution. It is answered before any action runs, and other actions in a reply that zooms are ignored, so decide on actions after seeing the crop.",
+           _REGION, "INSPECTION", "zooming"),
+    Action("SCREENSHOT", None, "Attach the screenshot to the next turn. Use it when a turn came without one and the UI element list is not enough to act on.",
+           (), "INSPECTION", "looking", usage="SCREENSHOT()"),
+]:
+    register_action(_action)
+_ACTION_ALIASES.update(MAXIMIZE_ACTIVE_WINDOW="MAXIMIZE_WINDOW", MAXIMIZE="MAXIMIZE_WINDOW")
@@ -0,0 +1,159 @@
+"""
+Tracing - lightweight spans with JSONL and Chrome trace-event export.
+
+Spans are appended as tuples to a bounded in-memory ring buffer; nothing is
+formatted or written until export. When tracing is disabled, span() returns
+a shared no-op context manager.
+
+Enable with AGENT_TRACE=1 (or tracer.enable()). Exported .json files open in
+chrome://tracing or https://ui.perfetto.dev.
+
+Usage:
+    python tracing.py --overhead    # measure per-span cost
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+
+TRACE_DIR = "traces"
+DEFAULT_CAPACITY = 200_000
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._spans.append(
+            (self.name, self.start, time.perf_counter_ns() - self.start, threading.get_ident(), self.args)
+        )
+        return False
+
+
+class Tracer:
+    """
+    Collects (name, start_ns, duration_ns, thread id, args) tuples.
+    deque.append is atomic, so spans can be recorded from any thread.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=False):
+        self._spans = deque(maxlen=capacity)
+        self.enabled = enabled
+        self.epoch_ns = time.perf_counter_ns()
+        self.session = time.strftime("%Y%m%d-%H%M%S")
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        """Context manager timing a block; a shared no-op when disabled."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args or None)
+
+    def add(self, name, start_ns, duration_ns, **args):
+        """Record a span measured elsewhere (perf_counter_ns timestamps)."""
+        if self.enabled:
+            self._spans.append((name, start_ns, duration_ns, threading.get_ident(), args or None))
+
+    def clear(self):
+        self._spans.clear()
+
+    def __len__(self):
+        return len(self._spans)
+
+    def spans(self):
+        """Snapshot of recorded spans as dicts, times in microseconds from the tracer epoch."""
+        result = []
+        for name, start, dur, tid, args in list(self._spans):
+            span = {'name': name, 'ts': (start - self.epoch_ns) / 1000.0, 'dur': dur / 1000.0, 'tid': tid}
+            if args:
+                span['args'] = args
+            result.append(span)
+        return result
+
+    def export_jsonl(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in self.spans():
+                f.write(json.dumps(span, default=str) + "\n")
+
+    def export_chrome(self, path):
+        pid = os.getpid()
+        events = []
+        for span in self.spans():
+            event = {'name': span['name'], 'cat': 'agent', 'ph': 'X', 'ts': span['ts'],
+                     'dur': span['dur'], 'pid': pid, 'tid': span['tid']}
+            if 'args' in span:
+                event['args'] = span['args']
+            events.append(event)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+    def export_session(self, directory=TRACE_DIR):
+        """Write the whole session so far as <session>.jsonl and <session>.trace.json."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"session-{self.session}")
+        self.export_jsonl(base + ".jsonl")
+        self.export_chrome(base + ".trace.json")
+        return base + ".trace.json"
+
+
+def measure_overhead(iterations=100_000):
+    """Return (enabled_ns, disabled_ns) average cost of an empty span."""
+    results = []
+    for enabled in (True, False):
+        t = Tracer(capacity=iterations, enabled=enabled)
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            with t.span("noop"):
+                pass
+        results.append((time.perf_counter_ns() - start) / iterations)
+    return tuple(results)
+
+
+tracer = Tracer(enabled=os.environ.get("AGENT_TRACE", "").strip() not in ("", "0"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracing utilities.")
+    parser.add_argument("--overhead", action="store_true", help="Measure per-span overhead")
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+    if args.overhead:
+        enabled_ns, disabled_ns = measure_overhead(args.iterations)
+        print(f"span overhead: enabled {enabled_ns:.0f} ns, disabled {disabled_ns:.0f} ns")
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Turn Metrics - per-turn stage timing and rolling latency percentiles.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Stages of one agent turn, in display order
+TURN_STAGES = ("capture", "ui", "encode", "api", "execute", "settle")
+
+# Short labels for the overlay HUD
+STAGE_LABELS = {
+    "capture": "cap",
+    "ui": "ui",
+    "encode": "enc",
+    "api": "api",
+    "execute": "exe",
+    "settle": "set",
+}
+
+
+# Stage each thread is in right now, read by the sampling profiler (profiler.py)
+ACTIVE_STAGES = {}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+class TurnTimer:
+    """
+    Accumulates wall-clock seconds per stage for a single turn.
+    With a tracer, every stage is also recorded as a span (named by span= if given).
+    """
+
+    def __init__(self, turn, tracer=None):
+        self.turn = turn
+        self.tracer = tracer
+        self.durations = {}
+        self._start_ns = time.perf_counter_ns()
+
+    @contextmanager
+    def stage(self, name, span=None, **args):
+        thread = threading.get_ident()
+        outer = ACTIVE_STAGES.get(thread)
+        ACTIVE_STAGES[thread] = name
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            if outer is None:
+                ACTIVE_STAGES.pop(thread, None)
+            else:
+                ACTIVE_STAGES[thread] = outer
+            self.add(name, elapsed / 1e9)
+            if self.tracer is not None:
+                self.tracer.add(span or name, start, elapsed, turn=self.turn, **args)
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def event(self):
+        """Structured timing event for this turn."""
+        elapsed = time.perf_counter_ns() - self._start_ns
+        if self.tracer is not None:
+            self.tracer.add("turn", self._start_ns, elapsed, turn=self.turn)
+        return {
+            "turn": self.turn,
+            "stages": dict(self.durations),
+            "total": elapsed / 1e9,
+        }
+
+
+class LatencyStats:
+    """Rolling window of turn timing events with p50/p95 per stage."""
+
+    def __init__(self, window=50):
+        self.window = window
+        self._totals = deque(maxlen=window)
+        self._stages = {}
+        self.turns = 0
+
+    def add(self, event):
+        self.turns += 1
+        self._totals.append(event["total"])
+        for name, seconds in event["stages"].items():
+            if name not in self._stages:
+                self._stages[name] = deque(maxlen=self.window)
+            self._stages[name].append(seconds)
+
+    def percentiles(self, stage=None):
+        """(p50, p95) of the turn total, or of one stage if given."""
+        values = self._totals if stage is None else self._stages.get(stage, ())
+        ordered = sorted(values)
+        return percentile(ordered, 50), percentile(ordered, 95)
+
+
+def format_breakdown(event):
+    """One-line stage breakdown, e.g. 'cap 0.05 ui 0.31 ... = 3.05s'."""
+    stages = event["stages"]
+    names = [s for s in TURN_STAGES if s in stages] + [s for s in stages if s not in TURN_STAGES]
+    parts = [f"{STAGE_LABELS.get(name, name)} {stages[name]:.2f}" for name in names]
+    return " ".join(parts) + f" = {event['total']:.2f}s"
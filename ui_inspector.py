@@ -1,12 +1,27 @@
-import uiautomation as auto
+import re
 import time
 import sys
 
+import backends
+
+# uiautomation is Windows-only and slow to import, so it is resolved on first use;
+# other platforms get a placeholder summary. Benchmarks may assign a stand-in here.
+auto = None
+
+def _automation():
+    global auto
+    if auto is None:
+        auto = backends.optional("ui")
+    return auto
+
 def get_ui_tree_summary(max_elements=70):
     """
     Captures interactive elements from the foreground window and returns a text summary.
     Coordinates are normalized to 0-1000.
     """
+    auto = _automation()
+    if auto is None:
+        return "UI metadata unavailable on this platform."
     try:
         # Get the screen size for normalization
         from tools import get_screen_size
@@ -109,6 +124,24 @@ def get_ui_tree_summary(max_elements=70):
     except Exception as e:
         return f"Metadata error: {str(e)}"
 
+_ELEMENT_LINE = re.compile(r'^- (\w+): (?:"(.*)"|Unnamed) at \((\d+), (\d+)\)$')
+
+def parse_ui_summary(summary):
+    """get_ui_tree_summary() text -> (window title or None, [element dicts])."""
+    title, elements = None, []
+    for line in (summary or "").splitlines():
+        line = line.strip()
+        if line.startswith("Foreground Window: "):
+            title = line[len("Foreground Window: "):]
+        elif line.startswith("Window: "):
+            title = line[len("Window: "):]
+        else:
+            match = _ELEMENT_LINE.match(line)
+            if match:
+                elements.append({"type": match.group(1), "name": match.group(2) or "",
+                                 "x": int(match.group(3)), "y": int(match.group(4))})
+    return title, elements
+
 if __name__ == "__main__":
     # Wait a bit so user can switch window if they want to test
     print("Capturing in 2 seconds...")
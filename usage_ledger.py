@@ -0,0 +1,201 @@
+"""
+Usage Ledger - append-only JSONL record of every model call.
+
+Each call appends one record (task id, turn, model, tokens, image bytes,
+latency). Records are buffered and flushed by a background thread so the
+agent loop never waits on disk. Cost and totals are computed on read from
+the per-model pricing table.
+
+Usage:
+    python usage_ledger.py              # overall totals
+    python usage_ledger.py --by task_id # per-task breakdown
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
+
+LEDGER_FILE = "api_usage.jsonl"
+LEGACY_USAGE_FILE = "api_usage.json"
+PRICING_FILE = "pricing.json"
+
+# USD per 1M tokens. Override or extend with pricing.json ({"model": {"input": .., "output": ..}});
+# 'cached_input' is the rate for context-cache hits and defaults to the input rate
+PRICING = {
+    'gemini-3-flash-preview': {'input': 0.50, 'cached_input': 0.05, 'output': 3.00},
+}
+DEFAULT_MODEL = 'gemini-3-flash-preview'
+
+_pricing_overrides = None
+
+
+def _load_pricing_overrides():
+    global _pricing_overrides
+    if _pricing_overrides is None:
+        _pricing_overrides = {}
+        if os.path.exists(PRICING_FILE):
+            try:
+                with open(PRICING_FILE, 'r') as f:
+                    _pricing_overrides = json.load(f)
+            except Exception as e:
+                print(f"Error loading pricing file: {e}")
+    return _pricing_overrides
+
+
+def price_for(model):
+    """Per-1M-token prices for a model, falling back to the default model's prices."""
+    overrides = _load_pricing_overrides()
+    if model in overrides:
+        return overrides[model]
+    return PRICING.get(model) or PRICING[DEFAULT_MODEL]
+
+
+def call_cost(model, input_tokens, output_tokens, cached_tokens=0):
+    """USD for one call; cached_tokens are the part of input_tokens served from the context cache."""
+    price = price_for(model)
+    cached_tokens = min(cached_tokens, input_tokens)
+    return (((input_tokens - cached_tokens) / 1_000_000) * price['input']
+            + (cached_tokens / 1_000_000) * price.get('cached_input', price['input'])
+            + (output_tokens / 1_000_000) * price['output'])
+
+
+def record_cost(record):
+    """Cost of a ledger record; legacy totals carry their own cost."""
+    if 'cost' in record:
+        return record['cost']
+    return call_cost(record.get('model') or DEFAULT_MODEL,
+                     record.get('input_tokens', 0), record.get('output_tokens', 0), record.get('cached_tokens', 0))
+
+
+class UsageLedger:
+    """
+    Buffered append-only writer.
+    record() only appends to an in-memory list; a daemon thread writes the
+    batch every flush_interval seconds or once flush_batch records are pending.
+    """
+
+    def __init__(self, path=LEDGER_FILE, flush_interval=2.0, flush_batch=50):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._import_legacy()
+        self._thread = threading.Thread(target=self._flush_loop, name="usage-ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _import_legacy(self):
+        """Carry the old cumulative api_usage.json totals into a new ledger once."""
+        if os.path.exists(self.path) or not os.path.exists(LEGACY_USAGE_FILE):
+            return
+        try:
+            with open(LEGACY_USAGE_FILE, 'r') as f:
+                data = json.load(f)
+            self._pending.append({
+                'ts': os.path.getmtime(LEGACY_USAGE_FILE),
+                'task_id': 'legacy',
+                'input_tokens': data.get('total_input_tokens', 0),
+                'output_tokens': data.get('total_output_tokens', 0),
+                'cost': data.get('total_cost', 0.0),
+            })
+        except Exception as e:
+            print(f"Error importing legacy usage file: {e}")
+
+    def record(self, **fields):
+        """Queue one record; never touches the disk."""
+        fields.setdefault('ts', time.time())
+        with self._lock:
+            self._pending.append(fields)
+            if len(self._pending) >= self.flush_batch:
+                self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        data = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in batch)
+        with self._write_lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+            except Exception as e:
+                print(f"Error writing usage ledger: {e}")
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+
+def read_records(path=LEDGER_FILE):
+    """Yield ledger records, skipping a torn trailing line."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _empty_totals():
+    return {'calls': 0, 'input_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0, 'image_bytes': 0, 'latency': 0.0,
+            'cost': 0.0}
+
+
+def summarize(path=LEDGER_FILE, by=None, records=None):
+    """
+    Aggregate the ledger. Returns a totals dict, or {group value: totals}
+    when by is a record field such as 'task_id' or 'model'.
+    """
+    groups = {}
+    for r in records if records is not None else read_records(path):
+        key = r.get(by) if by else None
+        totals = groups.setdefault(key, _empty_totals())
+        totals['calls'] += 0 if r.get('task_id') == 'legacy' else 1
+        totals['input_tokens'] += r.get('input_tokens', 0)
+        totals['cached_tokens'] += r.get('cached_tokens', 0)
+        totals['output_tokens'] += r.get('output_tokens', 0)
+        totals['image_bytes'] += r.get('image_bytes', 0)
+        totals['latency'] += r.get('latency', 0.0)
+        totals['cost'] += record_cost(r)
+    if by:
+        return groups
+    return groups.get(None, _empty_totals())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the API usage ledger.")
+    parser.add_argument("--file", default=LEDGER_FILE)
+    parser.add_argument("--by", help="Group by a record field, e.g. task_id, model")
+    args = parser.parse_args()
+
+    result = summarize(args.file, by=args.by)
+    if not args.by:
+        result = {'total': result}
+    for key, t in result.items():
+        print(f"{key}: calls={t['calls']} input={t['input_tokens']} cached={t['cached_tokens']} output={t['output_tokens']} "
+              f"image_bytes={t['image_bytes']} latency={t['latency']:.1f}s cost=${t['cost']:.5f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 """
 Windows App Control - foreground window/process utilities for reliable app focus/launch.
 """
+import os
 import time
 import sys
 
@@ -8,11 +9,13 @@ if sys.platform != 'win32':
     raise ImportError("win_app_control is Windows-only")
 
 import ctypes
+from ctypes import wintypes
 import psutil
 import win32gui
 import win32process
 import win32con
-import pyautogui
+from backends import lazy
+pyautogui = lazy("input", namespace=globals(), symbol="pyautogui")
 
 # App name -> process executable mapping (lowercase keys)
 APP_PROCESS_MAP = {
@@ -49,6 +52,37 @@ APP_PROCESS_MAP = {
 }
 
 
+# pid -> (process name, create time) cache so window lookups don't ask psutil per window;
+# the create time is re-checked when a window event reports the pid, for pid reuse
+_process_name_cache = {}
+_PROCESS_NAME_CACHE_MAX = 1024
+
+
+def get_process_name(pid, verify=False):
+    """
+    Return the executable name for a pid, cached after the first lookup.
+    With verify (a window event just reported the pid), the process create
+    time is compared with the cached one so a reused pid gets its new name.
+    Returns None if the process is gone or inaccessible.
+    """
+    cached = _process_name_cache.get(pid)
+    if cached is not None and not verify:
+        return cached[0]
+    try:
+        proc = psutil.Process(pid)
+        created = proc.create_time()
+        if cached is not None and cached[1] == created:
+            return cached[0]
+        name = proc.name()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        _process_name_cache.pop(pid, None)
+        return None
+    if len(_process_name_cache) >= _PROCESS_NAME_CACHE_MAX:
+        _process_name_cache.clear()
+    _process_name_cache[pid] = (name, created)
+    return name
+
+
 def get_foreground_window_info():
     """
     Get info about the current foreground window.
@@ -62,11 +96,7 @@ def get_foreground_window_info():
         title = win32gui.GetWindowText(hwnd)
         _, pid = win32process.GetWindowThreadProcessId(hwnd)
         
-        try:
-            process = psutil.Process(pid)
-            process_name = process.name()
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            process_name = None
+        process_name = get_process_name(pid)
         
         return {
             'hwnd': hwnd,
@@ -113,15 +143,12 @@ def find_window_by_process(process_name):
     def enum_callback(hwnd, _):
         if not win32gui.IsWindowVisible(hwnd):
             return True
-        try:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            proc = psutil.Process(pid)
-            if proc.name().lower() == process_name_lower:
-                title = win32gui.GetWindowText(hwnd)
-                if title:  # Only include windows with titles
-                    windows.append((hwnd, title))
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        name = get_process_name(pid)
+        if name and name.lower() == process_name_lower:
+            title = win32gui.GetWindowText(hwnd)
+            if title:  # Only include windows with titles
+                windows.append((hwnd, title))
         return True
     
     win32gui.EnumWindows(enum_callback, None)
@@ -202,6 +229,125 @@ def wait_for_app_foreground(app_name, timeout=5.0, poll_interval=0.2):
     return False
 
 
+# SetWinEventHook constants (winuser.h)
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WM_QUIT = 0x0012
+OBJID_WINDOW = 0
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+GA_ROOT = 2
+QS_ALLINPUT = 0x04FF
+PM_REMOVE = 0x0001
+
+WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                  wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+
+def shortcut_target(path):
+    """
+    Executable name (lowercase) a Start menu shortcut points at, or None for
+    advertised / Store app shortcuts that have no plain target.
+    """
+    try:
+        import pythoncom
+        from win32com.shell import shell
+        link = pythoncom.CoCreateInstance(shell.CLSID_ShellLink, None, pythoncom.CLSCTX_INPROC_SERVER,
+                                          shell.IID_IShellLink)
+        link.QueryInterface(pythoncom.IID_IPersistFile).Load(path)
+        target = link.GetPath(shell.SLGP_RAWPATH)[0]
+    except Exception:
+        return None
+    if not target.lower().endswith('.exe'):
+        return None
+    return os.path.basename(target).lower()
+
+
+def is_top_level_window(hwnd):
+    """True for a visible top-level window (not a child control or an owned popup's parts)."""
+    try:
+        return bool(hwnd) and ctypes.windll.user32.GetAncestor(hwnd, GA_ROOT) == hwnd \
+            and bool(win32gui.IsWindowVisible(hwnd))
+    except Exception:
+        return False
+
+
+def _launched_window(hwnd, names, launched_pid=None, started_after=None):
+    """
+    True if hwnd is a visible titled top-level window of the launched app: its
+    process is the one the launch started or a descendant of it, or has one of
+    the app's process names. With started_after, a name match also has to be a
+    process started since then, to tell a new instance from one already open.
+    """
+    try:
+        if not is_top_level_window(hwnd) or not win32gui.GetWindowText(hwnd):
+            return False
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        proc = psutil.Process(pid)
+        if launched_pid and (pid == launched_pid or any(p.pid == launched_pid for p in proc.parents())):
+            return True
+        if proc.name().lower() not in names:
+            return False
+        return started_after is None or proc.create_time() >= started_after
+    except Exception:
+        return False
+
+
+def wait_for_new_foreground(app_name, exe_name=None, launched_pid=None, started_after=None, timeout=5.0):
+    """
+    Wait for a directly launched app's window, from window show and foreground
+    events (SetWinEventHook) rather than polling.
+    A window counts when its process is launched_pid (or a child of it) or is
+    named like the app (by APP_PROCESS_MAP, or exe_name from the shortcut
+    target); an unrelated window that appears meanwhile is not taken for the
+    app. started_after only decides whether a window already in the
+    foreground when the wait starts is the new instance.
+    Returns True once such a window is foreground within timeout.
+    """
+    names = {APP_PROCESS_MAP.get(app_name.lower(), app_name).lower()}
+    names |= {n if n.endswith('.exe') else n + '.exe' for n in set(names)}
+    if exe_name:
+        names.add(exe_name.lower())
+    found = []
+
+    def on_event(_hook, _event, hwnd, id_object, id_child, _thread, _time):
+        if id_object == OBJID_WINDOW and id_child == 0 and not found and _launched_window(hwnd, names, launched_pid):
+            found.append(hwnd)
+
+    callback = WinEventProc(on_event)
+    user32 = ctypes.windll.user32
+    user32.SetWinEventHook.restype = wintypes.HANDLE
+    flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+    hooks = [user32.SetWinEventHook(event, event, None, callback, 0, 0, flags)
+             for event in (EVENT_SYSTEM_FOREGROUND, EVENT_OBJECT_SHOW)]
+    try:
+        # The window may have come up before the hooks were installed
+        hwnd = win32gui.GetForegroundWindow()
+        if _launched_window(hwnd, names, launched_pid, started_after):
+            return True
+        # Out-of-context hooks are delivered to this thread while it pumps messages
+        msg = wintypes.MSG()
+        deadline = time.monotonic() + timeout
+        while not found:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            user32.MsgWaitForMultipleObjects(0, None, False, int(remaining * 1000), QS_ALLINPUT)
+            while user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+    finally:
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+    hwnd = found[0]
+    return win32gui.GetForegroundWindow() == hwnd or focus_window(hwnd)
+
+
 def launch_app_via_start_menu(app_name, wait_timeout=5.0):
     """
     Launch an app using Windows Start menu search.
@@ -0,0 +1,715 @@
+"""
+Window Manager - cross-platform window/process registry and control backends.
+
+The registry indexes top-level windows by id, pid and process name and is kept
+current from window-manager events, so focus/maximize/find lookups are
+dictionary hits instead of full window or process enumerations.
+"""
+import os
+import sys
+import abc
+import shutil
+import threading
+import time
+
+# Friendly app name -> candidate process / WM_CLASS names on Linux (lowercase)
+LINUX_APP_ALIASES = {
+    'chrome': ['chrome', 'google-chrome', 'chromium', 'chromium-browser'],
+    'google chrome': ['chrome', 'google-chrome'],
+    'chromium': ['chromium', 'chromium-browser'],
+    'firefox': ['firefox', 'firefox-esr'],
+    'edge': ['msedge', 'microsoft-edge'],
+    'microsoft edge': ['msedge', 'microsoft-edge'],
+    'spotify': ['spotify'],
+    'notepad': ['gedit', 'gnome-text-editor', 'mousepad', 'kate', 'xed'],
+    'text editor': ['gedit', 'gnome-text-editor', 'mousepad', 'kate', 'xed'],
+    'explorer': ['nautilus', 'dolphin', 'thunar', 'nemo', 'pcmanfm'],
+    'file explorer': ['nautilus', 'dolphin', 'thunar', 'nemo', 'pcmanfm'],
+    'files': ['nautilus', 'dolphin', 'thunar', 'nemo', 'pcmanfm'],
+    'vscode': ['code'],
+    'visual studio code': ['code'],
+    'terminal': ['gnome-terminal', 'gnome-terminal-server', 'konsole', 'xterm', 'xfce4-terminal'],
+    'calculator': ['gnome-calculator', 'kcalc', 'galculator'],
+    'calc': ['gnome-calculator', 'kcalc', 'galculator'],
+    'settings': ['gnome-control-center', 'systemsettings'],
+}
+
+# Processes we should never maximize on Linux (agent UI, IDE, etc.)
+LINUX_SKIP_MAXIMIZE_PROCESSES = {
+    'python',
+    'python3',
+    'code',
+    'cursor',
+}
+
+
+def app_lookup_keys(app_name):
+    """Lowercase lookup keys for a friendly app name or process name."""
+    name = app_name.lower().strip()
+    keys = [name]
+    if name.endswith('.exe'):
+        keys.append(name[:-4])
+    for alias in LINUX_APP_ALIASES.get(name, []):
+        if alias not in keys:
+            keys.append(alias)
+    return keys
+
+
+def _read_process_name(pid):
+    """Process name from /proc without spawning a psutil.Process."""
+    try:
+        with open(f"/proc/{pid}/comm", 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class WindowRegistry:
+    """
+    Thread-safe index of top-level windows.
+    Each window is a dict with 'id', 'title', 'pid', 'process_name',
+    'wm_class' and 'maximized'. Backends feed it add/remove/update calls
+    from window-manager events; readers get O(1) lookups.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.RLock())
+        self._windows = {}        # window id -> info dict
+        self._by_app = {}         # lowercase process / class name -> set of window ids
+        self._process_names = {}  # pid -> process name
+        self._active = None
+        self._listeners = []
+
+    # -- writers (called by backends) ---------------------------------------
+
+    def add_window(self, wid, title='', pid=None, process_name=None, wm_class=(), maximized=False):
+        with self._cond:
+            if wid in self._windows:
+                self._unindex(wid)
+            if pid and process_name:
+                self._process_names[pid] = process_name
+            elif pid:
+                process_name = self._process_names.get(pid)
+            info = {
+                'id': wid,
+                'title': title or '',
+                'pid': pid,
+                'process_name': process_name,
+                'wm_class': tuple(c for c in wm_class if c),
+                'maximized': maximized,
+            }
+            self._windows[wid] = info
+            for key in self._index_keys(info):
+                self._by_app.setdefault(key, set()).add(wid)
+            self._cond.notify_all()
+        self._emit('created', info)
+
+    def remove_window(self, wid):
+        with self._cond:
+            info = self._windows.get(wid)
+            if info is None:
+                return
+            self._unindex(wid)
+            del self._windows[wid]
+            if self._active == wid:
+                self._active = None
+            pid = info['pid']
+            if pid and not any(w['pid'] == pid for w in self._windows.values()):
+                self._process_names.pop(pid, None)
+            self._cond.notify_all()
+        self._emit('destroyed', info)
+
+    def update_window(self, wid, **fields):
+        with self._cond:
+            info = self._windows.get(wid)
+            if info is None:
+                return
+            info.update(fields)
+            self._cond.notify_all()
+        self._emit('updated', info)
+
+    def set_active(self, wid):
+        with self._cond:
+            if self._active == wid:
+                return
+            self._active = wid
+            info = self._windows.get(wid)
+            self._cond.notify_all()
+        if info:
+            self._emit('activated', info)
+
+    # -- readers ------------------------------------------------------------
+
+    def get(self, wid):
+        with self._cond:
+            info = self._windows.get(wid)
+            return dict(info) if info else None
+
+    def active_window(self):
+        with self._cond:
+            return self.get(self._active) if self._active is not None else None
+
+    def active_id(self):
+        with self._cond:
+            return self._active
+
+    def window_ids(self):
+        with self._cond:
+            return set(self._windows)
+
+    def process_name(self, pid):
+        with self._cond:
+            return self._process_names.get(pid)
+
+    def find_by_app(self, app_name):
+        """
+        Find windows for a friendly app name, process name or WM_CLASS.
+        Returns list of (window id, title) tuples for titled windows.
+        """
+        with self._cond:
+            found = []
+            for key in app_lookup_keys(app_name):
+                for wid in self._by_app.get(key, ()):
+                    title = self._windows[wid]['title']
+                    if title and (wid, title) not in found:
+                        found.append((wid, title))
+            return found
+
+    def find_by_pid(self, pid):
+        with self._cond:
+            return [(wid, w['title']) for wid, w in self._windows.items() if w['pid'] == pid]
+
+    def wait_for(self, predicate, timeout):
+        """
+        Block until predicate(registry) is true or timeout expires.
+        Woken by registry updates instead of polling. Returns the final result.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: predicate(self), timeout)
+
+    def subscribe(self, callback):
+        """Register callback(event, info) for created/destroyed/updated/activated."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    # -- internals ----------------------------------------------------------
+
+    @staticmethod
+    def _index_keys(info):
+        keys = set()
+        name = (info.get('process_name') or '').lower()
+        if name:
+            keys.add(name)
+            if name.endswith('.exe'):
+                keys.add(name[:-4])
+        for cls in info.get('wm_class', ()):
+            keys.add(cls.lower())
+        return keys
+
+    def _unindex(self, wid):
+        for key in self._index_keys(self._windows[wid]):
+            ids = self._by_app.get(key)
+            if ids:
+                ids.discard(wid)
+                if not ids:
+                    del self._by_app[key]
+
+    def _emit(self, event, info):
+        with self._cond:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event, dict(info))
+            except Exception as e:
+                print(f"Window registry listener error: {e}")
+
+
+class WindowManager(abc.ABC):
+    """
+    Platform-neutral window management interface.
+    All methods mirror the return conventions of win_app_control.
+    """
+
+    def __init__(self):
+        self.registry = WindowRegistry()
+
+    def get_foreground_window_info(self):
+        """Dict with 'id', 'title', 'pid', 'process_name' or None."""
+        return self.registry.active_window()
+
+    def find_windows_by_process(self, process_name):
+        """List of (window id, title) tuples."""
+        return self.registry.find_by_app(process_name)
+
+    def is_app_foreground(self, app_name):
+        info = self.get_foreground_window_info()
+        if not info:
+            return False
+        keys = set(app_lookup_keys(app_name))
+        names = {(info.get('process_name') or '').lower()}
+        names.update(c.lower() for c in info.get('wm_class', ()))
+        return bool(keys & names)
+
+    @abc.abstractmethod
+    def focus_window(self, wid, timeout=1.0):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def maximize_foreground_window(self):
+        raise NotImplementedError
+
+    def focus_app(self, app_name):
+        """
+        Focus an app by its friendly name or process name.
+        Returns True if successful, False if app not found or focus failed.
+        """
+        for wid, _title in self.find_windows_by_process(app_name):
+            if self.focus_window(wid):
+                return True
+        return False
+
+    @abc.abstractmethod
+    def launch_app(self, app_name, timeout=5.0):
+        """Start an app that isn't running. Returns True once its window is foreground."""
+        raise NotImplementedError
+
+    def open_app(self, app_name, launch_timeout=5.0):
+        """
+        Open an app: focus if already running, otherwise launch.
+        Returns (success: bool, method: str) where method is 'focused', 'launched', or 'failed'.
+        """
+        if self.focus_app(app_name):
+            return True, 'focused'
+        if self.launch_app(app_name, timeout=launch_timeout):
+            return True, 'launched'
+        return False, 'failed'
+
+    def close(self):
+        pass
+
+
+class X11WindowManager(WindowManager):
+    """
+    EWMH window manager backend for X11 sessions (python-xlib).
+
+    A dedicated event connection listens for PropertyNotify on the root window
+    (_NET_CLIENT_LIST, _NET_ACTIVE_WINDOW) and on each client window (title and
+    _NET_WM_STATE), and applies the changes to the registry. Commands are sent
+    as EWMH client messages on a second connection.
+    """
+
+    def __init__(self, display_name=None, ready_timeout=2.0):
+        super().__init__()
+        from Xlib import X, Xatom, display as xdisplay
+        self._X = X
+        self._Xatom = Xatom
+        self._display = xdisplay.Display(display_name)
+        self._events = xdisplay.Display(display_name)
+        self._lock = threading.Lock()
+        self._root = self._display.screen().root
+        self._closed = False
+        self._ready = threading.Event()
+
+        atom = self._display.intern_atom
+        self._NET_CLIENT_LIST = atom('_NET_CLIENT_LIST')
+        self._NET_ACTIVE_WINDOW = atom('_NET_ACTIVE_WINDOW')
+        self._NET_WM_PID = atom('_NET_WM_PID')
+        self._NET_WM_NAME = atom('_NET_WM_NAME')
+        self._NET_WM_STATE = atom('_NET_WM_STATE')
+        self._NET_WM_STATE_MAXIMIZED_VERT = atom('_NET_WM_STATE_MAXIMIZED_VERT')
+        self._NET_WM_STATE_MAXIMIZED_HORZ = atom('_NET_WM_STATE_MAXIMIZED_HORZ')
+        self._UTF8_STRING = atom('UTF8_STRING')
+
+        self._thread = threading.Thread(target=self._event_loop, name="x11-window-events", daemon=True)
+        self._thread.start()
+        self._ready.wait(ready_timeout)
+
+    # -- event side (runs on the event thread / event connection) -----------
+
+    def _event_loop(self):
+        X = self._X
+        root = self._events.screen().root
+        try:
+            root.change_attributes(event_mask=X.PropertyChangeMask)
+            self._sync_client_list()
+            self._sync_active()
+        except Exception as e:
+            print(f"X11 window registry init error: {e}")
+        finally:
+            self._ready.set()
+
+        while not self._closed:
+            try:
+                ev = self._events.next_event()
+            except Exception:
+                if self._closed:
+                    return
+                time.sleep(0.1)
+                continue
+            if ev.type != X.PropertyNotify:
+                continue
+            try:
+                if ev.window.id == root.id:
+                    if ev.atom == self._NET_CLIENT_LIST:
+                        self._sync_client_list()
+                    elif ev.atom == self._NET_ACTIVE_WINDOW:
+                        self._sync_active()
+                elif ev.atom in (self._NET_WM_NAME, self._Xatom.WM_NAME):
+                    self.registry.update_window(ev.window.id, title=self._read_title(ev.window))
+                elif ev.atom == self._NET_WM_STATE:
+                    self.registry.update_window(ev.window.id, maximized=self._read_maximized(ev.window))
+            except Exception:
+                # Windows can disappear between the event and our query
+                pass
+
+    def _sync_client_list(self):
+        """Diff _NET_CLIENT_LIST against the registry; only new windows are queried."""
+        root = self._events.screen().root
+        prop = root.get_full_property(self._NET_CLIENT_LIST, self._X.AnyPropertyType)
+        current = set(prop.value) if prop else set()
+        known = self.registry.window_ids()
+        for wid in known - current:
+            self.registry.remove_window(wid)
+        for wid in current - known:
+            self._add_client(wid)
+
+    def _add_client(self, wid):
+        win = self._events.create_resource_object('window', wid)
+        try:
+            win.change_attributes(event_mask=self._X.PropertyChangeMask)
+            prop = win.get_full_property(self._NET_WM_PID, self._X.AnyPropertyType)
+            pid = int(prop.value[0]) if prop and len(prop.value) else None
+            process_name = self.registry.process_name(pid) if pid else None
+            if pid and not process_name:
+                process_name = _read_process_name(pid)
+            wm_class = win.get_wm_class() or ()
+            self.registry.add_window(
+                wid,
+                title=self._read_title(win),
+                pid=pid,
+                process_name=process_name,
+                wm_class=wm_class,
+                maximized=self._read_maximized(win),
+            )
+        except Exception:
+            pass
+
+    def _sync_active(self):
+        root = self._events.screen().root
+        prop = root.get_full_property(self._NET_ACTIVE_WINDOW, self._X.AnyPropertyType)
+        wid = int(prop.value[0]) if prop and len(prop.value) else None
+        self.registry.set_active(wid or None)
+
+    def _read_title(self, win):
+        prop = win.get_full_property(self._NET_WM_NAME, self._UTF8_STRING)
+        if not prop:
+            prop = win.get_full_property(self._Xatom.WM_NAME, self._X.AnyPropertyType)
+        if not prop:
+            return ''
+        value = prop.value
+        if isinstance(value, bytes):
+            return value.decode('utf-8', errors='replace')
+        return str(value)
+
+    def _read_maximized(self, win):
+        prop = win.get_full_property(self._NET_WM_STATE, self._Xatom.ATOM)
+        states = set(prop.value) if prop else set()
+        return {self._NET_WM_STATE_MAXIMIZED_VERT, self._NET_WM_STATE_MAXIMIZED_HORZ} <= states
+
+    # -- command side -------------------------------------------------------
+
+    def _send_root_message(self, wid, message_type, data):
+        from Xlib.protocol import event
+        X = self._X
+        with self._lock:
+            win = self._display.create_resource_object('window', wid)
+            ev = event.ClientMessage(window=win, client_type=message_type, data=(32, data))
+            self._root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+            self._display.flush()
+
+    def focus_window(self, wid, timeout=1.0):
+        """
+        Activate a window via _NET_ACTIVE_WINDOW.
+        Returns True once the window manager reports it active.
+        """
+        try:
+            # Source indication 2 = pager, so the WM doesn't apply focus-stealing prevention
+            self._send_root_message(wid, self._NET_ACTIVE_WINDOW, [2, self._X.CurrentTime, 0, 0, 0])
+        except Exception:
+            return False
+        return self.registry.wait_for(lambda r: r.active_id() == wid, timeout)
+
+    def maximize_window(self, wid, timeout=0.5):
+        """
+        Maximize a window via _NET_WM_STATE.
+        Returns True if the window is now maximized, False otherwise.
+        """
+        try:
+            self._send_root_message(wid, self._NET_WM_STATE, [
+                1,  # _NET_WM_STATE_ADD
+                self._NET_WM_STATE_MAXIMIZED_VERT,
+                self._NET_WM_STATE_MAXIMIZED_HORZ,
+                2,
+                0,
+            ])
+        except Exception:
+            return False
+        return self.registry.wait_for(lambda r: (r.get(wid) or {}).get('maximized', False), timeout)
+
+    def maximize_foreground_window(self):
+        """
+        Maximize the current foreground window.
+        Skips if the window belongs to a process in LINUX_SKIP_MAXIMIZE_PROCESSES.
+        Returns (success: bool, reason: str).
+        """
+        info = self.get_foreground_window_info()
+        if not info:
+            return False, 'no_foreground_window'
+
+        process_name = (info.get('process_name') or '').lower()
+        if process_name in LINUX_SKIP_MAXIMIZE_PROCESSES or process_name.startswith('python'):
+            return False, 'skip_process'
+
+        if info.get('maximized'):
+            return True, 'already_maximized'
+
+        if self.maximize_window(info['id']):
+            return True, 'maximized'
+        return False, 'failed'
+
+    def launch_app(self, app_name, timeout=5.0):
+        """
+        Start an app from the launcher index (falling back to PATH) and wait
+        for its first window through registry creation events, not polling.
+        """
+        from app_launcher import get_app_index
+
+        index = get_app_index()
+        entry = index.find(app_name)
+        if entry is None and index.refresh():
+            entry = index.find(app_name)
+        if entry is None:
+            path = next((p for p in map(shutil.which, app_lookup_keys(app_name)) if p), None)
+            if not path:
+                return False
+            entry = {'name': app_name, 'argv': [path], 'wm_class': ''}
+
+        keys = set(app_lookup_keys(app_name))
+        keys.add(os.path.basename(entry['argv'][0]).lower())
+        if entry.get('wm_class'):
+            keys.add(entry['wm_class'].lower())
+
+        before = self.registry.window_ids()
+        try:
+            proc = index.launch(entry)
+        except OSError:
+            return False
+        pid = proc.pid if proc else None
+
+        def new_window(registry):
+            for wid in registry.window_ids() - before:
+                info = registry.get(wid)
+                if not info:
+                    continue
+                names = {(info.get('process_name') or '').lower()}
+                names.update(c.lower() for c in info.get('wm_class', ()))
+                if (pid and info.get('pid') == pid) or keys & names:
+                    return wid
+            return None
+
+        if not self.registry.wait_for(lambda r: new_window(r) is not None, timeout):
+            return False
+        wid = new_window(self.registry)
+        if self.registry.active_id() == wid:
+            return True
+        return self.focus_window(wid)
+
+    def close(self):
+        self._closed = True
+        for conn in (self._display, self._events):
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class Win32WindowManager(WindowManager):
+    """
+    Windows backend on win_app_control.
+
+    An event thread installs SetWinEventHook for window create/show/hide/
+    destroy, title changes and foreground changes, and applies them to the
+    registry, so lookups don't enumerate every window. Process names are
+    cached per pid in win_app_control and re-checked when a window event
+    reports the pid, so a reused pid is not taken for the old process.
+    """
+
+    def __init__(self, ready_timeout=2.0):
+        super().__init__()
+        import win_app_control
+        self._wac = win_app_control
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._event_loop, name="win32-window-events", daemon=True)
+        self._thread.start()
+        self._ready.wait(ready_timeout)
+
+    # -- event side (runs on the event thread) ------------------------------
+
+    def _event_loop(self):
+        import ctypes
+        from ctypes import wintypes
+        wac = self._wac
+        user32 = ctypes.windll.user32
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        callback = wac.WinEventProc(self._on_event)
+        flags = wac.WINEVENT_OUTOFCONTEXT | wac.WINEVENT_SKIPOWNPROCESS
+        ranges = ((wac.EVENT_SYSTEM_FOREGROUND, wac.EVENT_SYSTEM_FOREGROUND),
+                  (wac.EVENT_OBJECT_CREATE, wac.EVENT_OBJECT_HIDE),
+                  (wac.EVENT_OBJECT_NAMECHANGE, wac.EVENT_OBJECT_NAMECHANGE))
+        hooks = []
+        try:
+            hooks = [user32.SetWinEventHook(first, last, None, callback, 0, 0, flags) for first, last in ranges]
+            self._sync()
+        except Exception as e:
+            print(f"Win32 window registry init error: {e}")
+        finally:
+            self._ready.set()
+
+        # Out-of-context hooks are delivered while this thread pumps messages
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                if hook:
+                    user32.UnhookWinEvent(hook)
+
+    def _sync(self):
+        """Initial registry contents: every visible top-level window, and the foreground one."""
+        import win32gui
+        hwnds = []
+        win32gui.EnumWindows(lambda hwnd, _: hwnds.append(hwnd) or True, None)
+        for hwnd in hwnds:
+            self._add(hwnd)
+        self.registry.set_active(win32gui.GetForegroundWindow() or None)
+
+    def _add(self, hwnd):
+        import win32gui
+        import win32process
+        if not self._wac.is_top_level_window(hwnd):
+            return
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        self.registry.add_window(
+            hwnd,
+            title=win32gui.GetWindowText(hwnd),
+            pid=pid,
+            process_name=self._wac.get_process_name(pid, verify=True),
+            maximized=self._wac.is_window_maximized(hwnd),
+        )
+
+    def _on_event(self, _hook, event, hwnd, id_object, id_child, _thread, _time):
+        wac = self._wac
+        if not hwnd or id_object != wac.OBJID_WINDOW or id_child != 0:
+            return
+        try:
+            if event in (wac.EVENT_OBJECT_DESTROY, wac.EVENT_OBJECT_HIDE):
+                self.registry.remove_window(hwnd)
+            elif event == wac.EVENT_OBJECT_NAMECHANGE and self.registry.get(hwnd) is not None:
+                import win32gui
+                self.registry.update_window(hwnd, title=win32gui.GetWindowText(hwnd))
+            else:
+                # Created windows are usually still hidden; they are added on show
+                if self.registry.get(hwnd) is None:
+                    self._add(hwnd)
+                if event == wac.EVENT_SYSTEM_FOREGROUND:
+                    self.registry.set_active(hwnd)
+        except Exception:
+            # Windows can disappear between the event and our query
+            pass
+
+    # -- command side -------------------------------------------------------
+
+    def get_foreground_window_info(self):
+        info = self.registry.active_window()
+        if info is None:
+            info = self._wac.get_foreground_window_info()
+            if info:
+                info['id'] = info['hwnd']
+            return info
+        info['hwnd'] = info['id']
+        return info
+
+    def find_windows_by_process(self, process_name):
+        name = self._wac.APP_PROCESS_MAP.get(process_name.lower(), process_name)
+        return self.registry.find_by_app(name)
+
+    def is_app_foreground(self, app_name):
+        return self._wac.is_app_foreground(app_name)
+
+    def focus_window(self, wid, timeout=1.0):
+        return self._wac.focus_window(wid)
+
+    def maximize_foreground_window(self):
+        return self._wac.maximize_foreground_window()
+
+    def close(self):
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self._wac.WM_QUIT, 0, 0)
+
+    def launch_app(self, app_name, timeout=5.0):
+        """
+        Start the app from its indexed Start menu shortcut; fall back to typing
+        into Start menu search when the index has no match.
+        """
+        from app_launcher import get_app_index
+
+        index = get_app_index()
+        entry = index.find(app_name)
+        if entry is None and index.refresh():
+            entry = index.find(app_name)
+        if entry is None:
+            return self._wac.launch_app_via_start_menu(app_name, wait_timeout=timeout)
+
+        exe_name = self._wac.shortcut_target(entry['path'])
+        started = time.time()
+        try:
+            pid = index.launch(entry)
+        except OSError:
+            return self._wac.launch_app_via_start_menu(app_name, wait_timeout=timeout)
+        return self._wac.wait_for_new_foreground(app_name, exe_name, pid, started_after=started, timeout=timeout)
+
+
+_window_manager = None
+_window_manager_checked = False
+_window_manager_lock = threading.Lock()
+
+
+def get_window_manager():
+    """
+    Return the shared window manager for this platform, creating it on first use.
+    Returns None when no supported backend is available.
+    """
+    global _window_manager, _window_manager_checked
+    with _window_manager_lock:
+        if _window_manager_checked:
+            return _window_manager
+        _window_manager_checked = True
+        try:
+            if sys.platform == 'win32':
+                _window_manager = Win32WindowManager()
+            elif sys.platform.startswith('linux') and os.environ.get('DISPLAY'):
+                _window_manager = X11WindowManager()
+        except Exception as e:
+            print(f"Window manager unavailable: {e}")
+            _window_manager = None
+        return _window_manager